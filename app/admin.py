@@ -6,10 +6,13 @@ from .models import (
     ClientBranch,
     ClientProfile,
     Equipment,
+    FileDeletion,
     Process,
     ProcessStatusLog,
     Report,
     Role,
+    Task,
+    TaskStatusChoices,
     User,
 )
 
@@ -164,3 +167,35 @@ class ProcessStatusLogAdmin(admin.ModelAdmin):
         return local_time.strftime("%Y-%m-%d %H:%M")
 
     fecha_cambio_display.short_description = "Fecha Cambio"
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_after", "created_at")
+    list_filter = ("status", "name")
+    # La tarea se ejecuta tal como se encoló: nombre y argumentos no se editan
+    readonly_fields = ("name", "payload", "created_at", "locked_at", "last_error")
+    actions = ["retry_tasks"]
+
+    @admin.action(description="Reintentar las tareas seleccionadas")
+    def retry_tasks(self, request, queryset):
+        updated = queryset.update(
+            status=TaskStatusChoices.PENDING,
+            attempts=0,
+            run_after=timezone.now(),
+            locked_at=None,
+        )
+        self.message_user(request, f"{updated} tareas reencoladas.")
+
+
+@admin.register(FileDeletion)
+class FileDeletionAdmin(admin.ModelAdmin):
+    list_display = ("name", "delete_after", "attempts", "created_at")
+    search_fields = ("name",)
+    readonly_fields = ("created_at", "last_error")
+    actions = ["retry_deletions"]
+
+    @admin.action(description="Reintentar los borrados seleccionados")
+    def retry_deletions(self, request, queryset):
+        updated = queryset.update(attempts=0, delete_after=timezone.now())
+        self.message_user(request, f"{updated} borrados reencolados.")
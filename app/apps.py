@@ -95,3 +95,8 @@ class AppConfig(AppConfig):
             preposition = "to" if to_assign else "for"
             log_message = f"post_migrate: {status_text} {permissions_count} permissions {preposition} group '{role_name}'."
             logger.info(log_message)
+
+        # Group permissions may have changed: drop every cached permission set
+        from app import auth_cache
+
+        auth_cache.invalidate_all()
@@ -0,0 +1,97 @@
+"""Shared cache for resolved users, roles and permissions.
+
+Every authenticated request needs the user row, its role names and the
+permission codenames used by ``has_perm`` and ``{{ perms }}``. These values
+change rarely, so they are kept in the Django cache (shared by all workers when
+``CACHE_BACKEND`` points to a shared backend) and invalidated from the signals
+that change them.
+
+Keys include a generation number. Bumping it (``invalidate_all``) discards every
+entry at once, which is what group-permission changes need.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "auth:generation"
+
+
+def is_enabled():
+    return getattr(settings, "AUTH_CACHE_ENABLED", False)
+
+
+def _cache():
+    return caches[getattr(settings, "AUTH_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "AUTH_CACHE_TIMEOUT", 300)
+
+
+def _generation():
+    generation = _cache().get(GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so an evicted counter never reuses an old generation
+        _cache().add(GENERATION_KEY, int(time.time()), timeout=None)
+        generation = _cache().get(GENERATION_KEY)
+    return generation
+
+
+def _key(kind, user_pk):
+    return f"auth:{_generation()}:user:{user_pk}:{kind}"
+
+
+def get_or_load(kind, user_pk, loader):
+    """Return the cached ``kind`` entry for the user, calling ``loader`` on a miss."""
+    if not is_enabled() or user_pk is None:
+        return loader()
+
+    key = _key(kind, user_pk)
+    value = _cache().get(key)
+    if value is None:
+        value = loader()
+        _cache().set(key, value, timeout=_timeout())
+    return value
+
+
+def get_user(user_pk, loader):
+    """Return the cached user instance, loading it with ``loader`` on a miss."""
+    return get_or_load("user", user_pk, loader)
+
+
+def get_role_names(user):
+    """Return the user's role names as a frozenset."""
+    return get_or_load(
+        "roles",
+        user.pk,
+        lambda: frozenset(user.roles.values_list("name", flat=True)),
+    )
+
+
+def get_permissions(user, loader):
+    """Return the set of "app_label.codename" strings granted to the user."""
+    return get_or_load("perms", user.pk, loader)
+
+
+def invalidate_user(user_pk):
+    """Drop every cached entry for a single user."""
+    if not is_enabled() or user_pk is None:
+        return
+    _cache().delete_many([_key(kind, user_pk) for kind in ("user", "roles", "perms")])
+
+
+def invalidate_all():
+    """Drop the cached entries of every user by moving to a new generation."""
+    if not is_enabled():
+        return
+    try:
+        _cache().incr(GENERATION_KEY)
+    except ValueError:
+        # The counter was evicted; a clock-based value is newer than any old one
+        _cache().set(GENERATION_KEY, int(time.time()), timeout=None)
+    logger.info("Auth cache invalidated for all users.")
@@ -0,0 +1,26 @@
+from django.contrib.auth.backends import ModelBackend
+
+from app import auth_cache
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend that reads users and permissions through ``app.auth_cache``.
+
+    Django already caches permissions on the user instance for the length of a
+    request; this backend keeps them across requests and workers so a
+    steady-state request does not query the user, group or permission tables.
+    """
+
+    def get_user(self, user_id):
+        parent = super()
+        return auth_cache.get_user(user_id, lambda: parent.get_user(user_id))
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, "_perm_cache"):
+            parent = super()
+            user_obj._perm_cache = auth_cache.get_permissions(
+                user_obj, lambda: parent.get_all_permissions(user_obj)
+            )
+        return user_obj._perm_cache
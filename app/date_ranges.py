@@ -0,0 +1,74 @@
+"""Filters by local date on timestamp columns.
+
+Filtering a ``DateTimeField`` with ``field__date__gte`` wraps the column in a
+timezone-converting cast (``(field AT TIME ZONE 'America/Bogota')::date`` on
+PostgreSQL), so its index cannot be used. ``date_range_q`` turns an inclusive
+range of local dates into the aware half-open range
+``[start of first day, start of the day after the last)`` and compares the raw
+column instead, which gives the same rows and stays sargable.
+
+Dates are interpreted in the current time zone (``TIME_ZONE`` unless another
+one is activated). ``DateField`` columns are compared directly.
+"""
+
+import datetime
+
+from django.db.models import DateTimeField, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import timezone
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def parse_date(value):
+    """Return the ``date`` of a ``YYYY-MM-DD`` string, or ``None`` if invalid."""
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.datetime.strptime(value or "", DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def start_of_day(fecha, days=0):
+    """Return the aware start of the local day ``fecha`` plus ``days``."""
+    return timezone.make_aware(
+        datetime.datetime.combine(
+            fecha + datetime.timedelta(days=days), datetime.time.min
+        )
+    )
+
+
+def is_datetime_field(model, path):
+    """Tell whether ``path`` (which may span relations) is a ``DateTimeField``."""
+    field = None
+    for name in path.split(LOOKUP_SEP):
+        field = model._meta.get_field(name)
+        model = field.related_model
+    return isinstance(field, DateTimeField)
+
+
+def date_range_q(field, start=None, end=None, datetimes=True):
+    """Return a ``Q`` keeping ``field`` between the local dates ``start`` and
+    ``end``, both inclusive.
+
+    ``start`` and ``end`` may be dates or ``YYYY-MM-DD`` strings; a missing or
+    invalid bound is not applied. With ``datetimes`` the bounds become aware
+    datetimes (``__gte`` / ``__lt``), otherwise dates (``__gte`` / ``__lte``).
+    """
+    start, end = parse_date(start), parse_date(end)
+    q = Q()
+    if start:
+        q &= Q(**{f"{field}__gte": start_of_day(start) if datetimes else start})
+    if end:
+        if datetimes:
+            q &= Q(**{f"{field}__lt": start_of_day(end, 1)})
+        else:
+            q &= Q(**{f"{field}__lte": end})
+    return q
+
+
+def filter_date_range(queryset, field, start=None, end=None):
+    """Filter ``queryset`` by ``date_range_q()``, detecting the field type."""
+    datetimes = is_datetime_field(queryset.model, field)
+    return queryset.filter(date_range_q(field, start, end, datetimes=datetimes))
@@ -0,0 +1,144 @@
+"""Authenticated downloads of stored files with HTTP range support.
+
+``file_response`` serves a ``FieldFile`` after the view has checked access.
+Browsers' PDF viewers ask for byte ranges so a large report opens at any page
+without downloading the whole file, so a single ``Range`` is answered with
+``206 Partial Content`` and only that range is read from the storage (a
+ranged ``GetObject`` on S3). ``ETag`` and ``Last-Modified`` come from the
+stored object, so ``If-None-Match``, ``If-Modified-Since`` and ``If-Range``
+work as well. Several ranges in one request get the whole file.
+
+With ``REPORT_DOWNLOAD_MODE`` set to ``x-accel-redirect`` (nginx) or
+``x-sendfile`` (Apache, lighttpd) the response only carries a header and the
+front proxy sends the file, ranges included, without going through Python.
+"""
+
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+)
+
+CHUNK_SIZE = 64 * 1024
+PROXY_MODES = ("x-accel-redirect", "x-sendfile")
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested range starts past the end of the file."""
+
+
+def parse_range(header, size):
+    """Return ``(start, end)`` for a single byte range, both inclusive.
+
+    Returns ``None`` when the whole file should be sent instead (malformed,
+    multiple or non-byte ranges) and raises ``RangeNotSatisfiable`` when the
+    range lies outside a file of ``size`` bytes.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, dash, last = ranges.strip().partition("-")
+    if not dash or not (first or last).isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        # Sufijo: los últimos N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def _if_range_passes(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        # Comparación fuerte: una ETag débil nunca coincide
+        return if_range == etag and not etag.startswith("W/")
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _proxy_response(field, mode):
+    if mode == "x-accel-redirect":
+        response = HttpResponse()
+        prefix = getattr(settings, "REPORT_DOWNLOAD_ACCEL_PREFIX", "/protected/")
+        response["X-Accel-Redirect"] = prefix + quote(field.name)
+        return response
+    try:
+        path = field.storage.path(field.name)
+    except NotImplementedError:
+        # Almacenamiento remoto (S3): no hay ruta local que enviar
+        return None
+    response = HttpResponse()
+    response["X-Sendfile"] = path
+    return response
+
+
+def file_response(request, field, content_type="application/pdf"):
+    """Serve the file of ``field`` (a ``FieldFile``) for a GET or HEAD request."""
+    disposition = content_disposition_header(False, os.path.basename(field.name))
+    mode = getattr(settings, "REPORT_DOWNLOAD_MODE", "stream")
+    if mode in PROXY_MODES:
+        response = _proxy_response(field, mode)
+        if response is not None:
+            response["Content-Type"] = content_type
+            response["Content-Disposition"] = disposition
+            patch_cache_control(response, private=True)
+            return response
+
+    storage = field.storage
+    info = storage.download_info(field.name)
+    if info is None:
+        raise Http404("El archivo no existe.")
+    size, etag = info["size"], info["etag"]
+    last_modified = int(info["last_modified"])
+
+    headers = HttpResponse()
+    headers["ETag"] = etag
+    headers["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(headers, private=True)
+    conditional = get_conditional_response(request, etag, last_modified, headers)
+    if conditional is not headers:
+        return conditional
+
+    start, end, status = 0, size - 1, 200
+    if "Range" in request.headers and _if_range_passes(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers["Range"], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        if byte_range:
+            (start, end), status = byte_range, 206
+
+    if request.method == "HEAD":
+        response = HttpResponse(status=status)
+    else:
+        response = StreamingHttpResponse(
+            storage.stream(field.name, start, end, CHUNK_SIZE, etag=etag),
+            status=status,
+        )
+    for header, value in headers.items():
+        if header != "Content-Type":
+            response[header] = value
+    response["Content-Type"] = content_type
+    response["Content-Disposition"] = disposition
+    response["Content-Length"] = end - start + 1
+    response["Accept-Ranges"] = "bytes"
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
@@ -0,0 +1,465 @@
+"""Bulk import of equipment from CSV or XLSX files.
+
+Each row describes one equipment (type, marca, modelo, serial, dates, client,
+sede...). Rows are validated in memory: equipment types, clients (by NIT or
+username) and their branches are loaded once into dictionaries instead of being
+queried per row. Valid rows are then upserted on ``serial`` with
+``bulk_create(update_conflicts=True)``, in batches, inside one transaction:
+new serials are created and existing ones get the cells filled in their row
+updated. A blank cell keeps the stored value, so a partly filled spreadsheet
+does not erase data; the stored rows of each batch are loaded and merged into
+the imported ones. A new client without a sede clears the previous client's
+sede. Invalid rows are skipped and reported with their row number.
+
+``bulk_create`` does not send ``post_save``, so the import moves the quality
+control rollups itself: one day up for each new date, one down for each
+replaced one, applied in a single upsert at the end.
+
+Backs the ``import_equipment`` command and ``EquiposImportView``.
+"""
+
+import csv
+import datetime
+import io
+import re
+import unicodedata
+import zipfile
+from xml.etree import ElementTree
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import stats
+from .models import (
+    ClientBranch,
+    ClientProfile,
+    Equipment,
+    EquipmentType,
+    EstadoEquipoChoices,
+    RoleChoices,
+    User,
+)
+
+BATCH_SIZE = 1000
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+_EXCEL_EPOCH = datetime.date(1899, 12, 30)
+
+# Normalized header -> column. Headers are compared without accents, case and
+# filler words, so "Fecha de Adquisición" and "fecha_adquisicion" both match.
+HEADER_ALIASES = {
+    "tipo": "equipment_type",
+    "tipo_equipo": "equipment_type",
+    "equipment_type": "equipment_type",
+    "nombre": "nombre",
+    "marca": "marca",
+    "modelo": "modelo",
+    "serial": "serial",
+    "practica_asociada": "practica_asociada",
+    "adquisicion": "fecha_adquisicion",
+    "vigencia_licencia": "fecha_vigencia_licencia",
+    "ultimo_control_calidad": "fecha_ultimo_control_calidad",
+    "vencimiento_control_calidad": "fecha_vencimiento_control_calidad",
+    "estado": "estado_actual",
+    "estado_actual": "estado_actual",
+    "cliente": "user",
+    "nit": "user",
+    "usuario": "user",
+    "user": "user",
+    "sede": "sede",
+}
+DATE_FIELDS = (
+    "fecha_adquisicion",
+    "fecha_vigencia_licencia",
+    "fecha_ultimo_control_calidad",
+    "fecha_vencimiento_control_calidad",
+)
+TEXT_FIELDS = ("nombre", "marca", "modelo", "practica_asociada")
+_FILLER_WORDS = {"de", "del", "la", "el", "fecha"}
+
+
+class ImportFileError(Exception):
+    """The file cannot be read as an equipment import."""
+
+
+def normalize_header(header):
+    text = unicodedata.normalize("NFKD", str(header or ""))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    words = re.split(r"[^a-z0-9]+", text.lower())
+    return "_".join(word for word in words if word and word not in _FILLER_WORDS)
+
+
+def _normalize_key(value):
+    return str(value).strip().casefold()
+
+
+# Reading ---------------------------------------------------------------------
+
+
+def read_csv(file):
+    """Yield the rows of a CSV file (``,`` or ``;`` separated) as lists."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    try:
+        yield from csv.reader(text, dialect)
+    except UnicodeDecodeError:
+        raise ImportFileError("El archivo CSV debe estar codificado en UTF-8.")
+    finally:
+        text.detach()
+
+
+_SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _column_index(reference):
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord("A") + 1
+    return index - 1
+
+
+def _first_sheet_path(workbook):
+    root = ElementTree.fromstring(workbook.read("xl/workbook.xml"))
+    sheet = root.find(f"{_SHEET_NS}sheets/{_SHEET_NS}sheet")
+    rel_id = sheet.get(f"{_REL_NS}id")
+    rels = ElementTree.fromstring(workbook.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(f"{_PACKAGE_REL_NS}Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target").lstrip("/")
+            return target if target.startswith("xl/") else f"xl/{target}"
+    raise ImportFileError("El libro no tiene hojas.")
+
+
+def read_xlsx(file):
+    """Yield the rows of the first sheet of an XLSX workbook as lists.
+
+    Numbers are returned as strings, as they are stored; the date columns
+    convert Excel serial numbers themselves. The sheet is parsed
+    incrementally, so large files are not loaded as a tree.
+    """
+    try:
+        workbook = zipfile.ZipFile(file)
+        sheet_path = _first_sheet_path(workbook)
+    except (zipfile.BadZipFile, KeyError, AttributeError, ElementTree.ParseError):
+        raise ImportFileError("El archivo no es un libro de Excel (.xlsx) válido.")
+
+    shared_strings = []
+    if "xl/sharedStrings.xml" in workbook.namelist():
+        with workbook.open("xl/sharedStrings.xml") as source:
+            for _, element in ElementTree.iterparse(source):
+                if element.tag == f"{_SHEET_NS}si":
+                    shared_strings.append(
+                        "".join(
+                            text.text or "" for text in element.iter(f"{_SHEET_NS}t")
+                        )
+                    )
+                    element.clear()
+
+    with workbook.open(sheet_path) as source:
+        for _, element in ElementTree.iterparse(source):
+            if element.tag != f"{_SHEET_NS}row":
+                continue
+            row = []
+            for position, cell in enumerate(element.iter(f"{_SHEET_NS}c")):
+                index = _column_index(cell.get("r", "")) if cell.get("r") else position
+                row.extend([""] * (index - len(row)))
+                cell_type = cell.get("t")
+                value = cell.find(f"{_SHEET_NS}v")
+                if cell_type == "inlineStr":
+                    text = "".join(t.text or "" for t in cell.iter(f"{_SHEET_NS}t"))
+                elif value is None:
+                    text = ""
+                elif cell_type == "s":
+                    text = shared_strings[int(value.text)]
+                else:
+                    text = value.text or ""
+                row.append(text)
+            element.clear()
+            yield row
+
+
+def read_rows(file, filename):
+    """Yield the rows of ``file`` (CSV or XLSX, by extension) as lists."""
+    if filename.lower().endswith(".xlsx"):
+        return read_xlsx(file)
+    if filename.lower().endswith(".csv"):
+        return read_csv(file)
+    raise ImportFileError("Formato no soportado: use un archivo .csv o .xlsx.")
+
+
+# Validation ------------------------------------------------------------------
+
+
+class RowError:
+    """A problem with one row of the file (``row`` counts the header as 1)."""
+
+    def __init__(self, row, column, message):
+        self.row = row
+        self.column = column
+        self.message = message
+
+    def __str__(self):
+        return f"Fila {self.row} ({self.column}): {self.message}"
+
+
+class ImportResult:
+    """Outcome of an import: counts and the per-row error report."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.total = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.dry_run = False
+
+    @property
+    def error_rows(self):
+        return len({error.row for error in self.errors})
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+
+class Lookups:
+    """In-memory maps from file values to equipment types, clients and branches."""
+
+    def __init__(self):
+        self.equipment_types = {
+            _normalize_key(name): pk
+            for pk, name in EquipmentType.objects.values_list("pk", "name")
+        }
+        clients = User.objects.filter(roles__name=RoleChoices.CLIENTE)
+        self.clients = {
+            _normalize_key(username): pk
+            for pk, username in clients.values_list("pk", "username")
+        }
+        # El NIT tiene prioridad sobre un username igual
+        self.clients.update(
+            {
+                _normalize_key(nit): user_id
+                for user_id, nit in ClientProfile.objects.filter(
+                    user__in=clients
+                ).values_list("user_id", "nit")
+            }
+        )
+        self.branches = {
+            (company_id, _normalize_key(nombre)): pk
+            for pk, company_id, nombre in ClientBranch.objects.values_list(
+                "pk", "company_id", "nombre"
+            )
+        }
+
+
+def _parse_date(value):
+    value = value.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    try:
+        # Fechas de Excel: número de días desde 1899-12-30
+        serial = float(value)
+    except ValueError:
+        raise ValidationError("Fecha inválida; use AAAA-MM-DD o DD/MM/AAAA.")
+    if not 1 <= serial < 2958466:
+        raise ValidationError("Fecha inválida; use AAAA-MM-DD o DD/MM/AAAA.")
+    return _EXCEL_EPOCH + datetime.timedelta(days=int(serial))
+
+
+_ESTADOS = {
+    **{_normalize_key(value): value for value in EstadoEquipoChoices.values},
+    **{_normalize_key(label): value for value, label in EstadoEquipoChoices.choices},
+}
+
+
+def build_equipment(values, lookups):
+    """Return ``(Equipment, {column: message})`` for one row of ``values``."""
+    equipment = Equipment()
+    errors = {}
+
+    serial = values.get("serial", "").strip()
+    if not serial:
+        errors["serial"] = "El serial es obligatorio."
+    equipment.serial = serial
+
+    for name in TEXT_FIELDS:
+        if name not in values:
+            continue
+        try:
+            value = values[name].strip()
+            field = Equipment._meta.get_field(name)
+            setattr(equipment, name, field.clean(value or field.get_default(), None))
+        except ValidationError as error:
+            errors[name] = " ".join(error.messages)
+    if len(serial) > Equipment._meta.get_field("serial").max_length:
+        errors["serial"] = "El serial es demasiado largo."
+
+    for name in DATE_FIELDS:
+        value = values.get(name, "").strip()
+        if not value:
+            continue
+        try:
+            setattr(equipment, name, _parse_date(value))
+        except ValidationError as error:
+            errors[name] = " ".join(error.messages)
+
+    if values.get("estado_actual", "").strip():
+        estado = _ESTADOS.get(_normalize_key(values["estado_actual"]))
+        if estado is None:
+            errors["estado_actual"] = "Estado desconocido."
+        equipment.estado_actual = estado or equipment.estado_actual
+
+    if values.get("equipment_type", "").strip():
+        equipment.equipment_type_id = lookups.equipment_types.get(
+            _normalize_key(values["equipment_type"])
+        )
+        if equipment.equipment_type_id is None:
+            errors["equipment_type"] = "Tipo de equipo no encontrado."
+
+    if values.get("user", "").strip():
+        equipment.user_id = lookups.clients.get(_normalize_key(values["user"]))
+        if equipment.user_id is None:
+            errors["user"] = "Cliente no encontrado (NIT o usuario)."
+
+    if values.get("sede", "").strip():
+        if not equipment.user_id:
+            errors.setdefault("sede", "La sede requiere un cliente válido.")
+        else:
+            equipment.sede_id = lookups.branches.get(
+                (equipment.user_id, _normalize_key(values["sede"]))
+            )
+            if equipment.sede_id is None:
+                errors["sede"] = "Sede no encontrada para el cliente."
+
+    return equipment, errors
+
+
+# Import ----------------------------------------------------------------------
+
+
+def _merge_existing(equipment, filled, current, update_fields):
+    """Keep the stored value of ``current`` for the columns left blank."""
+    for name in update_fields:
+        if name not in filled:
+            attname = Equipment._meta.get_field(name).attname
+            setattr(equipment, attname, getattr(current, attname))
+    if "user" in filled and "sede" not in filled:
+        if equipment.user_id != current.user_id:
+            # La sede guardada pertenece al cliente anterior
+            equipment.sede_id = None
+
+
+def _upsert(rows, update_fields, result, dry_run):
+    """Create or update the ``(equipment, filled columns)`` in ``rows``.
+
+    Returns the ``(fecha, delta)`` changes for the quality control stats.
+    """
+    existing = Equipment.objects.only(
+        "serial", "fecha_ultimo_control_calidad", *update_fields
+    ).in_bulk([equipment.serial for equipment, _ in rows], field_name="serial")
+    result.updated += len(existing)
+    result.created += len(rows) - len(existing)
+    if dry_run:
+        return []
+    for equipment, filled in rows:
+        if equipment.serial in existing:
+            _merge_existing(
+                equipment, filled, existing[equipment.serial], update_fields
+            )
+    batch = [equipment for equipment, _ in rows]
+    if update_fields:
+        Equipment.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=["serial"],
+            update_fields=update_fields,
+        )
+    else:
+        # Only serials in the file: nothing to update, create the missing ones
+        Equipment.objects.bulk_create(batch, ignore_conflicts=True)
+
+    changes = []
+    for equipment in batch:
+        current = existing.get(equipment.serial)
+        if current is None:
+            changes.append((equipment.fecha_ultimo_control_calidad, 1))
+        elif current.fecha_ultimo_control_calidad != (
+            equipment.fecha_ultimo_control_calidad
+        ):
+            changes.append((current.fecha_ultimo_control_calidad, -1))
+            changes.append((equipment.fecha_ultimo_control_calidad, 1))
+    return changes
+
+
+def import_equipment(rows, dry_run=False, batch_size=BATCH_SIZE):
+    """Validate and upsert the equipment in ``rows`` (header row first).
+
+    Returns an ``ImportResult``. With ``dry_run`` nothing is written; the
+    result holds the validation errors and what would be created or updated.
+    """
+    rows = iter(rows)
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise ImportFileError("El archivo está vacío.")
+    columns = [HEADER_ALIASES.get(normalize_header(name)) for name in header]
+    known_columns = [column for column in columns if column]
+    if "serial" not in known_columns:
+        raise ImportFileError("Falta la columna 'serial'.")
+
+    result = ImportResult(known_columns)
+    result.dry_run = dry_run
+    # Se actualizan solo las columnas presentes en el archivo; al cambiar de
+    # cliente también la sede, que puede quedar vacía
+    update_fields = {column for column in known_columns if column != "serial"}
+    if "user" in update_fields:
+        update_fields.add("sede")
+    update_fields = sorted(update_fields)
+    lookups = Lookups()
+    seen_serials = {}
+    valid = []
+
+    for number, row in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in row):
+            continue
+        result.total += 1
+        values = {}
+        for column, value in zip(columns, row):
+            # Varias cabeceras pueden ir a la misma columna (p. ej. NIT y usuario)
+            if column and (str(value).strip() or column not in values):
+                values[column] = str(value)
+        equipment, errors = build_equipment(values, lookups)
+        serial = equipment.serial
+        if serial and serial in seen_serials:
+            errors.setdefault(
+                "serial",
+                f"Serial repetido (ya aparece en la fila {seen_serials[serial]}).",
+            )
+        elif serial:
+            seen_serials[serial] = number
+        if errors:
+            result.errors.extend(
+                RowError(number, column, message) for column, message in errors.items()
+            )
+            continue
+        filled = {column for column, value in values.items() if value.strip()}
+        valid.append((equipment, filled))
+
+    stats_changes = []
+    with transaction.atomic():
+        for start in range(0, len(valid), batch_size):
+            batch = valid[start : start + batch_size]
+            stats_changes += _upsert(batch, update_fields, result, dry_run)
+        stats.update_quality_control_stats(stats_changes)
+    return result
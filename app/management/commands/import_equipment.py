@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.equipment_import import ImportFileError, import_equipment, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports equipment from a CSV or XLSX file, creating new serials and "
+        "updating existing ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the .csv or .xlsx file.")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate the file without saving anything.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            with open(path, "rb") as file:
+                result = import_equipment(
+                    read_rows(file, path), dry_run=options["dry_run"]
+                )
+        except OSError as error:
+            raise CommandError(f"No se pudo abrir el archivo: {error}")
+        except ImportFileError as error:
+            raise CommandError(str(error))
+
+        for error in result.errors:
+            self.stderr.write(str(error))
+        prefix = "Validación (sin guardar)" if result.dry_run else "Importación"
+        summary = (
+            f"{prefix}: {result.total} filas, {result.created} equipos nuevos, "
+            f"{result.updated} actualizados, {result.error_rows} filas con errores."
+        )
+        style = self.style.WARNING if result.errors else self.style.SUCCESS
+        self.stdout.write(style(summary))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app.stats import rebuild_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the dashboard statistics tables from the process and equipment data."
+    )
+
+    def handle(self, *args, **options):
+        process_rows, quality_control_rows = rebuild_all()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Estadísticas reconstruidas: {process_rows} filas de procesos, "
+                f"{quality_control_rows} filas de controles de calidad."
+            )
+        )
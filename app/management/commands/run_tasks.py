@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import tasks
+
+
+class Command(BaseCommand):
+    help = "Runs the queued background tasks (emails...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the tasks that are due and exit instead of polling.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Tasks claimed per query.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                count = tasks.run_pending(options["batch_size"])
+                total += count
+                if not count:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Tareas ejecutadas: {total}."))
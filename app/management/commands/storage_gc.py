@@ -0,0 +1,83 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import storage_gc
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the files of deleted reports from storage in batches and, with "
+        "--scan, finds stored files no report refers to."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Delete the files that are due and exit instead of polling.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=storage_gc.BATCH_SIZE,
+            help="Files deleted per storage request (S3 accepts up to 1000).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=30.0,
+            help="Seconds to wait when there is nothing to delete.",
+        )
+        parser.add_argument(
+            "--scan",
+            action="store_true",
+            help="List the stored report files, queue the orphaned ones and exit.",
+        )
+        parser.add_argument(
+            "--min-age-hours",
+            type=float,
+            default=storage_gc.ORPHAN_MIN_AGE.total_seconds() / 3600,
+            help="With --scan, ignore files modified more recently than this.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="With --scan, only print the orphaned files.",
+        )
+
+    def handle(self, *args, **options):
+        if options["scan"]:
+            self.scan(options)
+            return
+
+        total = 0
+        try:
+            while True:
+                count = storage_gc.drain(options["batch_size"])
+                total += count
+                if not count:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Borrados procesados: {total}."))
+
+    def scan(self, options):
+        min_age = datetime.timedelta(hours=options["min_age_hours"])
+        found, pending = 0, []
+        for name in storage_gc.find_orphans(min_age=min_age):
+            self.stdout.write(name)
+            found += 1
+            pending.append(name)
+            if len(pending) >= options["batch_size"] and not options["dry_run"]:
+                storage_gc.queue_deletion(pending)
+                pending = []
+        if options["dry_run"]:
+            message = f"Archivos huérfanos: {found} (no se encolaron)."
+        else:
+            storage_gc.queue_deletion(pending)
+            message = f"Archivos huérfanos encolados para borrar: {found}."
+        self.stdout.write(self.style.SUCCESS(message))
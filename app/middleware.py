@@ -0,0 +1,97 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from app.query_budget import QueryBudgetExceeded, get_budget, record_queries
+
+logger = logging.getLogger(__name__)
+
+SESSION_REFRESHED_AT_KEY = "_session_refreshed_at"
+
+
+def _now():
+    """Current Unix time in seconds (patched by the tests)."""
+    return int(time.time())
+
+
+class ThrottledSessionRefreshMiddleware:
+    """Slide the session expiry at most once every N minutes.
+
+    Replaces ``SESSION_SAVE_EVERY_REQUEST``: instead of writing the session on
+    every page view, the session is marked as modified (and therefore saved with
+    a fresh ``SESSION_COOKIE_AGE``) only when more than
+    ``SESSION_REFRESH_INTERVAL_MINUTES`` have passed since the last refresh.
+    With an interval of 0 the middleware does nothing.
+
+    Must be placed after ``SessionMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        self.refresh_if_due(request)
+        return response
+
+    def refresh_if_due(self, request):
+        interval = getattr(settings, "SESSION_REFRESH_INTERVAL_MINUTES", 0) * 60
+        session = getattr(request, "session", None)
+        if not interval or session is None or session.session_key is None:
+            return
+        if session.is_empty():
+            # Anonymous visitors without session data should not get a session
+            return
+
+        now = _now()
+        refreshed_at = session.get(SESSION_REFRESHED_AT_KEY, 0)
+        if now - refreshed_at >= interval:
+            # Setting a key marks the session as modified, so SessionMiddleware
+            # saves it and re-issues the cookie with a new expiry.
+            session[SESSION_REFRESHED_AT_KEY] = now
+
+
+class QueryBudgetMiddleware:
+    """Record the SQL of each request and compare it with its query budget.
+
+    Logs the query count, total SQL time and repeated query fingerprints of
+    every request. When the URL name has a budget for the request method
+    (``app.query_budget``) and the request exceeds it, logs a warning or, with
+    ``QUERY_BUDGET_RAISE``, raises ``QueryBudgetExceeded``. Meant for dev/CI:
+    it is only installed when ``QUERY_BUDGET_ENABLED`` is set.
+
+    Recording stops when ``get_response`` returns, so the queries a streaming
+    response runs while it is consumed (the CSV/XLSX exports) are not counted.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_BUDGET_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        url_name = match.url_name if match else None
+        budget = get_budget(url_name, request.method)
+        logger.debug(
+            "%s %s (%s): %s",
+            request.method,
+            request.path,
+            url_name,
+            recorder.summary(),
+        )
+
+        if budget is not None and recorder.count > budget:
+            message = (
+                f"{request.method} {request.path} ({url_name}) exceeded its query "
+                f"budget of {budget}: {recorder.summary()}"
+            )
+            if getattr(settings, "QUERY_BUDGET_RAISE", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,113 @@
+# Generated by Django 5.2 on 2026-10-18 03:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_dashboard_stats(apps, schema_editor):
+    """Fill the new rollup tables from the existing processes and equipment."""
+    from app.stats import rebuild_all
+
+    rebuild_all(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0034_populate_niveles_referencia_checklist"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QualityControlDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateField(unique=True)),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Estadística Diaria de Controles de Calidad",
+                "verbose_name_plural": "Estadísticas Diarias de Controles de Calidad",
+            },
+        ),
+        migrations.CreateModel(
+            name="ProcessDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateField(blank=True, null=True)),
+                (
+                    "process_type",
+                    models.CharField(
+                        choices=[
+                            ("calculo_blindajes", "Cálculo de Blindajes"),
+                            ("control_calidad", "Control de Calidad"),
+                            ("estudio_ambiental", "Estudio Ambiental"),
+                            ("niveles_de_referencia", "Niveles de Referencia"),
+                            ("asesoria", "Asesoría"),
+                            ("otro", "Otro"),
+                        ],
+                        max_length=25,
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("en_progreso", "En Progreso"),
+                            ("en_revision", "En Revisión"),
+                            ("radicado", "Radicado"),
+                            ("finalizado", "Finalizado"),
+                            ("en_modificacion", "En Modificación"),
+                            ("en_espera_administrativa", "En Espera Administrativa"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "assigned_to",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Estadística Diaria de Procesos",
+                "verbose_name_plural": "Estadísticas Diarias de Procesos",
+                "indexes": [
+                    models.Index(
+                        fields=["estado", "fecha"], name="app_process_estado_f8f6a6_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("fecha", "process_type", "estado", "assigned_to"),
+                        name="processdailystat_key_uniq",
+                        nulls_distinct=False,
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_dashboard_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Columns searched through app.search, per table
+TRIGRAM_INDEXES = {
+    "app_equipment": ("serial", "marca", "modelo", "nombre"),
+    "app_report": ("title", "description"),
+    "app_clientprofile": ("razon_social", "nit"),
+    "app_user": ("username", "first_name", "last_name"),
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Index UPPER(column) with pg_trgm so icontains stops scanning the tables.
+
+    The expression matches what Django generates for ``icontains`` on
+    PostgreSQL. Other databases are skipped.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, columns in TRIGRAM_INDEXES.items():
+        for column in columns:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{table}_{column}_trgm" ON "{table}" '
+                f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, columns in TRIGRAM_INDEXES.items():
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_{column}_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0035_dashboard_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
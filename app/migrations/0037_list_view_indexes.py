@@ -0,0 +1,96 @@
+# Generated by Django 5.2 on 2026-10-18 03:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0036_search_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["fecha_adquisicion"], name="equipment_adquisicion_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["fecha_vigencia_licencia"], name="equipment_licencia_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["fecha_ultimo_control_calidad"], name="equipment_ultimo_cc_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["fecha_vencimiento_control_calidad"],
+                name="equipment_venc_cc_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["user", "fecha_vigencia_licencia"],
+                name="equipment_user_licencia_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["user", "fecha_vencimiento_control_calidad"],
+                name="equipment_user_venc_cc_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="process",
+            index=models.Index(
+                fields=["-fecha_inicio"], name="process_fecha_inicio_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="process",
+            index=models.Index(
+                fields=["estado", "-fecha_inicio"], name="process_estado_inicio_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="process",
+            index=models.Index(
+                condition=models.Q(("estado", "finalizado"), _negated=True),
+                fields=["fecha_final"],
+                name="process_active_final_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="process",
+            index=models.Index(
+                condition=models.Q(("estado", "finalizado"), _negated=True),
+                fields=["user", "-fecha_inicio"],
+                name="process_active_user_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="processstatuslog",
+            index=models.Index(
+                fields=["proceso", "-fecha_cambio"], name="processlog_proceso_fecha_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="report",
+            index=models.Index(fields=["-created_at"], name="report_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="report",
+            index=models.Index(
+                fields=["user", "-created_at"], name="report_user_created_idx"
+            ),
+        ),
+    ]
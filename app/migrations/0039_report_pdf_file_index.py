@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0038_task_queue"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="report",
+            index=models.Index(fields=["pdf_file"], name="report_pdf_file_idx"),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 04:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0039_report_pdf_file_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileDeletion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                (
+                    "delete_after",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Archivo por Borrar",
+                "verbose_name_plural": "Archivos por Borrar",
+                "indexes": [
+                    models.Index(fields=["delete_after"], name="filedeletion_due_idx"),
+                    models.Index(fields=["name"], name="filedeletion_name_idx"),
+                ],
+            },
+        ),
+    ]
@@ -1,10 +1,90 @@
+import datetime
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, TruncDate
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
-from app.storage import PDFStorage
+from app import auth_cache
+from app.date_ranges import start_of_day
+from app.storage import PDFStorage, blob_digest, lock_blobs
+
+
+class TrackedFieldsMixin:
+    """Remember the stored value of ``tracked_fields`` to detect changes on save.
+
+    Values are snapshotted when the instance is loaded (``from_db``), refreshed
+    (``refresh_from_db``) and saved, so ``save()`` overrides can compare the old
+    and new values without re-reading the row. With ``update_fields``, only the
+    saved fields count as changed and only their snapshot is refreshed.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_tracked_fields(fields)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get("update_fields"))
+
+    def _current_tracked_value(self, field_name):
+        value = self.__dict__[self._meta.get_field(field_name).attname]
+        # FileFields hold a FieldFile once accessed; compare by stored name
+        return value.name if isinstance(value, models.fields.files.FieldFile) else value
+
+    def _snapshot_tracked_fields(self, fields=None):
+        loaded = self.__dict__.setdefault("_loaded_values", {})
+        for field_name in self.tracked_fields:
+            if fields is not None and field_name not in fields:
+                continue
+            if self._meta.get_field(field_name).attname in self.__dict__:
+                loaded[field_name] = self._current_tracked_value(field_name)
+
+    def get_loaded_value(self, field_name):
+        """Return the value of ``field_name`` as last read from or written to the DB.
+
+        Returns ``None`` for unsaved instances. Falls back to a query only when
+        the field was deferred or the instance was never loaded (e.g. created
+        with ``bulk_create``).
+        """
+        if self._state.adding:
+            return None
+        loaded = self.__dict__.setdefault("_loaded_values", {})
+        if field_name not in loaded:
+            attname = self._meta.get_field(field_name).attname
+            loaded[field_name] = (
+                type(self)
+                ._base_manager.using(self._state.db)
+                .filter(pk=self.pk)
+                .values_list(attname, flat=True)
+                .first()
+            )
+        return loaded[field_name]
+
+    def has_changed(self, field_name, update_fields=None):
+        """Return True if saving would write a new value for ``field_name``."""
+        if update_fields is not None and field_name not in update_fields:
+            return False
+        if self._meta.get_field(field_name).attname not in self.__dict__:
+            return False  # Deferred and never assigned
+        return self.get_loaded_value(field_name) != self._current_tracked_value(
+            field_name
+        )
 
 
 class RoleChoices(models.TextChoices):
@@ -29,6 +109,40 @@ class User(AbstractUser):
     # Add fields for internal users if they are not covered by AbstractUser
     # For example, 'perfil' is essentially covered by 'roles'
 
+    @cached_property
+    def role_names(self):
+        """Return the names of the user's roles, loaded once per instance.
+
+        ``request.user`` is rebuilt on every request, so this acts as a
+        request-scoped cache: every role check in a request shares one query.
+        Across requests the names come from the shared auth cache.
+        """
+        return auth_cache.get_role_names(self)
+
+    def has_role(self, *role_names):
+        """Return True if the user has at least one of the given roles."""
+        return not self.role_names.isdisjoint(role_names)
+
+    def clear_role_cache(self):
+        """Forget the cached role names so the next check reloads them."""
+        self.__dict__.pop("role_names", None)
+
+    @property
+    def is_cliente(self):
+        return self.has_role(RoleChoices.CLIENTE)
+
+    @property
+    def is_gerente(self):
+        return self.has_role(RoleChoices.GERENTE)
+
+    @property
+    def is_interno(self):
+        return self.has_role(
+            RoleChoices.DIRECTOR_TECNICO,
+            RoleChoices.PERSONAL_TECNICO_APOYO,
+            RoleChoices.PERSONAL_ADMINISTRATIVO,
+        )
+
     def __str__(self):
 
         if self.first_name and self.last_name:
@@ -110,7 +224,121 @@ class ProcessStatusChoices(models.TextChoices):
     )
 
 
-class Process(models.Model):
+class DaysBetween(models.Func):
+    """Whole days from ``start`` to ``end`` (both dates), as an integer."""
+
+    arg_joiner = " - "
+    template = "(%(expressions)s)"
+    output_field = models.IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+
+class DeadlineBucket(models.TextChoices):
+    VENCIDO = "vencido", _("Vencido")
+    PROXIMO = "proximo", _("Próximo a Vencer")
+    EN_PROGRESO = "en_progreso", _("En Progreso")
+
+
+class ProcessQuerySet(models.QuerySet):
+    def with_progress(self):
+        """Annotate each process with its checklist progress as ``progress_percentage``.
+
+        The sum of the approved items' percentages is computed in a single
+        correlated subquery, so a page of processes costs one query instead of
+        two per row when the template calls ``get_progress_percentage``.
+        """
+        approved_percentage = (
+            ProcessChecklistItem.objects.filter(
+                process=models.OuterRef("pk"),
+                status=ChecklistItemStatusChoices.APROBADO,
+            )
+            .order_by()
+            .values("process")
+            .annotate(total=models.Sum("definition__percentage"))
+            .values("total")
+        )
+        return self.annotate(
+            progress_percentage=Coalesce(
+                models.Subquery(approved_percentage), models.Value(0)
+            )
+        )
+
+    @staticmethod
+    def deadline_bucket_conditions(today, dias_proximos):
+        """Return ``{bucket: Q}`` over the raw ``fecha_final`` column."""
+        start_of_today = start_of_day(today)
+        end_of_proximos = start_of_day(today, dias_proximos + 1)
+        return {
+            DeadlineBucket.VENCIDO: models.Q(fecha_final__lt=start_of_today),
+            DeadlineBucket.PROXIMO: models.Q(
+                fecha_final__gte=start_of_today, fecha_final__lt=end_of_proximos
+            ),
+            DeadlineBucket.EN_PROGRESO: models.Q(fecha_final__isnull=True)
+            | models.Q(fecha_final__gte=end_of_proximos),
+        }
+
+    def in_deadline_bucket(self, bucket, today=None, dias_proximos=30):
+        """Filter the processes of one deadline bucket.
+
+        Same buckets as ``with_deadline_bucket()``, but filtering on
+        ``fecha_final`` ranges instead of the ``CASE`` annotation, so the
+        active-process index on ``fecha_final`` can be used.
+        """
+        today = today or timezone.localdate()
+        return self.filter(
+            self.deadline_bucket_conditions(today, dias_proximos)[bucket]
+        )
+
+    def with_deadline_bucket(self, today=None, dias_proximos=30):
+        """Annotate each process with ``deadline_bucket`` and ``dias_vencido``.
+
+        Processes whose ``fecha_final`` falls before ``today`` are "vencido",
+        within the next ``dias_proximos`` days "proximo", and the rest
+        (including those without ``fecha_final``) "en_progreso". Dates are
+        local dates; the comparisons use the raw column so they can use an index.
+        """
+        today = today or timezone.localdate()
+        conditions = self.deadline_bucket_conditions(today, dias_proximos)
+        vencido = conditions[DeadlineBucket.VENCIDO]
+        return self.annotate(
+            deadline_bucket=models.Case(
+                models.When(vencido, then=models.Value(DeadlineBucket.VENCIDO)),
+                models.When(
+                    conditions[DeadlineBucket.PROXIMO],
+                    then=models.Value(DeadlineBucket.PROXIMO),
+                ),
+                default=models.Value(DeadlineBucket.EN_PROGRESO),
+                output_field=models.CharField(),
+            ),
+            dias_vencido=models.Case(
+                models.When(
+                    vencido,
+                    then=DaysBetween(
+                        models.Value(today, output_field=models.DateField()),
+                        TruncDate("fecha_final"),
+                    ),
+                ),
+                default=None,
+                output_field=models.IntegerField(),
+            ),
+        )
+
+    def deadline_bucket_counts(self):
+        """Count processes per deadline bucket in a single aggregate query.
+
+        Requires ``with_deadline_bucket()``. Returns ``{bucket: count}``.
+        """
+        return self.aggregate(
+            **{
+                bucket: models.Count("pk", filter=models.Q(deadline_bucket=bucket))
+                for bucket in DeadlineBucket.values
+            }
+        )
+
+
+class Process(TrackedFieldsMixin, models.Model):
     process_type = models.CharField(
         max_length=25,
         choices=ProcessTypeChoices.choices,
@@ -148,6 +376,30 @@ class Process(models.Model):
     )
     fecha_final = models.DateTimeField(null=True, blank=True)
 
+    objects = ProcessQuerySet.as_manager()
+
+    tracked_fields = ("fecha_final", "process_type", "estado")
+
+    class Meta:
+        indexes = [
+            # Listado interno: orden por defecto y filtro por estado
+            models.Index(fields=["-fecha_inicio"], name="process_fecha_inicio_idx"),
+            models.Index(
+                fields=["estado", "-fecha_inicio"], name="process_estado_inicio_idx"
+            ),
+            # Dashboards: procesos activos por fecha límite y por cliente
+            models.Index(
+                fields=["fecha_final"],
+                condition=~models.Q(estado=ProcessStatusChoices.FINALIZADO),
+                name="process_active_final_idx",
+            ),
+            models.Index(
+                fields=["user", "-fecha_inicio"],
+                condition=~models.Q(estado=ProcessStatusChoices.FINALIZADO),
+                name="process_active_user_idx",
+            ),
+        ]
+
     def clean(self):
         super().clean()
         if self.pk and self.assigned_to.count() > 3:
@@ -158,14 +410,11 @@ class Process(models.Model):
     def save(self, *args, **kwargs):
         user_who_modified = kwargs.pop("user_who_modified", None)
         is_new = self._state.adding
-        old_estado = None
-
-        if not is_new:
-            try:
-                old_instance = Process.objects.get(pk=self.pk)
-                old_estado = old_instance.estado
-            except Process.DoesNotExist:
-                old_estado = None
+        # Compared against the snapshot taken at load time, no extra query
+        estado_changed = not is_new and self.has_changed(
+            "estado", kwargs.get("update_fields")
+        )
+        old_estado = self.get_loaded_value("estado")
 
         super().save(*args, **kwargs)  # Save the process instance
 
@@ -176,8 +425,9 @@ class Process(models.Model):
                 estado_nuevo=self.estado,
                 usuario_modifico=user_who_modified,
             )
-            self._create_checklist_items()
-        elif old_estado != self.estado:  # Existing instance and 'estado' has changed
+            # A brand-new process has no items yet, skip the existence check
+            self._create_checklist_items(check_existing=False)
+        elif estado_changed:
             ProcessStatusLog.objects.create(
                 proceso=self,
                 estado_anterior=old_estado,
@@ -187,22 +437,42 @@ class Process(models.Model):
             if self.estado == ProcessStatusChoices.EN_MODIFICACION.value:
                 self._reset_checklist_items()
             # If checklist items don't exist (e.g. for older processes) and not entering modification, create them.
-            elif not self.checklist_items.exists():
+            else:
                 self._create_checklist_items()
 
-    def _create_checklist_items(self):
-        """Create checklist items for this process based on its type and practice category if they don't already exist."""
-        if not self.checklist_items.exists():
-            filter_kwargs = {"process_type": self.process_type}
-            # Only filter by practice_category if the process type requires it
-            if self.process_type in [
-                ProcessTypeChoices.ASESORIA,
-                ProcessTypeChoices.ESTUDIO_AMBIENTAL,
-            ]:
-                filter_kwargs["practice_category"] = self.practice_category
-            definitions = ChecklistItemDefinition.objects.filter(**filter_kwargs)
-            for definition in definitions:
-                ProcessChecklistItem.objects.create(process=self, definition=definition)
+    def stats_key(self, loaded=False):
+        """Return the ``(fecha, process_type, estado)`` row this process counts in.
+
+        ``fecha`` is the local date of ``fecha_final`` (``None`` when unset).
+        With ``loaded=True`` the key is built from the values stored in the DB.
+        """
+        value = self.get_loaded_value if loaded else partial(getattr, self)
+        fecha = value("fecha_final")
+        process_type = value("process_type")
+        estado = value("estado")
+        if isinstance(fecha, datetime.datetime):
+            # Naive values are stored in the default (local) time zone
+            fecha = (
+                timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+            )
+        return (fecha, process_type, estado)
+
+    def _create_checklist_items(self, check_existing=True):
+        """Create checklist items for this process based on its type and practice category if they don't already exist.
+
+        All items are inserted with a single ``bulk_create``. New items start
+        as pending and, as with ``ProcessChecklistItem.save()``, creating them
+        does not write a status log.
+        """
+        if check_existing and self.checklist_items.exists():
+            return
+        definition_ids = ChecklistItemDefinition.objects.get_ids_for(
+            self.process_type, self.practice_category
+        )
+        ProcessChecklistItem.objects.bulk_create(
+            ProcessChecklistItem(process=self, definition_id=definition_id)
+            for definition_id in definition_ids
+        )
 
     def _reset_checklist_items(self):
         """Reset all checklist items for this process to not completed."""
@@ -214,7 +484,14 @@ class Process(models.Model):
         )
 
     def get_progress_percentage(self):
-        """Calculate the total progress percentage based on completed checklist items."""
+        """Calculate the total progress percentage based on completed checklist items.
+
+        Reuses the ``progress_percentage`` annotation when the instance was
+        loaded through ``Process.objects.with_progress()``.
+        """
+        if hasattr(self, "progress_percentage"):
+            return self.progress_percentage
+
         if not self.checklist_items.exists():
             return 0
 
@@ -250,7 +527,7 @@ class EquipmentType(models.Model):
         return self.name
 
 
-class Equipment(models.Model):
+class Equipment(TrackedFieldsMixin, models.Model):
     equipment_type = models.ForeignKey(
         EquipmentType,
         on_delete=models.PROTECT,
@@ -297,6 +574,9 @@ class Equipment(models.Model):
         help_text=_("Sede a la que pertenece este equipo"),
     )
 
+    # Lets QualityControlDailyStat move the count when the date changes
+    tracked_fields = ("fecha_ultimo_control_calidad",)
+
     def get_report_title(self):
         """Return the title for the reports section.
 
@@ -355,6 +635,31 @@ class Equipment(models.Model):
         permissions = [
             ("manage_equipment", "Can create and edit equipment"),
         ]
+        indexes = [
+            # Filtros de rango del listado de equipos
+            models.Index(
+                fields=["fecha_adquisicion"], name="equipment_adquisicion_idx"
+            ),
+            models.Index(
+                fields=["fecha_vigencia_licencia"], name="equipment_licencia_idx"
+            ),
+            models.Index(
+                fields=["fecha_ultimo_control_calidad"], name="equipment_ultimo_cc_idx"
+            ),
+            models.Index(
+                fields=["fecha_vencimiento_control_calidad"],
+                name="equipment_venc_cc_idx",
+            ),
+            # Dashboard del cliente: vencimientos de sus equipos
+            models.Index(
+                fields=["user", "fecha_vigencia_licencia"],
+                name="equipment_user_licencia_idx",
+            ),
+            models.Index(
+                fields=["user", "fecha_vencimiento_control_calidad"],
+                name="equipment_user_venc_cc_idx",
+            ),
+        ]
 
 
 class HistorialTuboRayosX(models.Model):
@@ -387,7 +692,7 @@ class EstadoReporteChoices(models.TextChoices):
     REQUIERE_CORRECCION = "requiere_correccion", _("Requiere Corrección")
 
 
-class Report(models.Model):
+class Report(TrackedFieldsMixin, models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="reports"
     )  # This user is likely the creator or owner
@@ -418,6 +723,8 @@ class Report(models.Model):
         default=EstadoReporteChoices.EN_GENERACION,
     )
 
+    tracked_fields = ("pdf_file",)
+
     def __str__(self):
         return f"Report by {self.user.first_name}: {self.title}"
 
@@ -426,20 +733,22 @@ class Report(models.Model):
             ("upload_report", "Can upload reports"),
             ("approve_report", "Can approve reports"),
         ]
+        indexes = [
+            # Listado de reportes, ordenado por fecha (todos o los de un cliente)
+            models.Index(fields=["-created_at"], name="report_created_idx"),
+            models.Index(
+                fields=["user", "-created_at"], name="report_user_created_idx"
+            ),
+            # Referencias a un PDF compartido (ver app/storage_gc.py)
+            models.Index(fields=["pdf_file"], name="report_pdf_file_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         user_who_modified = kwargs.pop("user_who_modified", None)
         is_new = self._state.adding
-        old_pdf_file_name = None
-
-        if not is_new:
-            try:
-                # Get the old instance from DB to compare the pdf_file
-                old_instance = Report.objects.get(pk=self.pk)
-                if old_instance.pdf_file:
-                    old_pdf_file_name = old_instance.pdf_file.name
-            except Report.DoesNotExist:
-                pass  # Should not happen on an update but good to be safe
+        update_fields = kwargs.get("update_fields")
+        # Stored file name from the snapshot taken at load time, no extra query
+        old_pdf_file_name = self.get_loaded_value("pdf_file") or None
 
         # Temporarily store the original filename if a new file is being uploaded
         # This is done before super().save() might change self.pdf_file.name
@@ -449,14 +758,35 @@ class Report(models.Model):
         ):
             original_filename = self.pdf_file.name
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if (
+                original_filename
+                and self.pdf_file._committed
+                and blob_digest(self.pdf_file.name)
+            ):
+                # Un PDF ya almacenado (carga directa o contenido repetido): el
+                # bloqueo impide que storage_gc lo borre hasta el commit
+                lock_blobs([self.pdf_file.name])
+                if not self.pdf_file.storage.exists(self.pdf_file.name):
+                    raise ValidationError(
+                        {
+                            "pdf_file": "El archivo ya no está almacenado; "
+                            "vuelva a adjuntarlo."
+                        }
+                    )
+            super().save(*args, **kwargs)
 
         # After saving, get the new pdf_file name
         new_pdf_file_name = self.pdf_file.name if self.pdf_file else None
 
         # Only create an annotation if the instance is being updated (not new)
         # and the file has actually changed.
-        if not is_new and old_pdf_file_name != new_pdf_file_name and self.process:
+        if (
+            not is_new
+            and (update_fields is None or "pdf_file" in update_fields)
+            and old_pdf_file_name != new_pdf_file_name
+            and self.process
+        ):
             # Use the stored original filename for the annotation content
             display_filename = original_filename or (
                 new_pdf_file_name.split("/")[-1] if new_pdf_file_name else ""
@@ -477,17 +807,8 @@ class Report(models.Model):
                 contenido=change_description,
             )
 
-    def delete(self, *args, **kwargs):
-        if self.pdf_file:
-            storage = self.pdf_file.storage
-            file_name = self.pdf_file.name
-
-            super().delete(*args, **kwargs)
-
-            if storage.exists(file_name):
-                storage.delete(file_name)
-        else:
-            super().delete(*args, **kwargs)
+    # El PDF de un reporte borrado (también en cascada, al borrar su usuario o
+    # proceso) se anota en FileDeletion; ver app/signals.py y app/storage_gc.py.
 
 
 class Anotacion(models.Model):
@@ -531,6 +852,55 @@ class ChecklistItemStatusChoices(models.TextChoices):
     RECHAZADO = "rechazado", _("Rechazado")
 
 
+class ChecklistItemDefinitionManager(models.Manager):
+    # Process types whose checklist also depends on the practice category
+    CATEGORIZED_PROCESS_TYPES = (
+        ProcessTypeChoices.ASESORIA,
+        ProcessTypeChoices.ESTUDIO_AMBIENTAL,
+    )
+
+    def _cache_key(self, process_type, practice_category):
+        return f"checklist_definitions:{process_type}:{practice_category}"
+
+    def get_ids_for(self, process_type, practice_category=None):
+        """Return the ordered definition ids for a process type and category.
+
+        The category only matters for ``CATEGORIZED_PROCESS_TYPES``. Results are
+        cached per ``(process_type, practice_category)`` when
+        ``CHECKLIST_DEFINITIONS_CACHE_TIMEOUT`` is set; the cache is cleared by
+        ``invalidate_cache()`` whenever a definition changes.
+        """
+        filter_kwargs = {"process_type": process_type}
+        if process_type in self.CATEGORIZED_PROCESS_TYPES:
+            filter_kwargs["practice_category"] = practice_category
+        else:
+            practice_category = None
+
+        timeout = getattr(settings, "CHECKLIST_DEFINITIONS_CACHE_TIMEOUT", 0)
+        if not timeout:
+            return list(self.filter(**filter_kwargs).values_list("pk", flat=True))
+
+        key = self._cache_key(process_type, practice_category)
+        definition_ids = cache.get(key)
+        if definition_ids is None:
+            definition_ids = list(
+                self.filter(**filter_kwargs).values_list("pk", flat=True)
+            )
+            cache.set(key, definition_ids, timeout=timeout)
+        return definition_ids
+
+    def invalidate_cache(self):
+        """Drop the cached definition ids of every type and category."""
+        categories = [None, *PracticeCategoryChoices.values]
+        cache.delete_many(
+            [
+                self._cache_key(process_type, category)
+                for process_type in ProcessTypeChoices.values
+                for category in categories
+            ]
+        )
+
+
 class ChecklistItemDefinition(models.Model):
     process_type = models.CharField(
         max_length=25,
@@ -548,6 +918,8 @@ class ChecklistItemDefinition(models.Model):
     order = models.PositiveIntegerField(verbose_name=_("Orden"))
     percentage = models.PositiveIntegerField(verbose_name=_("Porcentaje"))
 
+    objects = ChecklistItemDefinitionManager()
+
     class Meta:
         verbose_name = _("Definición de Ítem de Checklist")
         verbose_name_plural = _("Definiciones de Ítems de Checklist")
@@ -561,7 +933,41 @@ class ChecklistItemDefinition(models.Model):
         return f"{self.get_process_type_display()} - {self.name} ({self.percentage}%)"
 
 
-class ProcessChecklistItem(models.Model):
+class ProcessChecklistItemManager(models.Manager):
+    def bulk_save(self, items, fields, user_who_modified=None):
+        """Save existing checklist items with one UPDATE and one log INSERT.
+
+        Batch counterpart of ``ProcessChecklistItem.save()``: derives
+        ``is_completed`` from ``status`` and writes a ``ChecklistItemStatusLog``
+        for every item whose status differs from the loaded one. ``fields`` are
+        the columns to update. Returns the created logs.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        logs = []
+        for item in items:
+            item.is_completed = item.status == ChecklistItemStatusChoices.APROBADO
+            if item.has_changed("status"):
+                logs.append(
+                    ChecklistItemStatusLog(
+                        item=item,
+                        estado_anterior=item.get_loaded_value("status"),
+                        estado_nuevo=item.status,
+                        usuario_modifico=user_who_modified,
+                    )
+                )
+
+        with transaction.atomic(using=self.db):
+            self.bulk_update(items, sorted({*fields, "is_completed"}))
+            ChecklistItemStatusLog.objects.bulk_create(logs)
+        for item in items:
+            item._snapshot_tracked_fields()
+        return logs
+
+
+class ProcessChecklistItem(TrackedFieldsMixin, models.Model):
     process = models.ForeignKey(
         Process, on_delete=models.CASCADE, related_name="checklist_items"
     )
@@ -589,6 +995,10 @@ class ProcessChecklistItem(models.Model):
         related_name="completed_checklist_items",
     )
 
+    objects = ProcessChecklistItemManager()
+
+    tracked_fields = ("status",)
+
     class Meta:
         verbose_name = _("Ítem de Checklist de Proceso")
         verbose_name_plural = _("Ítems de Checklist de Proceso")
@@ -598,26 +1008,22 @@ class ProcessChecklistItem(models.Model):
     def save(self, *args, **kwargs):
         user_who_modified = kwargs.pop("user_who_modified", None)
         is_new = self._state.adding
-        old_status = None
-
-        if not is_new:
-            try:
-                old_status = ProcessChecklistItem.objects.get(pk=self.pk).status
-            except ProcessChecklistItem.DoesNotExist:
-                pass  # Should not happen
-        else:
-            # For new items, old_status should be the initial status to avoid logging creation
-            old_status = self.status
+        update_fields = kwargs.get("update_fields")
+        # New items start with their initial status, creating them is not logged
+        status_changed = not is_new and self.has_changed("status", update_fields)
+        old_status = self.get_loaded_value("status")
 
         # Update is_completed based on status
         self.is_completed = self.status == ChecklistItemStatusChoices.APROBADO
+        if update_fields is not None and "status" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "is_completed"}
 
         super().save(*args, **kwargs)
 
-        if old_status != self.status:
+        if status_changed:
             ChecklistItemStatusLog.objects.create(
                 item=self,
-                estado_anterior=old_status if not is_new else None,
+                estado_anterior=old_status,
                 estado_nuevo=self.status,
                 usuario_modifico=user_who_modified,
             )
@@ -740,3 +1146,143 @@ class ProcessStatusLog(models.Model):
         verbose_name = _("Log de Estado de Proceso")
         verbose_name_plural = _("Logs de Estado de Procesos")
         ordering = ["-fecha_cambio"]
+        indexes = [
+            # Historial de un proceso, más reciente primero
+            models.Index(
+                fields=["proceso", "-fecha_cambio"], name="processlog_proceso_fecha_idx"
+            ),
+        ]
+
+
+class ProcessDailyStat(models.Model):
+    """Pre-aggregated process counts per day, type, state and assignee.
+
+    ``fecha`` is the local date of ``Process.fecha_final``. Rows without
+    ``assigned_to`` count processes; rows with it count that user's assignments.
+    Maintained by ``app.stats`` and rebuilt with ``rebuild_dashboard_stats``.
+    """
+
+    fecha = models.DateField(null=True, blank=True)
+    process_type = models.CharField(max_length=25, choices=ProcessTypeChoices.choices)
+    estado = models.CharField(max_length=30, choices=ProcessStatusChoices.choices)
+    assigned_to = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Estadística Diaria de Procesos")
+        verbose_name_plural = _("Estadísticas Diarias de Procesos")
+        indexes = [
+            models.Index(fields=["estado", "fecha"]),
+        ]
+        constraints = [
+            # Una fila por clave: las actualizaciones concurrentes hacen upsert
+            # (ver app.stats.apply_deltas). fecha y assigned_to admiten NULL.
+            models.UniqueConstraint(
+                fields=["fecha", "process_type", "estado", "assigned_to"],
+                name="processdailystat_key_uniq",
+                nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.process_type} {self.estado}: {self.count}"
+
+
+class QualityControlDailyStat(models.Model):
+    """Number of equipment whose last quality control was done on ``fecha``."""
+
+    fecha = models.DateField(unique=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Estadística Diaria de Controles de Calidad")
+        verbose_name_plural = _("Estadísticas Diarias de Controles de Calidad")
+
+    def __str__(self):
+        return f"{self.fecha}: {self.count}"
+
+
+class TaskStatusChoices(models.TextChoices):
+    PENDING = "pending", _("Pendiente")
+    RUNNING = "running", _("En Ejecución")
+    DEAD = "dead", _("Fallida")
+
+
+class Task(models.Model):
+    """A unit of background work for the ``run_tasks`` worker.
+
+    Created by ``app.tasks.enqueue`` when the surrounding transaction commits.
+    ``name`` selects a function registered with ``@app.tasks.task`` and
+    ``payload`` holds its JSON arguments. Finished tasks are deleted; failures
+    are retried with exponential backoff (``run_after``) and, after
+    ``max_attempts``, kept as ``dead`` with ``last_error`` for inspection.
+    """
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(
+        max_length=10,
+        choices=TaskStatusChoices.choices,
+        default=TaskStatusChoices.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Tarea en Segundo Plano")
+        verbose_name_plural = _("Tareas en Segundo Plano")
+        indexes = [
+            # Tareas listas para el worker
+            models.Index(
+                fields=["run_after"],
+                condition=models.Q(status="pending"),
+                name="task_pending_idx",
+            ),
+            # Tareas bloqueadas por un worker que murió
+            models.Index(
+                fields=["locked_at"],
+                condition=models.Q(status="running"),
+                name="task_running_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+class FileDeletion(models.Model):
+    """A stored file waiting to be deleted (the storage deletion outbox).
+
+    Rows are written in the transaction that deletes the ``Report``, so they
+    exist exactly when the deletion commits. ``python manage.py storage_gc``
+    deletes the due files in batches (``app.storage_gc``), skipping files a
+    report still refers to, and removes the rows. Failed deletions are retried
+    later with ``last_error`` recorded.
+    """
+
+    name = models.CharField(max_length=255)
+    delete_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Archivo por Borrar")
+        verbose_name_plural = _("Archivos por Borrar")
+        indexes = [
+            models.Index(fields=["delete_after"], name="filedeletion_due_idx"),
+            models.Index(fields=["name"], name="filedeletion_name_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
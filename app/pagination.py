@@ -0,0 +1,382 @@
+"""Keyset (cursor) pagination for the large list views.
+
+Offset pagination runs a ``COUNT(*)`` over the filtered query plus an
+``OFFSET`` that scans and discards every earlier row, so deep pages get slower
+as the tables grow. ``KeysetPaginator`` instead remembers the sort key values
+of the last (or first) row of a page in an opaque ``cursor`` and fetches the
+next page with ``WHERE (sort keys) after (cursor values) ... LIMIT n``, which
+the list view indexes serve directly at any depth.
+
+The keys are taken from the queryset's own ``order_by()`` (or the model's
+``Meta.ordering``), with the primary key appended as tie-breaker, so views keep
+their current sort options. Nullable keys keep the queryset's NULL placement
+(``nulls_first`` / ``nulls_last`` or the database default, first in descending
+order on PostgreSQL), so a list has the same order in both modes. Orderings that are not plain fields or annotations (random,
+arbitrary expressions) are not supported and the views fall back to offset
+pagination for them.
+
+The total shown in the page header is ``exact`` (``COUNT(*)``), ``estimated``
+(PostgreSQL planner statistics: ``pg_class.reltuples`` for an unfiltered
+table, the planner row estimate otherwise) or ``none``.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.functional import cached_property
+
+CURSOR_PARAM = "cursor"
+COUNT_MODES = ("exact", "estimated", "none")
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """``DjangoJSONEncoder`` keeping full microsecond precision.
+
+    The parent truncates times to milliseconds, which would make a cursor
+    compare unequal to the row it was taken from.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(Exception):
+    """The cursor parameter is malformed or does not match the ordering."""
+
+
+class UnsupportedOrdering(Exception):
+    """The queryset ordering cannot be used as a keyset."""
+
+
+def _is_nullable(model, path):
+    """Tell whether ``path`` (which may span relations) can be NULL."""
+    for name in path.split(LOOKUP_SEP):
+        if name == "pk":
+            return False
+        field = model._meta.get_field(name)
+        # Reverse and many-to-many relations yield NULL when there is no row
+        if field.null or field.many_to_many or not field.concrete:
+            return True
+        model = field.related_model
+    return False
+
+
+def estimated_count(queryset):
+    """Return the planner's row estimate for ``queryset`` or ``None``.
+
+    Only PostgreSQL keeps statistics we can read; ``None`` is also returned
+    when the table has never been analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the first VACUUM / ANALYZE
+        return int(row[0]) if row and row[0] >= 0 else None
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class Key:
+    """One sort key: an annotation alias, its direction and NULL placement."""
+
+    def __init__(self, alias, name, descending, nullable, nulls_last=True):
+        self.alias = alias
+        self.name = name
+        self.descending = descending
+        self.nullable = nullable
+        self.nulls_last = nulls_last
+
+    def _nulls_at_end(self, reverse):
+        return self.nulls_last != reverse
+
+    def order_by(self, reverse=False):
+        descending = self.descending != reverse
+        nulls = {}
+        if self.nullable:
+            # Al leer el orden al revés los NULL cambian de extremo
+            if self._nulls_at_end(reverse):
+                nulls = {"nulls_last": True}
+            else:
+                nulls = {"nulls_first": True}
+        return OrderBy(F(self.alias), descending=descending, **nulls)
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{f"{self.alias}__isnull": True})
+        return Q(**{self.alias: value})
+
+    def after(self, value, reverse=False):
+        """Rows strictly after ``value`` in the (possibly reversed) order."""
+        forward = not reverse
+        nulls_at_end = self._nulls_at_end(reverse)
+        if value is None:
+            # NULLs at the end: nothing follows them; at the start: every value
+            if nulls_at_end:
+                return Q(pk__in=[])
+            return Q(**{f"{self.alias}__isnull": False})
+        lookup = "lt" if self.descending == forward else "gt"
+        q = Q(**{f"{self.alias}__{lookup}": value})
+        if self.nullable and nulls_at_end:
+            q |= Q(**{f"{self.alias}__isnull": True})
+        return q
+
+
+class KeysetPage(Sequence):
+    """A page of a ``KeysetPaginator``; quacks like Django's ``Page``."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f"<KeysetPage {self.paginator.cursor!r}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1], "next")
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0], "prev")
+        return None
+
+
+class KeysetPaginator:
+    """Paginate an ordered queryset by cursor instead of page number.
+
+    ``count_mode`` is one of ``COUNT_MODES`` and only affects ``count``, the
+    total shown to the user; pages never need it.
+    """
+
+    def __init__(self, queryset, per_page, count_mode="estimated"):
+        if count_mode not in COUNT_MODES:
+            raise ValueError(f"count_mode must be one of {COUNT_MODES}")
+        self.per_page = int(per_page)
+        self.count_mode = count_mode
+        self.object_list = queryset
+        self.count_is_estimated = False
+        self.keys, self.queryset = self._keyed_queryset(queryset)
+        self.cursor = None
+
+    @staticmethod
+    def _ordering(queryset):
+        query = queryset.query
+        if query.order_by:
+            return list(query.order_by)
+        if query.default_ordering:
+            return list(queryset.model._meta.ordering)
+        return []
+
+    def _keyed_queryset(self, queryset):
+        """Annotate each sort key as ``keyset_<n>`` and order by them."""
+        model = queryset.model
+        keys, annotations = [], {}
+        ordering = self._ordering(queryset)
+        # Sin NULLS FIRST / LAST explícito, los NULL van donde los pone el motor
+        nulls_largest = connections[queryset.db].features.nulls_order_largest
+        has_pk = False
+        for position, item in enumerate(ordering):
+            nulls_last = None
+            if isinstance(item, str):
+                if item == "?":
+                    raise UnsupportedOrdering(item)
+                descending = item.startswith("-")
+                name = item.lstrip("-")
+            elif isinstance(item, OrderBy) and isinstance(item.expression, F):
+                descending = item.descending
+                name = item.expression.name
+                if item.nulls_last or item.nulls_first:
+                    nulls_last = bool(item.nulls_last)
+            elif isinstance(item, F):
+                descending = False
+                name = item.name
+            else:
+                raise UnsupportedOrdering(repr(item))
+
+            alias = f"keyset_{position}"
+            if name in queryset.query.annotations:
+                nullable = True
+            else:
+                try:
+                    nullable = _is_nullable(model, name)
+                except FieldDoesNotExist:
+                    # Transforms such as created_at__date
+                    raise UnsupportedOrdering(name)
+            if nulls_last is None:
+                nulls_last = descending != nulls_largest
+            has_pk = has_pk or name in ("pk", model._meta.pk.name)
+            annotations[alias] = F(name)
+            keys.append(Key(alias, name, descending, nullable, nulls_last))
+
+        if not has_pk:
+            alias = f"keyset_{len(keys)}"
+            descending = keys[0].descending if keys else False
+            annotations[alias] = F("pk")
+            keys.append(Key(alias, "pk", descending, False))
+
+        queryset = queryset.annotate(**annotations)
+        return keys, queryset.order_by(*(key.order_by() for key in keys))
+
+    def encode_cursor(self, obj, direction):
+        values = [getattr(obj, key.alias) for key in self.keys]
+        payload = json.dumps({"d": direction, "v": values}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """Return ``(direction, values)`` for a cursor from ``encode_cursor``."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, values = payload["d"], payload["v"]
+        except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+        if direction not in ("next", "prev") or not isinstance(values, list):
+            raise InvalidCursor(cursor)
+        if len(values) != len(self.keys):
+            raise InvalidCursor(cursor)
+        annotations = self.queryset.query.annotations
+        try:
+            values = [
+                (
+                    None
+                    if value is None
+                    else annotations[key.alias].output_field.to_python(value)
+                )
+                for key, value in zip(self.keys, values)
+            ]
+        except Exception as exc:  # ValidationError, ValueError, ...
+            raise InvalidCursor(cursor) from exc
+        return direction, values
+
+    def _after(self, values, reverse):
+        """``WHERE`` clause for the rows after ``values``, key by key."""
+        condition = Q(pk__in=[])
+        equal_so_far = Q()
+        for key, value in zip(self.keys, values):
+            condition |= equal_so_far & key.after(value, reverse)
+            equal_so_far &= key.equal(value)
+        return condition
+
+    def page(self, cursor=None):
+        """Return the page after (or before) ``cursor``; the first one without."""
+        self.cursor = cursor
+        if not cursor:
+            rows = list(self.queryset[: self.per_page + 1])
+            return KeysetPage(
+                rows[: self.per_page], self, len(rows) > self.per_page, False
+            )
+
+        direction, values = self.decode_cursor(cursor)
+        reverse = direction == "prev"
+        queryset = self.queryset.filter(self._after(values, reverse))
+        if reverse:
+            queryset = queryset.order_by(
+                *(key.order_by(reverse=True) for key in self.keys)
+            )
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+            return KeysetPage(rows, self, True, has_more)
+        return KeysetPage(rows, self, has_more, True)
+
+    def get_page(self, cursor=None):
+        """Like ``page()``, but an invalid cursor gives the first page."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    @cached_property
+    def count(self):
+        """Total rows according to ``count_mode`` (``None`` when not counted).
+
+        Sets ``count_is_estimated`` when the planner estimate was used; where
+        there is none (other databases, unanalyzed tables) rows are counted.
+        """
+        if self.count_mode == "none":
+            return None
+        if self.count_mode == "estimated":
+            estimate = estimated_count(self.object_list)
+            if estimate is not None:
+                self.count_is_estimated = True
+                return estimate
+        return self.object_list.count()
+
+
+class KeysetPaginationMixin:
+    """Opt-in keyset pagination for a ``ListView``.
+
+    Active when the view's ``keyset_pagination`` (by default the
+    ``KEYSET_PAGINATION`` setting) is true. The page is selected with the
+    ``cursor`` GET parameter instead of ``page``; ``page_obj`` is a
+    ``KeysetPage`` and ``keyset_pagination`` is set in the context so the
+    template can render previous / next links.
+    """
+
+    keyset_pagination = None
+    keyset_count_mode = None
+    keyset_paginated = False
+
+    def use_keyset_pagination(self):
+        if self.keyset_pagination is None:
+            return getattr(settings, "KEYSET_PAGINATION", False)
+        return self.keyset_pagination
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        count_mode = self.keyset_count_mode or getattr(
+            settings, "KEYSET_PAGINATION_COUNT", "estimated"
+        )
+        try:
+            paginator = KeysetPaginator(queryset, page_size, count_mode=count_mode)
+        except UnsupportedOrdering:
+            return super().paginate_queryset(queryset, page_size)
+        page = paginator.get_page(self.request.GET.get(CURSOR_PARAM))
+        self.keyset_paginated = True
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["keyset_pagination"] = self.keyset_paginated
+        return context
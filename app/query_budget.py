@@ -0,0 +1,156 @@
+"""Per-request SQL accounting and query budgets.
+
+``QueryRecorder`` hooks into the database connection with
+``connection.execute_wrapper`` (so it works with ``DEBUG = False``) and records
+every query with its duration and a fingerprint: the SQL template with ``IN``
+lists collapsed, so the queries of an N+1 loop share one fingerprint.
+
+``QUERY_BUDGETS`` declares the maximum number of queries each URL name in
+``app/urls.py`` may run. A number is the budget of a GET (or HEAD); views that
+only answer POST declare ``{"POST": budget}``. Form submissions have no budget:
+what they cost depends on the data sent. ``QueryBudgetMiddleware`` checks the
+budgets in dev/CI and the test suite enforces them
+(``app/tests/test_query_budgets.py``). The ``QUERY_BUDGETS`` setting overrides
+individual entries.
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+# Máximo de consultas por nombre de URL para un GET, incluidas las de sesión,
+# usuario y permisos. Medidos en la primera request tras el login, la más cara
+# (carga el usuario sin caché y refresca la sesión), con el máximo que alcanza
+# cualquier test de la suite; al bajar el número de consultas de una vista,
+# bajar su presupuesto.
+QUERY_BUDGETS = {
+    "home": 12,
+    "dashboard_gerente": 16,
+    "dashboard_interno": 11,
+    "login": 3,
+    "logout": 4,
+    "password_reset": 0,
+    "password_reset_done": 0,
+    "password_reset_confirm": 5,
+    "password_reset_complete": 1,
+    "password_change": 7,
+    "password_change_done": 7,
+    "user_list": 10,
+    "user_detail": 12,
+    "user_create": 8,
+    "user_update": 9,
+    "user_delete": 8,
+    "client_profile_create": 7,
+    "client_profile_update": 8,
+    "client_branch_create": 7,
+    "client_branch_update": 8,
+    "report_list": 13,
+    "report_export": 9,
+    "report_detail": 12,
+    "report_download": 9,
+    "report_upload": {"POST": 7},
+    "report_create": 7,
+    "report_update": 11,
+    "report_delete": 8,
+    "report_status_and_note": 8,
+    "process_list": 11,
+    "process_internal_list": 11,
+    "process_internal_export": 8,
+    "process_detail": 11,
+    "process_create": 7,
+    "process_update": 9,
+    "process_delete": 8,
+    "process_update_assignment": 10,
+    "process_progress": 10,
+    "anotacion_create": 8,
+    "equipos_list": 11,
+    "equipos_export": 7,
+    "equipos_import": 7,
+    "equipos_detail": 15,
+    "equipos_create": 12,
+    "equipos_update": 15,
+    "equipos_delete": 8,
+    "tubo_update": 8,
+    "select2_model_user": 6,
+    "ajax_load_user_processes": 6,
+    "ajax_load_user_equipment": 6,
+    "ajax_load_client_branches": 5,
+}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_IN_LIST_RE = re.compile(r"\bIN \((?:%s, )*%s\)")
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a request runs more queries than its budget allows."""
+
+
+def fingerprint(sql):
+    """Return the query template with ``IN (%s, %s, ...)`` lists collapsed.
+
+    Parameters are not interpolated at this level, so two queries that only
+    differ in their values share a fingerprint.
+    """
+    sql = _WHITESPACE_RE.sub(" ", sql).strip()
+    return _IN_LIST_RE.sub("IN (...)", sql)
+
+
+def get_budget(url_name, method="GET"):
+    """Return the query budget of ``url_name`` for ``method``, or ``None``."""
+    overrides = getattr(settings, "QUERY_BUDGETS", {})
+    if url_name in overrides:
+        budget = overrides[url_name]
+    else:
+        budget = QUERY_BUDGETS.get(
+            url_name, getattr(settings, "QUERY_BUDGET_DEFAULT", None)
+        )
+    if method == "HEAD":
+        method = "GET"
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget if method == "GET" else None
+
+
+class QueryRecorder:
+    """Database execute wrapper that records the queries it sees."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """Return ``{fingerprint: count}`` for fingerprints seen more than once."""
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return {sql: count for sql, count in counts.items() if count > 1}
+
+    def summary(self):
+        lines = [f"{self.count} queries in {self.total_time * 1000:.1f} ms"]
+        for sql, count in sorted(self.duplicates().items(), key=lambda i: -i[1]):
+            lines.append(f"  {count}x {sql[:200]}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def record_queries(using=connection):
+    """Record the queries run inside the block on ``using``."""
+    recorder = QueryRecorder()
+    with using.execute_wrapper(recorder):
+        yield recorder
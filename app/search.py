@@ -0,0 +1,81 @@
+"""Text search over equipment, reports and clients.
+
+A search splits the term into words and keeps the rows where every word is
+contained (case-insensitively) in at least one of the searched fields, the rule
+Select2 already used. On PostgreSQL those ``icontains`` lookups compile to
+``UPPER(column::text) LIKE UPPER('%word%')``, which the ``pg_trgm`` GIN
+indexes of migration 0036 serve without a sequential scan, and results are
+ranked by trigram word similarity plus full-text rank. Other databases (the
+test suite runs on SQLite) get the same filtering without ranking.
+"""
+
+import operator
+from functools import reduce
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+
+TEXT_SEARCH_CONFIG = "spanish"
+
+EQUIPMENT_FIELDS = ("serial", "marca", "modelo", "nombre")
+REPORT_FIELDS = ("title", "description")
+CLIENT_FIELDS = (
+    "username",
+    "first_name",
+    "last_name",
+    "client_profile__razon_social",
+    "client_profile__nit",
+)
+
+
+def supports_ranking(using):
+    return connections[using].vendor == "postgresql"
+
+
+def search_filter(term, fields):
+    """Return a ``Q`` requiring every word of ``term`` in one of ``fields``."""
+    select = Q()
+    for word in term.split():
+        select &= reduce(
+            operator.or_, (Q(**{f"{field}__icontains": word}) for field in fields)
+        )
+    return select
+
+
+def rank_expression(term, fields):
+    """Return the relevance of a row for ``term`` (PostgreSQL only)."""
+    from django.contrib.postgres.search import (
+        SearchQuery,
+        SearchRank,
+        SearchVector,
+        TrigramWordSimilarity,
+    )
+
+    similarities = [TrigramWordSimilarity(term, field) for field in fields]
+    similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+    text_rank = SearchRank(
+        SearchVector(*fields, config=TEXT_SEARCH_CONFIG),
+        SearchQuery(term, config=TEXT_SEARCH_CONFIG, search_type="websearch"),
+    )
+    return Coalesce(similarity, Value(0.0), output_field=FloatField()) + text_rank
+
+
+def search(queryset, term, fields, ranked=True):
+    """Filter ``queryset`` by ``term`` over ``fields``.
+
+    With ``ranked`` and on PostgreSQL, rows are annotated with ``search_rank``
+    and ordered by it, keeping the queryset's ordering as tie-breaker.
+    """
+    term = (term or "").strip()
+    if not term:
+        return queryset
+
+    queryset = queryset.filter(search_filter(term, fields))
+    if not ranked or not supports_ranking(queryset.db):
+        return queryset
+
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return queryset.annotate(search_rank=rank_expression(term, fields)).order_by(
+        "-search_rank", *ordering
+    )
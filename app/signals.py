@@ -1,11 +1,20 @@
 import logging
 
 from django.contrib.auth.models import Group
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import Process, Role, RoleChoices, User
+from . import auth_cache, stats, storage_gc
+from .models import (
+    ChecklistItemDefinition,
+    Equipment,
+    Process,
+    Report,
+    Role,
+    RoleChoices,
+    User,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +28,9 @@ def sync_user_roles_to_groups(
     Assumes that for every Role.name (e.g., 'cliente'), a Group with the same name
     exists or will be created (ideally by a data migration).
     """
+    if action in ("post_add", "post_remove", "post_clear"):
+        _invalidate_auth_cache_for_m2m(instance, pk_set)
+
     if not isinstance(instance, User):
         # This signal is for User.roles, so instance should be a User.
         return
@@ -103,3 +115,142 @@ def process_assigned(sender, instance, action, **kwargs):
         if instance.assigned_to.count() > 0 and instance.fecha_asignacion is None:
             instance.fecha_asignacion = timezone.now()
             instance.save(update_fields=["fecha_asignacion"])
+
+
+@receiver(m2m_changed, sender=Process.assigned_to.through)
+def update_stats_on_assignment_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Count added and removed assignments in the per-assignee dashboard stats.
+
+    Additions are counted after the fact (``pk_set`` then only holds the new
+    assignments); removals before, while the assignments still exist, because
+    ``pk_set`` of a removal may name users that were not assigned.
+    """
+    if action not in ("post_add", "pre_remove", "pre_clear"):
+        return
+    delta = 1 if action == "post_add" else -1
+    through = Process.assigned_to.through.objects
+    if not reverse:
+        if action == "post_add":
+            user_ids = pk_set
+        elif action == "pre_remove":
+            user_ids = through.filter(process=instance, user_id__in=pk_set).values_list(
+                "user_id", flat=True
+            )
+        else:
+            user_ids = through.filter(process=instance).values_list(
+                "user_id", flat=True
+            )
+        key = instance.stats_key(loaded=True)
+        stats.update_process_stats((key, user_id, delta) for user_id in user_ids)
+        return
+
+    processes = Process.objects.all()
+    if action == "post_add":
+        processes = processes.filter(pk__in=pk_set)
+    elif action == "pre_remove":
+        processes = processes.filter(pk__in=pk_set, assigned_to=instance)
+    else:
+        processes = processes.filter(assigned_to=instance)
+    stats.update_process_stats(
+        (process.stats_key(loaded=True), instance.pk, delta) for process in processes
+    )
+
+
+@receiver(post_save, sender=Process)
+def update_stats_on_process_save(sender, instance, created, **kwargs):
+    """Move the process and its assignments when its stats key changes."""
+    # Runs before the instance snapshot is refreshed, so loaded values are old
+    current_key = instance.stats_key()
+    if created:
+        stats.update_process_stats([(current_key, None, 1)])
+        return
+    previous_key = instance.stats_key(loaded=True)
+    if previous_key == current_key:
+        return
+    user_ids = [None, *instance.assigned_to.values_list("pk", flat=True)]
+    stats.update_process_stats(
+        [(previous_key, user_id, -1) for user_id in user_ids]
+        + [(current_key, user_id, 1) for user_id in user_ids]
+    )
+
+
+@receiver(pre_delete, sender=Process)
+def update_stats_on_process_delete(sender, instance, **kwargs):
+    """Uncount the process while its assignments still exist."""
+    key = instance.stats_key(loaded=True)
+    user_ids = [None, *instance.assigned_to.values_list("pk", flat=True)]
+    stats.update_process_stats((key, user_id, -1) for user_id in user_ids)
+
+
+@receiver(post_delete, sender=Report)
+def queue_report_file_deletion(sender, instance, **kwargs):
+    """Queue the PDF of a deleted report, also when deleted in cascade."""
+    if instance.pdf_file:
+        storage_gc.queue_deletion([instance.pdf_file.name])
+
+
+@receiver(post_save, sender=Equipment)
+def update_quality_control_stats_on_save(sender, instance, created, **kwargs):
+    """Move the equipment between QualityControlDailyStat days when its date changes."""
+    current = instance.fecha_ultimo_control_calidad
+    if created:
+        stats.update_quality_control_stats([(current, 1)])
+        return
+    previous = instance.get_loaded_value("fecha_ultimo_control_calidad")
+    if previous != current:
+        stats.update_quality_control_stats([(previous, -1), (current, 1)])
+
+
+@receiver(pre_delete, sender=Equipment)
+def update_quality_control_stats_on_delete(sender, instance, **kwargs):
+    stats.update_quality_control_stats(
+        [(instance.get_loaded_value("fecha_ultimo_control_calidad"), -1)]
+    )
+
+
+@receiver(post_save, sender=ChecklistItemDefinition)
+@receiver(post_delete, sender=ChecklistItemDefinition)
+def invalidate_checklist_definitions_cache(sender, **kwargs):
+    """Drop the cached definition ids used to create process checklists."""
+    ChecklistItemDefinition.objects.invalidate_cache()
+
+
+def _invalidate_auth_cache_for_m2m(instance, pk_set):
+    """Invalidate the cached roles/permissions touched by a User m2m change.
+
+    ``instance`` is the user on forward changes (``user.roles.add``) and the
+    role, group or permission on reverse ones, where ``pk_set`` holds user pks.
+    """
+    if isinstance(instance, User):
+        instance.clear_role_cache()
+        auth_cache.invalidate_user(instance.pk)
+    elif pk_set:
+        for user_pk in pk_set:
+            auth_cache.invalidate_user(user_pk)
+    else:
+        # Reverse clear() does not report which users were affected
+        auth_cache.invalidate_all()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions_cache(sender, instance, action, pk_set, **kwargs):
+    """Invalidate cached permissions when a user's groups or permissions change."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        _invalidate_auth_cache_for_m2m(instance, pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions_cache(sender, action, **kwargs):
+    """Invalidate every cached permission set when a group's permissions change."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        auth_cache.invalidate_all()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Drop the cached user so password, status and profile changes apply at once."""
+    auth_cache.invalidate_user(instance.pk)
@@ -0,0 +1,173 @@
+"""Rollup tables behind the dashboard charts.
+
+``ProcessDailyStat`` and ``QualityControlDailyStat`` hold pre-aggregated counts
+so the charts read a handful of rows for any interval instead of scanning the
+process and equipment tables.
+
+They are kept up to date incrementally: the signals turn each change into
+``+1``/``-1`` deltas for the affected keys (old and new), computed from the
+values loaded from the database, so a save never recounts the raw tables.
+``apply_deltas`` adds them with an upsert that concurrent saves cannot
+duplicate, and ``rebuild_all`` recomputes everything and backs the
+``rebuild_dashboard_stats`` command.
+"""
+
+import logging
+import operator
+from collections import Counter, defaultdict
+from functools import reduce
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest, TruncDate
+
+from .models import ProcessDailyStat, QualityControlDailyStat
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+PROCESS_KEY_FIELDS = ("fecha", "process_type", "estado", "assigned_to_id")
+
+
+def _sort_key(key):
+    # Orden total aunque haya None, para insertar y bloquear siempre igual
+    return [(value is None, str(value)) for value in key]
+
+
+def apply_deltas(model, key_fields, deltas):
+    """Add ``deltas`` (``{key tuple: delta}``) to the ``count`` of ``model`` rows.
+
+    Missing rows are inserted with ``ON CONFLICT DO NOTHING``, which the unique
+    constraint on ``key_fields`` makes safe when two transactions insert the
+    same key. The rows are then locked in primary key order, so concurrent
+    updates of overlapping keys cannot deadlock, and incremented with one
+    ``UPDATE`` per distinct delta. Rows that drop to zero are kept: deleting
+    them would let a transaction waiting on the lock miss its row.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    keys = sorted(deltas, key=_sort_key)
+    with transaction.atomic():
+        model.objects.bulk_create(
+            [model(**dict(zip(key_fields, key))) for key in keys],
+            ignore_conflicts=True,
+        )
+        rows = (
+            model.objects.select_for_update()
+            .filter(
+                reduce(operator.or_, (Q(**dict(zip(key_fields, key))) for key in keys))
+            )
+            .order_by("pk")
+            .values_list("pk", *key_fields)
+        )
+        pks_by_delta = defaultdict(list)
+        for pk, *key in rows:
+            pks_by_delta[deltas[tuple(key)]].append(pk)
+        for delta, pks in pks_by_delta.items():
+            # Un conteo desfasado (p. ej. tras un queryset.update()) no debe
+            # romper el guardado con un valor negativo; rebuild_all lo corrige
+            model.objects.filter(pk__in=pks).update(
+                count=Greatest(F("count") + delta, Value(0))
+            )
+
+
+def update_process_stats(changes):
+    """Apply ``(stats_key, assigned_to_id, delta)`` changes to ``ProcessDailyStat``.
+
+    ``stats_key`` is a ``(fecha, process_type, estado)`` tuple as returned by
+    ``Process.stats_key()``; ``assigned_to_id`` is ``None`` for the row that
+    counts processes and a user id for that user's assignments.
+    """
+    deltas = Counter()
+    for key, user_id, delta in changes:
+        deltas[(*key, user_id)] += delta
+    apply_deltas(ProcessDailyStat, PROCESS_KEY_FIELDS, deltas)
+
+
+def update_quality_control_stats(changes):
+    """Apply ``(fecha, delta)`` changes to ``QualityControlDailyStat``.
+
+    Changes for an empty date are ignored. All dates go through one upsert,
+    so bulk changes (such as an equipment import) cost the same handful of
+    queries as a single save.
+    """
+    deltas = Counter()
+    for fecha, delta in changes:
+        if fecha:
+            deltas[(fecha,)] += delta
+    apply_deltas(QualityControlDailyStat, ("fecha",), deltas)
+
+
+def rebuild_all(apps=global_apps):
+    """Recompute both rollup tables from scratch.
+
+    ``apps`` lets data migrations pass their historical app registry.
+    """
+    process_model = apps.get_model("app", "Process")
+    equipment_model = apps.get_model("app", "Equipment")
+    process_stat_model = apps.get_model("app", "ProcessDailyStat")
+    quality_control_stat_model = apps.get_model("app", "QualityControlDailyStat")
+    assignment_model = process_model._meta.get_field("assigned_to").remote_field.through
+
+    process_totals = (
+        process_model.objects.annotate(fecha=TruncDate("fecha_final"))
+        .values("fecha", "process_type", "estado")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    assignment_totals = (
+        assignment_model.objects.annotate(fecha=TruncDate("process__fecha_final"))
+        .values("fecha", "process__process_type", "process__estado", "user_id")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    quality_control_totals = (
+        equipment_model.objects.filter(fecha_ultimo_control_calidad__isnull=False)
+        .values("fecha_ultimo_control_calidad")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        process_stat_model.objects.all().delete()
+        quality_control_stat_model.objects.all().delete()
+
+        process_rows = [
+            process_stat_model(
+                fecha=item["fecha"],
+                process_type=item["process_type"],
+                estado=item["estado"],
+                count=item["count"],
+            )
+            for item in process_totals
+        ]
+        process_rows.extend(
+            process_stat_model(
+                fecha=item["fecha"],
+                process_type=item["process__process_type"],
+                estado=item["process__estado"],
+                assigned_to_id=item["user_id"],
+                count=item["count"],
+            )
+            for item in assignment_totals
+        )
+        process_stat_model.objects.bulk_create(process_rows, batch_size=BATCH_SIZE)
+
+        quality_control_rows = [
+            quality_control_stat_model(
+                fecha=item["fecha_ultimo_control_calidad"], count=item["count"]
+            )
+            for item in quality_control_totals
+        ]
+        quality_control_stat_model.objects.bulk_create(
+            quality_control_rows, batch_size=BATCH_SIZE
+        )
+
+    logger.info(
+        "Dashboard stats rebuilt: %s process rows, %s quality control rows.",
+        len(process_rows),
+        len(quality_control_rows),
+    )
+    return len(process_rows), len(quality_control_rows)
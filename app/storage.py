@@ -1,28 +1,295 @@
+import base64
+import datetime
+import hashlib
 import logging
 import os
+import posixpath
+import re
+import time
+from collections import Counter
 
+from botocore.exceptions import ClientError
 from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
 from django.core.files.storage import FileSystemStorage
+from django.db import connection
+from django.urls import reverse
+from django.utils.functional import cached_property
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
 
 logger = logging.getLogger(__name__)
 
+MOCK_UPLOAD_SALT = "app.storage.mock_upload"
+PDF_SIGNATURE = b"%PDF-"
+# Directorio de los archivos direccionados por contenido: <dir>/sha256/<hex>/<nombre>
+BLOB_DIR = "sha256"
+BLOB_PREFIX_LENGTH = len(BLOB_DIR) + 64 + 2
+# Máximo de claves por petición DeleteObjects de S3
+DELETE_BATCH_SIZE = 1000
 
-class MockStorage(FileSystemStorage):
+# Aciertos y fallos de la caché de URLs prefirmadas en este proceso
+URL_CACHE_STATS = Counter()
+URL_CACHE_LOG_EVERY = 1000
+
+
+class DirectUploadError(Exception):
+    """A direct upload was rejected by the (mock) bucket."""
+
+
+def sha256_base64(chunks):
+    """Base64 SHA-256 of an iterable of bytes, as S3 reports checksums."""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return base64.b64encode(digest.digest()).decode()
+
+
+def blob_name(name, digest):
+    """Content-addressed name for a file ``name`` with SHA-256 hex ``digest``."""
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, BLOB_DIR, digest, filename)
+
+
+def blob_digest(name):
+    """The SHA-256 hex digest in a content-addressed ``name``, or ``None``."""
+    parts = name.split("/")
+    if (
+        len(parts) >= 3
+        and parts[-3] == BLOB_DIR
+        and re.fullmatch("[0-9a-f]{64}", parts[-2])
+    ):
+        return parts[-2]
+    return None
+
+
+def lock_blobs(names):
+    """Lock the stored files ``names`` until the current transaction ends.
+
+    Shared by the code that starts referring to a stored file (a ``Report``
+    save, which may reuse an identical PDF) and by ``app.storage_gc.drain``,
+    which deletes files no report refers to. Holding the lock from the
+    existence (or reference) check to the commit means a file cannot be
+    deleted while a report that reuses it is being saved. Uses a PostgreSQL
+    advisory lock keyed by the SHA-256 of the content; names that are not
+    content-addressed, and other databases, are not locked.
+    """
+    # Clave bigint con signo: los primeros 64 bits del digest
+    keys = sorted(
+        {int(digest[:16], 16) - 2**63 for digest in map(blob_digest, names) if digest}
+    )
+    if not keys or connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for key in keys:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+
+
+def url_cache_stats():
+    """Hits, misses and hit rate of the presigned URL cache in this process."""
+    hits, misses = URL_CACHE_STATS["hits"], URL_CACHE_STATS["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else None,
+    }
+
+
+def _record_url_lookups(hits, misses):
+    before = URL_CACHE_STATS.total()
+    URL_CACHE_STATS.update(hits=hits, misses=misses)
+    if before // URL_CACHE_LOG_EVERY != URL_CACHE_STATS.total() // URL_CACHE_LOG_EVERY:
+        stats = url_cache_stats()
+        logger.info(
+            f"Caché de URLs de PDF: {stats['hits']} aciertos, {stats['misses']} "
+            f"fallos ({stats['hit_rate']:.0%})."
+        )
+
+
+class ContentAddressedMixin:
+    """Store each distinct file once, under a name derived from its SHA-256.
+
+    ``_save`` hashes the content while reading it and stores it as
+    ``<dir>/sha256/<hex digest>/<filename>``. If that directory already holds
+    a file (the same content, uploaded before) its name is returned and
+    nothing is written, so several reports can share one stored PDF. Shared
+    files are deleted by ``app.storage_gc`` once no report refers to them.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # El directorio del digest hace único el nombre; solo hay que dejarle sitio
+        if blob_digest(name) is None and max_length is not None:
+            room = max_length - BLOB_PREFIX_LENGTH
+            if len(name) > room:
+                root, ext = os.path.splitext(name)
+                name = root[: room - len(ext)] + ext
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        if blob_digest(name) != digest:
+            name = blob_name(name, digest)
+        # Dentro de la transacción del Report.save(): storage_gc no lo borra ahora
+        lock_blobs([name])
+        existing = self.find_blob(name)
+        if existing:
+            logger.info(f"'{existing}' ya está almacenado; no se vuelve a subir.")
+            return existing
+        return super()._save(name, content)
+
+    def find_blob(self, name):
+        """Stored file with the same content as the content-addressed ``name``."""
+        directory = posixpath.dirname(name)
+        try:
+            _, files = self.listdir(directory)
+        except FileNotFoundError:
+            return None
+        return posixpath.join(directory, min(files)) if files else None
+
+
+class MockStorage(ContentAddressedMixin, FileSystemStorage):
     def __init__(self):
-        location = os.path.join(settings.MEDIA_ROOT, "mock_s3")
-        super().__init__(location=location)
+        # Dos cargas simultáneas del mismo contenido escriben el mismo archivo
+        super().__init__(allow_overwrite=True)
+
+    @cached_property
+    def base_location(self):
+        # Se resuelve al usarse, así override_settings(MEDIA_ROOT) lo cambia
+        return os.path.join(settings.MEDIA_ROOT, "mock_s3")
 
     def url(self, name):
         logger.info(f"[MOCK] Generando URL para: {name}")
         return f"{settings.MEDIA_URL.rstrip('/')}/mock_s3/{name}"
 
+    def urls(self, names):
+        return {name: self.url(name) for name in names}
+
     def _save(self, name, content):
         logger.info(f"[MOCK] Guardando archivo: {name}")
         return super()._save(name, content)
 
+    # Equivalente local del POST prefirmado de S3 (ver app/uploads.py): el
+    # navegador envía el archivo a la vista mock_direct_upload, que aplica las
+    # mismas condiciones que la política de S3.
+
+    def direct_upload(self, name, size, content_type, checksum, expires):
+        policy = signing.dumps(
+            {
+                "key": name,
+                "size": size,
+                "content_type": content_type,
+                "checksum": checksum,
+                "expires_at": time.time() + expires,
+            },
+            salt=MOCK_UPLOAD_SALT,
+        )
+        return {
+            "url": reverse("mock_direct_upload"),
+            "fields": {
+                "key": name,
+                "Content-Type": content_type,
+                "x-amz-checksum-sha256": checksum,
+                "policy": policy,
+            },
+        }
 
-class PDFStorage(S3Boto3Storage):
+    def receive_direct_upload(self, fields, content):
+        """Store ``content`` if ``fields`` satisfy the signed policy."""
+        try:
+            policy = signing.loads(fields.get("policy", ""), salt=MOCK_UPLOAD_SALT)
+        except signing.BadSignature:
+            raise DirectUploadError("Invalid policy.")
+        if time.time() > policy["expires_at"]:
+            raise DirectUploadError("Policy expired.")
+        for field, expected in (
+            ("key", policy["key"]),
+            ("Content-Type", policy["content_type"]),
+            ("x-amz-checksum-sha256", policy["checksum"]),
+        ):
+            if fields.get(field) != expected:
+                raise DirectUploadError(f"Policy condition failed: {field}.")
+        if content.size != policy["size"]:
+            raise DirectUploadError("Policy condition failed: content-length-range.")
+        if sha256_base64(content.chunks()) != policy["checksum"]:
+            raise DirectUploadError("The SHA256 checksum does not match.")
+        content.seek(0)
+        self.save(policy["key"], content)
+
+    def object_info(self, name):
+        """Size, type and checksum of a stored file, or ``None`` if missing.
+
+        There is no object metadata here, so the PDF type is recognized by the
+        file signature.
+        """
+        if not self.exists(name):
+            return None
+        with self.open(name) as stored:
+            head = stored.read(len(PDF_SIGNATURE))
+            stored.seek(0)
+            checksum = sha256_base64(stored.chunks())
+        return {
+            "size": self.size(name),
+            "content_type": (
+                "application/pdf"
+                if head == PDF_SIGNATURE
+                else "application/octet-stream"
+            ),
+            "checksum": checksum,
+        }
+
+    def download_info(self, name):
+        """Size, ETag and modification time of a stored file, or ``None``."""
+        try:
+            stat = os.stat(self.path(name))
+        except FileNotFoundError:
+            return None
+        return {
+            "size": stat.st_size,
+            "etag": f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            "last_modified": stat.st_mtime,
+        }
+
+    def delete_many(self, names):
+        """Delete ``names``; return ``{name: error}`` for those that failed."""
+        errors = {}
+        for name in names:
+            try:
+                self.delete(name)
+            except OSError as e:
+                errors[name] = str(e)
+        return errors
+
+    def iter_files(self, prefix):
+        """Yield ``(name, modified)`` for every stored file under ``prefix``."""
+        for directory, _, files in os.walk(self.path(prefix)):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.location).replace(os.sep, "/")
+                modified = datetime.datetime.fromtimestamp(
+                    os.path.getmtime(path), tz=datetime.timezone.utc
+                )
+                yield name, modified
+
+    def stream(self, name, start, end, chunk_size, etag=None):
+        """Yield bytes ``start`` to ``end`` (inclusive) of a stored file."""
+        remaining = end - start + 1
+        with self.open(name) as stored:
+            stored.seek(start)
+            while remaining > 0:
+                chunk = stored.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class PDFStorage(ContentAddressedMixin, S3Boto3Storage):
     location = "media/"
 
     def __new__(cls, *args, **kwargs):
@@ -52,3 +319,165 @@ class PDFStorage(S3Boto3Storage):
             # Log the full exception traceback
             logger.error(f"Failed to save '{name}' to S3. Error: {e}", exc_info=True)
             raise
+
+    # Presigned download URLs ------------------------------------------------
+    #
+    # Signing a URL (SigV4) costs CPU on every render of a PDF link, so plain
+    # ``url(name)`` calls are served from the Django cache. Entries live
+    # ``PDF_URL_CACHE_TIMEOUT`` seconds, less than ``querystring_expire``, so a
+    # cached link stays valid for at least the difference.
+    # With temporary credentials (an IAM role) a URL also stops working when the
+    # session does, so keep the timeout below the session lifetime.
+
+    def _url_cache_timeout(self):
+        timeout = getattr(settings, "PDF_URL_CACHE_TIMEOUT", 0)
+        # Nunca más que la validez de la URL, con al menos un minuto de margen
+        return max(min(timeout, self.querystring_expire - 60), 0)
+
+    def _url_cache_key(self, name):
+        identity = "\0".join(
+            (
+                self.bucket_name,
+                self.access_key or "",
+                self._normalize_name(clean_name(name)),
+            )
+        )
+        return f"pdf-url:{hashlib.sha1(identity.encode()).hexdigest()}"
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if parameters or expire is not None or http_method:
+            return super().url(name, parameters, expire, http_method)
+        return self.urls([name])[name]
+
+    def urls(self, names):
+        """Presigned URLs for ``names``, e.g. a page of reports, as a dict.
+
+        Looks all of them up in one cache round-trip and signs only the misses.
+        """
+        names = list(dict.fromkeys(names))
+        timeout = self._url_cache_timeout()
+        if not timeout:
+            return {name: S3Boto3Storage.url(self, name) for name in names}
+
+        cache = caches[getattr(settings, "PDF_URL_CACHE_ALIAS", "default")]
+        keys = {self._url_cache_key(name): name for name in names}
+        cached = cache.get_many(keys)
+        signed = {
+            key: S3Boto3Storage.url(self, name)
+            for key, name in keys.items()
+            if key not in cached
+        }
+        if signed:
+            cache.set_many(signed, timeout)
+        _record_url_lookups(len(cached), len(signed))
+        return {name: cached.get(key) or signed[key] for key, name in keys.items()}
+
+    def direct_upload(self, name, size, content_type, checksum, expires):
+        """Presigned POST letting the browser upload ``name`` to the bucket.
+
+        The policy pins the key, the exact size, the content type and the
+        SHA-256 checksum, which S3 verifies on receipt. The bucket needs a CORS
+        rule allowing POST from the site's origin.
+        """
+        return self.connection.meta.client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=self._normalize_name(clean_name(name)),
+            Fields={"Content-Type": content_type, "x-amz-checksum-sha256": checksum},
+            Conditions=[
+                {"Content-Type": content_type},
+                {"x-amz-checksum-sha256": checksum},
+                ["content-length-range", size, size],
+            ],
+            ExpiresIn=expires,
+        )
+
+    def _head(self, name, **kwargs):
+        try:
+            return self.connection.meta.client.head_object(
+                Bucket=self.bucket_name,
+                Key=self._normalize_name(clean_name(name)),
+                **kwargs,
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    def object_info(self, name):
+        """Size, type and checksum of a stored object, or ``None`` if missing."""
+        head = self._head(name, ChecksumMode="ENABLED")
+        if head is None:
+            return None
+        return {
+            "size": head["ContentLength"],
+            "content_type": head.get("ContentType"),
+            "checksum": head.get("ChecksumSHA256"),
+        }
+
+    def download_info(self, name):
+        """Size, ETag and modification time of a stored object, or ``None``."""
+        head = self._head(name)
+        if head is None:
+            return None
+        return {
+            "size": head["ContentLength"],
+            "etag": head["ETag"],
+            "last_modified": head["LastModified"].timestamp(),
+        }
+
+    def stream(self, name, start, end, chunk_size, etag=None):
+        """Yield bytes ``start`` to ``end`` (inclusive) of a stored object.
+
+        Only the requested range is fetched from S3. With ``etag`` the request
+        fails if the object changed since ``download_info``.
+        """
+        if end < start:
+            return
+        params = {"Range": f"bytes={start}-{end}"}
+        if etag:
+            params["IfMatch"] = etag
+        body = self.connection.meta.client.get_object(
+            Bucket=self.bucket_name,
+            Key=self._normalize_name(clean_name(name)),
+            **params,
+        )["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete_many(self, names):
+        """Delete ``names`` with one DeleteObjects request per 1000 keys.
+
+        Returns ``{name: error}`` for the keys S3 could not delete; a missing
+        key counts as deleted.
+        """
+        client = self.connection.meta.client
+        keys = {self._normalize_name(clean_name(name)): name for name in names}
+        batch_keys = list(keys)
+        errors = {}
+        for i in range(0, len(batch_keys), DELETE_BATCH_SIZE):
+            response = client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    "Objects": [
+                        {"Key": key} for key in batch_keys[i : i + DELETE_BATCH_SIZE]
+                    ],
+                    "Quiet": True,
+                },
+            )
+            for error in response.get("Errors", ()):
+                errors[keys[error["Key"]]] = f"{error['Code']}: {error['Message']}"
+        return errors
+
+    def iter_files(self, prefix):
+        """Yield ``(name, modified)`` for every stored object under ``prefix``."""
+        root = self._normalize_name("") or "."
+        paginator = self.connection.meta.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=self._normalize_name(clean_name(prefix)),
+        )
+        for page in pages:
+            for entry in page.get("Contents", ()):
+                yield posixpath.relpath(entry["Key"], root), entry["LastModified"]
@@ -0,0 +1,132 @@
+"""Deletion of stored report files, in batches and outside the request.
+
+Deleting a report does not talk to the storage. A ``post_delete`` receiver
+(``app.signals``) adds the file name to the ``FileDeletion`` outbox in the same
+transaction, which also covers reports deleted in cascade with their user or
+process (those never go through ``Report.delete``). ``drain`` claims the due
+rows, leaves alone the files a report still refers to (identical PDFs are
+stored once and shared, see ``ContentAddressedMixin``) and deletes the rest
+with one ``DeleteObjects`` request per 1000 keys.
+
+Rows become due ``DELETE_DELAY`` after the deletion. ``drain`` locks the files
+of its batch with ``lock_blobs`` before it checks their references and keeps
+the lock until the files are deleted. A report that starts using one of them
+takes the same lock when it is saved, so either the report commits first and
+the file is kept, or the file is deleted first and the save finds it missing
+(``Report.save`` raises ``ValidationError``, ``ContentAddressedMixin`` stores
+the content again).
+
+``find_orphans`` is the reconciliation scan: it lists the stored files under
+``reports_pdfs/`` and returns those no report refers to, such as direct
+uploads whose form was never submitted or files of reports deleted before the
+outbox existed.
+
+Both run from ``python manage.py storage_gc``.
+"""
+
+import datetime
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import FileDeletion, Report
+from .storage import lock_blobs
+
+logger = logging.getLogger(__name__)
+
+DELETE_DELAY = datetime.timedelta(minutes=10)
+BATCH_SIZE = 1000
+MAX_ATTEMPTS = 5
+RETRY_DELAY = datetime.timedelta(minutes=5)
+# Las cargas directas sin formulario enviado se consideran huérfanas pasado un día
+ORPHAN_MIN_AGE = datetime.timedelta(days=1)
+
+
+def report_storage():
+    return Report._meta.get_field("pdf_file").storage
+
+
+def queue_deletion(names, delay=DELETE_DELAY):
+    """Add ``names`` to the outbox, to be deleted ``delay`` from now."""
+    delete_after = timezone.now() + delay
+    FileDeletion.objects.bulk_create(
+        FileDeletion(name=name, delete_after=delete_after) for name in names if name
+    )
+
+
+def _referenced(names):
+    return set(
+        Report.objects.filter(pdf_file__in=names).values_list("pdf_file", flat=True)
+    )
+
+
+def drain(batch_size=BATCH_SIZE):
+    """Delete the files of one batch of due outbox rows.
+
+    Returns the number of rows handled. Rows whose file could not be deleted
+    are retried later, ``MAX_ATTEMPTS`` times at most.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            FileDeletion.objects.select_for_update(skip_locked=True)
+            .filter(delete_after__lte=now, attempts__lt=MAX_ATTEMPTS)
+            .order_by("delete_after")[:batch_size]
+        )
+        if not batch:
+            return 0
+        names = {deletion.name for deletion in batch}
+        # Hasta el commit, ningún reporte puede empezar a usar estos archivos
+        lock_blobs(names)
+        unused = sorted(names - _referenced(names))
+        try:
+            errors = report_storage().delete_many(unused) if unused else {}
+        except Exception as e:
+            logger.exception("Error borrando archivos del almacenamiento")
+            errors = dict.fromkeys(unused, str(e))
+
+        failed = [deletion for deletion in batch if deletion.name in errors]
+        FileDeletion.objects.filter(
+            pk__in=[deletion.pk for deletion in batch if deletion not in failed]
+        ).delete()
+        for deletion in failed:
+            FileDeletion.objects.filter(pk=deletion.pk).update(
+                attempts=F("attempts") + 1,
+                last_error=errors[deletion.name],
+                delete_after=now + RETRY_DELAY * 2**deletion.attempts,
+            )
+    logger.info(
+        f"Archivos borrados: {len(unused) - len(errors)}; en uso: "
+        f"{len(names) - len(unused)}; con error: {len(errors)}."
+    )
+    return len(batch)
+
+
+def find_orphans(prefix=None, min_age=ORPHAN_MIN_AGE, chunk_size=BATCH_SIZE):
+    """Yield stored files under ``prefix`` that no report refers to.
+
+    Files younger than ``min_age`` (uploads still in progress) and files
+    already in the outbox are skipped.
+    """
+    if prefix is None:
+        prefix = Report._meta.get_field("pdf_file").upload_to
+    cutoff = timezone.now() - min_age
+    chunk = []
+    for name, modified in report_storage().iter_files(prefix):
+        if modified <= cutoff:
+            chunk.append(name)
+        if len(chunk) >= chunk_size:
+            yield from _unreferenced(chunk)
+            chunk = []
+    yield from _unreferenced(chunk)
+
+
+def _unreferenced(names):
+    if not names:
+        return []
+    known = _referenced(names) | set(
+        FileDeletion.objects.filter(name__in=names).values_list("name", flat=True)
+    )
+    return [name for name in names if name not in known]
@@ -0,0 +1,232 @@
+"""Database-backed queue for work that should not block a request.
+
+Sending email means a network round-trip that can take seconds (or time out).
+Views call ``enqueue(func, *args)`` instead: once the current transaction
+commits, a ``Task`` row is stored, and the ``run_tasks`` worker
+(``python manage.py run_tasks``) picks it up. No broker is needed, only the
+database the app already uses.
+
+Tasks are plain functions registered with ``@task``; their arguments must be
+JSON serializable (pass primary keys, not model instances). The worker claims
+due tasks with ``SELECT ... FOR UPDATE SKIP LOCKED`` on PostgreSQL, so several
+workers can run side by side. A task that raises is retried after
+``RETRY_DELAY * 2 ** (attempts - 1)`` seconds (at most ``MAX_RETRY_DELAY``);
+after ``max_attempts`` it stays in the table as ``dead`` with its traceback
+(the dead-letter queue) and can be retried from the admin. Tasks left
+``running`` by a worker that died are claimed again after ``LOCK_TIMEOUT``.
+
+Delivery is at least once: a worker that dies after the work is done but
+before it deletes the row, or that runs past ``LOCK_TIMEOUT``, leaves the task
+to be claimed and run again. Tasks must therefore tolerate a repeat. For email
+that means a rare duplicate message; ``EMAIL_TIMEOUT`` keeps a hung SMTP
+connection well below ``LOCK_TIMEOUT`` so a slow send is not claimed twice.
+
+Payloads are visible in the admin, so they must not carry secrets: the
+password emails store the user's primary key and build the token and link
+when they are sent.
+
+With ``TASK_QUEUE_EAGER`` tasks run in-process right after the commit instead,
+for development without a worker.
+"""
+
+import datetime
+import json
+import logging
+import traceback
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import Task, TaskStatusChoices, User
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+DEFAULT_MAX_ATTEMPTS = 5
+RETRY_DELAY = 30  # segundos
+MAX_RETRY_DELAY = 3600
+LOCK_TIMEOUT = datetime.timedelta(minutes=10)
+
+
+def task(name=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Register the decorated function as a task the worker can run."""
+
+    def decorator(func):
+        func.task_name = name or f"{func.__module__}.{func.__name__}"
+        func.max_attempts = max_attempts
+        REGISTRY[func.task_name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(func, *args, **kwargs):
+    """Run the task ``func(*args, **kwargs)`` after the current transaction.
+
+    Nothing is queued if the transaction rolls back. Outside a transaction the
+    task is queued immediately.
+    """
+    if getattr(func, "task_name", None) not in REGISTRY:
+        raise ValueError(f"{func!r} is not a registered task")
+    # Serializar ahora, para que un argumento inválido falle en quien encola
+    payload = json.loads(
+        json.dumps({"args": args, "kwargs": kwargs}, cls=DjangoJSONEncoder)
+    )
+
+    def store():
+        if getattr(settings, "TASK_QUEUE_EAGER", False):
+            try:
+                func(*payload["args"], **payload["kwargs"])
+            except Exception:
+                logger.exception(f"Error en la tarea {func.task_name}")
+            return
+        Task.objects.create(
+            name=func.task_name, payload=payload, max_attempts=func.max_attempts
+        )
+
+    transaction.on_commit(store)
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next try after ``attempts`` failures."""
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def claim(limit=10):
+    """Mark up to ``limit`` due tasks as running and return them."""
+    now = timezone.now()
+    due = Q(status=TaskStatusChoices.PENDING, run_after__lte=now) | Q(
+        status=TaskStatusChoices.RUNNING, locked_at__lt=now - LOCK_TIMEOUT
+    )
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("run_after")[:limit]
+        )
+        Task.objects.filter(pk__in=[claimed.pk for claimed in tasks]).update(
+            status=TaskStatusChoices.RUNNING,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+    for claimed in tasks:
+        claimed.status = TaskStatusChoices.RUNNING
+        claimed.locked_at = now
+        claimed.attempts += 1
+    return tasks
+
+
+def execute(claimed):
+    """Run a claimed task; delete it on success, reschedule or bury it if not.
+
+    Returns whether the task succeeded.
+    """
+    func = REGISTRY.get(claimed.name)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task {claimed.name!r}")
+        func(*claimed.payload.get("args", ()), **claimed.payload.get("kwargs", {}))
+    except Exception:
+        error = traceback.format_exc()
+        if claimed.attempts >= claimed.max_attempts:
+            logger.error(
+                f"Tarea {claimed.pk} ({claimed.name}) falló {claimed.attempts} "
+                f"veces; queda como fallida.\n{error}"
+            )
+            changes = {"status": TaskStatusChoices.DEAD}
+        else:
+            delay = retry_delay(claimed.attempts)
+            logger.warning(
+                f"Tarea {claimed.pk} ({claimed.name}) falló (intento "
+                f"{claimed.attempts}); se reintenta en {delay} s.\n{error}"
+            )
+            changes = {
+                "status": TaskStatusChoices.PENDING,
+                "run_after": timezone.now() + datetime.timedelta(seconds=delay),
+            }
+        Task.objects.filter(pk=claimed.pk).update(
+            locked_at=None, last_error=error, **changes
+        )
+        return False
+    Task.objects.filter(pk=claimed.pk).delete()
+    return True
+
+
+def run_pending(limit=10):
+    """Claim and run one batch of due tasks; return how many were run."""
+    claimed = claim(limit)
+    for pending in claimed:
+        execute(pending)
+    return len(claimed)
+
+
+# Tasks -----------------------------------------------------------------------
+
+
+@task()
+def send_email(subject, body, to, html_body=None, from_email=None):
+    """Send one email; ``to`` is a list of addresses."""
+    message = EmailMultiAlternatives(
+        subject, body, from_email or settings.DEFAULT_FROM_EMAIL, to
+    )
+    if html_body:
+        message.attach_alternative(html_body, "text/html")
+    message.send()
+
+
+@task()
+def send_password_email(
+    user_pk,
+    subject_template_name,
+    email_template_name,
+    domain,
+    use_https=False,
+    html_email_template_name=None,
+    from_email=None,
+):
+    """Send a link to set the password of user ``user_pk``.
+
+    The token is generated here rather than when the task is queued, so it
+    never sits in the task table. The templates get the context of Django's
+    password reset email plus ``reset_link``. Nothing is sent if the user no
+    longer exists or has no email address.
+    """
+    user = User.objects.filter(pk=user_pk).first()
+    email = user and getattr(user, User.get_email_field_name())
+    if not email:
+        return
+    protocol = "https" if use_https else "http"
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    path = reverse("password_reset_confirm", kwargs={"uidb64": uid, "token": token})
+    context = {
+        "email": email,
+        "domain": domain,
+        "site_name": domain,
+        "uid": uid,
+        "user": user,
+        "token": token,
+        "protocol": protocol,
+        "reset_link": f"{protocol}://{domain}{path}",
+    }
+    # El asunto no puede tener saltos de línea
+    subject = "".join(render_to_string(subject_template_name, context).splitlines())
+    html_body = None
+    if html_email_template_name is not None:
+        html_body = render_to_string(html_email_template_name, context)
+    send_email(
+        subject,
+        render_to_string(email_template_name, context),
+        [email],
+        html_body=html_body,
+        from_email=from_email,
+    )
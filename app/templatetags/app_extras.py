@@ -13,8 +13,19 @@ def url_replace(context, **kwargs):
     """Este template tag reemplaza o añade parámetros GET en la URL actual.
 
     Esencial para que la paginación funcione correctamente con los filtros.
+    Un valor ``None`` quita el parámetro (p. ej. ``page=None`` al pasar a
+    la paginación por cursor, o ``cursor=None`` para volver al inicio).
     """
     query = context["request"].GET.copy()
     for key, value in kwargs.items():
-        query[key] = value
+        if value is None:
+            query.pop(key, None)
+        else:
+            query[key] = value
     return query.urlencode()
+
+
+@register.simple_tag(takes_context=True)
+def url_replace_param(context, name, value):
+    """Como ``url_replace``, para un parámetro cuyo nombre está en una variable."""
+    return url_replace(context, **{name: value})
@@ -0,0 +1,65 @@
+from django.apps import apps as django_apps
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..backends import CachedModelBackend
+from ..models import Role, RoleChoices, User
+
+
+@override_settings(AUTH_CACHE_ENABLED=True)
+class CachedModelBackendTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedModelBackend()
+        self.role_cliente, _ = Role.objects.get_or_create(name=RoleChoices.CLIENTE)
+        self.role_gerente, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        self.user = User.objects.create_user(username="cacheuser", password="pwd")
+        self.user.roles.add(self.role_cliente)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_steady_state_lookups_do_not_query(self):
+        """Once warmed up, user, role and permission lookups come from the cache."""
+        warm_user = self.backend.get_user(self.user.pk)
+        self.assertTrue(warm_user.has_perm("app.view_report"))
+        self.assertTrue(warm_user.is_cliente)
+
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertTrue(user.has_perm("app.view_report"))
+            self.assertFalse(user.has_perm("app.add_user"))
+            self.assertTrue(user.is_cliente)
+
+    def test_role_change_invalidates_cached_permissions(self):
+        """Adding a role through the sync signal refreshes roles and permissions."""
+        user = self.backend.get_user(self.user.pk)
+        self.assertFalse(user.has_perm("app.add_user"))
+        self.assertFalse(user.is_gerente)
+
+        self.user.roles.add(self.role_gerente)
+
+        user = self.backend.get_user(self.user.pk)
+        self.assertTrue(user.has_perm("app.add_user"))
+        self.assertTrue(user.is_gerente)
+
+    def test_assign_role_permissions_invalidates_all_users(self):
+        """Re-running the post_migrate permission sync drops cached permissions."""
+        user = self.backend.get_user(self.user.pk)
+        self.assertTrue(user.has_perm("app.view_report"))
+
+        # Remove the permission without going through m2m signals
+        Group.permissions.through.objects.filter(
+            group__name=RoleChoices.CLIENTE
+        ).delete()
+        self.assertTrue(self.backend.get_user(self.user.pk).has_perm("app.view_report"))
+
+        app_config = django_apps.get_app_config("app")
+        app_config.assign_role_permissions(sender=app_config)
+        Group.permissions.through.objects.filter(
+            group__name=RoleChoices.CLIENTE
+        ).delete()
+        self.assertFalse(
+            self.backend.get_user(self.user.pk).has_perm("app.view_report")
+        )
@@ -95,6 +95,24 @@ class ChecklistItemStatusTest(TestCase):
 
         self.assertEqual(self.process.get_progress_percentage(), 100)
 
+    def test_with_progress_annotation(self):
+        """Test that with_progress annotates the same value without extra queries."""
+        empty_process = Process.objects.create(
+            user=self.user, process_type=ProcessTypeChoices.OTRO
+        )
+        self.checklist_item.status = ChecklistItemStatusChoices.APROBADO
+        self.checklist_item.save()
+
+        with self.assertNumQueries(1):
+            processes = {
+                p.pk: p
+                for p in Process.objects.filter(
+                    pk__in=[self.process.pk, empty_process.pk]
+                ).with_progress()
+            }
+            self.assertEqual(processes[self.process.pk].get_progress_percentage(), 50)
+            self.assertEqual(processes[empty_process.pk].get_progress_percentage(), 0)
+
     def test_reset_checklist_items(self):
         """Test that resetting checklist items sets status to 'Pendiente'."""
         self.checklist_item.status = ChecklistItemStatusChoices.APROBADO
@@ -430,3 +430,52 @@ class ClientDashboardTest(TestCase):
             response,
             f'href="/?proceso_activo={ProcessTypeChoices.ESTUDIO_AMBIENTAL.value}"',
         )
+
+    def test_equipos_asociados_ranking_via_process_and_reports(self):
+        """El top 5 ordena por el proceso activo más reciente (directo o vía reportes)."""
+        # Equipo sin proceso directo, ligado solo por un reporte a un proceso nuevo
+        equipo_via_reporte = Equipment.objects.create(
+            nombre="Equipo Vía Reporte", serial="SN-REP-001", user=self.user
+        )
+        proceso_reciente = Process.objects.create(
+            user=self.user,
+            process_type=self.process_type_calidad,
+            estado=ProcessStatusChoices.EN_PROGRESO,
+        )
+        Report.objects.create(
+            user=self.user,
+            process=proceso_reciente,
+            equipment=equipo_via_reporte,
+            title="Reporte vía equipo",
+            estado_reporte=EstadoReporteChoices.EN_GENERACION,
+            pdf_file=SimpleUploadedFile(
+                self.temp_pdf_file_name, self.temp_pdf_file_content
+            ),
+        )
+        # Un proceso finalizado no hace que el equipo califique
+        self.process_asesoria.estado = ProcessStatusChoices.FINALIZADO
+        self.process_asesoria.save()
+
+        response = self.client.get(reverse("home"))
+        equipos = list(response.context["equipos_asociados"])
+        self.assertEqual(
+            equipos,
+            [equipo_via_reporte, self.equipment_calidad, self.equipment_blindajes],
+        )
+
+        url = reverse("home") + f"?proceso_activo={self.process_type_blindajes.value}"
+        response = self.client.get(url)
+        self.assertEqual(
+            list(response.context["equipos_asociados"]), [self.equipment_blindajes]
+        )
+
+    def test_equipos_asociados_is_limited_to_five(self):
+        for i in range(7):
+            Equipment.objects.create(
+                nombre=f"Equipo extra {i}",
+                serial=f"SN-EXTRA-{i}",
+                user=self.user,
+                process=self.proceso_blindajes_activo,
+            )
+        response = self.client.get(reverse("home"))
+        self.assertEqual(len(response.context["equipos_asociados"]), 5)
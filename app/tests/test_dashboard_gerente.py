@@ -1,7 +1,9 @@
 from datetime import date, timedelta
 
 from dateutil.relativedelta import relativedelta
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
@@ -308,3 +310,35 @@ class GerenteDashboardTest(TestCase):
         self.assertEqual(
             dict(zip(user_chart["labels"], user_chart["data"])), expected_users
         )
+
+    def test_user_completion_chart_excludes_clients_and_scales(self):
+        """La gráfica por usuario excluye clientes y no crece en consultas con los procesos."""
+        self.proceso_finalizado_mes_actual.assigned_to.add(self.cliente)
+        self.client.get(self.url)  # Calienta la sesión en caché
+
+        with CaptureQueriesContext(connection) as before:
+            response = self.client.get(self.url)
+        user_chart = response.context["user_completion_chart_data"]
+        self.assertNotIn(self.cliente.username, user_chart["labels"])
+
+        for _ in range(5):
+            proceso = Process.objects.create(
+                user=self.cliente,
+                process_type=ProcessTypeChoices.CONTROL_CALIDAD,
+                estado=ProcessStatusChoices.FINALIZADO,
+                fecha_final=timezone.now(),
+            )
+            proceso.assigned_to.set([self.tecnico1, self.tecnico2])
+
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(self.url)
+        user_chart = response.context["user_completion_chart_data"]
+        self.assertEqual(
+            dict(zip(user_chart["labels"], user_chart["data"])),
+            {
+                self.gerente.get_full_name(): 1,
+                self.tecnico1.get_full_name(): 6,
+                self.tecnico2.get_full_name(): 5,
+            },
+        )
+        self.assertEqual(len(after), len(before))
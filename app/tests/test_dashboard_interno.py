@@ -186,3 +186,37 @@ class InternoDashboardTest(TestCase):
         # Verificar contenido de la card de próximos a vencer
         self.assertContains(response, "Mis Procesos Próximos a Vencer (1)")
         self.assertContains(response, self.proceso_proximo.get_process_type_display())
+
+    def test_buckets_are_paginated_in_the_database(self):
+        """Cada grupo se pagina por separado y los conteos cubren todos los procesos."""
+        hoy = timezone.now()
+        for dias in range(1, 23):
+            proceso = Process.objects.create(
+                user=self.cliente,
+                process_type=ProcessTypeChoices.ASESORIA,
+                estado=ProcessStatusChoices.EN_PROGRESO,
+                fecha_final=hoy - timedelta(days=10 + dias),
+            )
+            proceso.assigned_to.add(self.usuario_interno)
+
+        self.client.login(username="tecnico1", password="password")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        vencidos = response.context["procesos_vencidos"]
+        self.assertEqual(len(vencidos), 20)
+        self.assertEqual(vencidos.paginator.num_pages, 2)
+        self.assertEqual(response.context["total_procesos_vencidos"], 23)
+        self.assertEqual(response.context["chart_data"]["data"], [23, 1, 1])
+        # Ordenados por fecha final: el más antiguo primero
+        self.assertEqual(vencidos[0].dias_vencido, 32)
+        self.assertContains(response, "Mis Procesos Vencidos (23)")
+        self.assertContains(response, "page_vencidos=2")
+
+        response = self.client.get(self.url, {"page_vencidos": 2})
+        vencidos = response.context["procesos_vencidos"]
+        self.assertEqual(len(vencidos), 3)
+        self.assertEqual(vencidos[2].pk, self.proceso_vencido.pk)
+        self.assertEqual(vencidos[2].dias_vencido, 10)
+        # Los otros grupos siguen en su primera página
+        self.assertEqual(response.context["procesos_proximos"].number, 1)
@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import stats
+from ..models import (
+    Equipment,
+    Process,
+    ProcessDailyStat,
+    ProcessStatusChoices,
+    ProcessTypeChoices,
+    QualityControlDailyStat,
+    User,
+)
+
+
+def stat_rows():
+    return set(
+        ProcessDailyStat.objects.filter(count__gt=0).values_list(
+            "fecha", "process_type", "estado", "assigned_to_id", "count"
+        )
+    )
+
+
+class DashboardStatsTest(TestCase):
+    def setUp(self):
+        self.cliente = User.objects.create_user(username="cliente", password="pwd")
+        self.tecnico = User.objects.create_user(username="tecnico", password="pwd")
+        self.fecha_final = timezone.now() - timedelta(days=2)
+        self.dia = timezone.localdate(self.fecha_final)
+
+    def create_process(self, **kwargs):
+        kwargs.setdefault("process_type", ProcessTypeChoices.CONTROL_CALIDAD)
+        kwargs.setdefault("fecha_final", self.fecha_final)
+        return Process.objects.create(user=self.cliente, **kwargs)
+
+    def test_rows_follow_process_changes(self):
+        """Los conteos se mueven con el estado, las asignaciones y el borrado."""
+        proceso = self.create_process()
+        proceso.assigned_to.add(self.tecnico)
+        en_progreso = ProcessStatusChoices.EN_PROGRESO
+        tipo = ProcessTypeChoices.CONTROL_CALIDAD
+        self.assertEqual(
+            stat_rows(),
+            {
+                (self.dia, tipo, en_progreso, None, 1),
+                (self.dia, tipo, en_progreso, self.tecnico.pk, 1),
+            },
+        )
+
+        proceso.estado = ProcessStatusChoices.FINALIZADO
+        proceso.save()
+        finalizado = ProcessStatusChoices.FINALIZADO
+        self.assertEqual(
+            stat_rows(),
+            {
+                (self.dia, tipo, finalizado, None, 1),
+                (self.dia, tipo, finalizado, self.tecnico.pk, 1),
+            },
+        )
+
+        self.tecnico.assigned_processes.clear()
+        self.assertEqual(stat_rows(), {(self.dia, tipo, finalizado, None, 1)})
+
+        proceso.delete()
+        self.assertEqual(stat_rows(), set())
+
+    def test_rebuild_command_matches_incremental_rows(self):
+        proceso = self.create_process()
+        proceso.assigned_to.add(self.tecnico)
+        self.create_process(
+            process_type=ProcessTypeChoices.ASESORIA,
+            estado=ProcessStatusChoices.FINALIZADO,
+        )
+        self.create_process(fecha_final=None)
+        incremental = stat_rows()
+
+        ProcessDailyStat.objects.all().delete()
+        call_command("rebuild_dashboard_stats", stdout=StringIO())
+
+        self.assertEqual(stat_rows(), incremental)
+        self.assertEqual(len(incremental), 4)
+
+    def test_quality_control_rows_follow_equipment(self):
+        equipo = Equipment.objects.create(
+            user=self.cliente, fecha_ultimo_control_calidad=date(2024, 1, 10)
+        )
+        Equipment.objects.create(
+            user=self.cliente, fecha_ultimo_control_calidad=date(2024, 1, 10)
+        )
+        self.assertEqual(QualityControlDailyStat.objects.get().count, 2)
+
+        equipo = Equipment.objects.get(pk=equipo.pk)
+        equipo.fecha_ultimo_control_calidad = date(2024, 2, 1)
+        equipo.save()
+        self.assertEqual(
+            dict(
+                QualityControlDailyStat.objects.filter(count__gt=0).values_list(
+                    "fecha", "count"
+                )
+            ),
+            {date(2024, 1, 10): 1, date(2024, 2, 1): 1},
+        )
+
+        equipo.delete()
+        self.assertEqual(
+            dict(
+                QualityControlDailyStat.objects.filter(count__gt=0).values_list(
+                    "fecha", "count"
+                )
+            ),
+            {date(2024, 1, 10): 1},
+        )
+
+    def test_deltas_reuse_existing_rows(self):
+        """Un delta sobre una clave existente la actualiza en vez de duplicarla."""
+        dia = date(2024, 1, 10)
+        stats.update_quality_control_stats([(dia, 1), (dia, 1)])
+        stats.update_quality_control_stats([(dia, 1), (None, 1)])
+        stats.update_quality_control_stats([(dia, -5)])
+        self.assertEqual(
+            list(QualityControlDailyStat.objects.values_list("fecha", "count")),
+            [(dia, 0)],
+        )
+
+    def test_save_does_not_recount(self):
+        """El coste de guardar no depende de cuántos procesos comparten el día."""
+        for _ in range(5):
+            self.create_process()
+        proceso = self.create_process()
+        proceso.estado = ProcessStatusChoices.FINALIZADO
+        with self.assertNumQueries(10):
+            proceso.save()
@@ -0,0 +1,97 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..date_ranges import date_range_q, filter_date_range, parse_date
+from ..models import Process, ProcessDailyStat, Report, Role, RoleChoices, User
+
+BOGOTA = ZoneInfo("America/Bogota")
+
+
+@override_settings(TIME_ZONE="America/Bogota")
+class DateRangeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="rango_fechas", password="p")
+        # 23:30 del 31 de mayo en Bogotá ya es 1 de junio en UTC
+        cls.fin_de_mayo = Report.objects.create(user=cls.user, title="Fin de mayo")
+        cls.inicio_de_junio = Report.objects.create(user=cls.user, title="Junio")
+        Report.objects.filter(pk=cls.fin_de_mayo.pk).update(
+            created_at=datetime(2024, 5, 31, 23, 30, tzinfo=BOGOTA)
+        )
+        Report.objects.filter(pk=cls.inicio_de_junio.pk).update(
+            created_at=datetime(2024, 6, 1, 0, 0, tzinfo=BOGOTA)
+        )
+
+    def test_local_dates_are_inclusive_half_open_ranges(self):
+        reports = Report.objects.order_by("pk")
+        self.assertQuerySetEqual(
+            filter_date_range(reports, "created_at", "2024-05-31", "2024-05-31"),
+            [self.fin_de_mayo],
+        )
+        self.assertQuerySetEqual(
+            filter_date_range(reports, "created_at", date(2024, 6, 1)),
+            [self.inicio_de_junio],
+        )
+        # Igual que el filtro __date al que reemplaza
+        self.assertQuerySetEqual(
+            reports.filter(created_at__date=date(2024, 5, 31)), [self.fin_de_mayo]
+        )
+
+    def test_filter_compares_the_raw_column(self):
+        queryset = filter_date_range(
+            Report.objects.all(), "created_at", "2024-05-01", "2024-05-31"
+        )
+        where = str(queryset.query).split("WHERE", 1)[1]
+        self.assertIn('"app_report"."created_at" >=', where)
+        self.assertIn('"app_report"."created_at" <', where)
+        self.assertNotIn("django_datetime_cast_date", where)
+
+    def test_invalid_or_missing_bounds_are_ignored(self):
+        self.assertIsNone(parse_date("31/05/2024"))
+        self.assertIsNone(parse_date(None))
+        self.assertEqual(len(date_range_q("created_at", "no es fecha", "")), 0)
+        self.assertEqual(
+            filter_date_range(Report.objects.all(), "created_at", "x", None).count(), 2
+        )
+
+    def test_date_fields_and_relations(self):
+        process = Process.objects.create(user=self.user)
+        Process.objects.filter(pk=process.pk).update(
+            fecha_inicio=datetime(2024, 5, 31, 23, 30, tzinfo=BOGOTA)
+        )
+        Report.objects.filter(pk=self.inicio_de_junio.pk).update(process=process)
+        self.assertQuerySetEqual(
+            filter_date_range(
+                Report.objects.all(),
+                "process__fecha_inicio",
+                "2024-05-31",
+                "2024-05-31",
+            ),
+            [self.inicio_de_junio],
+        )
+        ProcessDailyStat.objects.create(
+            fecha=date(2024, 5, 31), process_type="asesoria", estado="finalizado"
+        )
+        self.assertEqual(
+            filter_date_range(
+                ProcessDailyStat.objects.all(), "fecha", "2024-05-31", "2024-05-31"
+            ).count(),
+            1,
+        )
+        self.assertEqual(
+            date_range_q("fecha", "2024-05-31", "2024-05-31", datetimes=False).children,
+            [("fecha__gte", date(2024, 5, 31)), ("fecha__lte", date(2024, 5, 31))],
+        )
+
+    def test_report_list_filters_by_local_day(self):
+        role_gerente, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        self.user.roles.add(role_gerente)
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("report_list"),
+            {"start_date": "2024-06-01", "end_date": "2024-06-01"},
+        )
+        self.assertEqual(list(response.context["reports"]), [self.inicio_de_junio])
@@ -0,0 +1,162 @@
+import io
+import os
+from unittest import mock, skipUnless
+
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..downloads import RangeNotSatisfiable, parse_range
+from ..models import Report, Role, RoleChoices, User
+from ..storage import MockStorage, PDFStorage
+from ..uploads import report_storage
+
+CONTENT = b"%PDF-1.4\n" + bytes(range(256)) * 800
+
+
+class ParseRangeTest(SimpleTestCase):
+    def test_single_ranges(self):
+        cases = {
+            "bytes=0-99": (0, 99),
+            "bytes=100-": (100, 999),
+            "bytes=-10": (990, 999),
+            "bytes=-5000": (0, 999),
+            "bytes=900-5000": (900, 999),
+            "BYTES = 5-5": (5, 5),
+        }
+        for header, expected in cases.items():
+            with self.subTest(header):
+                self.assertEqual(parse_range(header, 1000), expected)
+
+    def test_whole_file_for_unsupported_ranges(self):
+        for header in ("bytes=0-1,5-6", "items=0-1", "bytes=5-1", "bytes=a-b", "-"):
+            with self.subTest(header):
+                self.assertIsNone(parse_range(header, 1000))
+
+    def test_unsatisfiable(self):
+        for header, size in (
+            ("bytes=1000-", 1000),
+            ("bytes=-0", 1000),
+            ("bytes=-1", 0),
+        ):
+            with self.subTest(header):
+                with self.assertRaises(RangeNotSatisfiable):
+                    parse_range(header, size)
+
+
+@skipUnless(isinstance(report_storage(), MockStorage), "Requiere USE_MOCK_STORAGE")
+class ReportDownloadViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role_cliente, _ = Role.objects.get_or_create(name=RoleChoices.CLIENTE)
+        role_gerente, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        cls.gerente = User.objects.create_user(username="gerente_dl", password="p")
+        cls.gerente.roles.add(role_gerente)
+        cls.cliente = User.objects.create_user(username="cliente_dl", password="p")
+        cls.otro = User.objects.create_user(username="otro_dl", password="p")
+        for user in (cls.cliente, cls.otro):
+            user.roles.add(role_cliente)
+        cls.report = Report.objects.create(user=cls.cliente, title="Grande")
+
+    def setUp(self):
+        self.report.pdf_file.save("grande.pdf", ContentFile(CONTENT), save=False)
+        self.addCleanup(self.report.pdf_file.delete, save=False)
+        Report.objects.filter(pk=self.report.pk).update(pdf_file=self.report.pdf_file)
+        self.url = reverse("report_download", kwargs={"pk": self.report.pk})
+        self.client.force_login(self.cliente)
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("inline", response["Content-Disposition"])
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_range(self):
+        response = self.client.get(self.url, headers={"Range": "bytes=100000-100099"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT[100000:100100])
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(
+            response["Content-Range"], f"bytes 100000-100099/{len(CONTENT)}"
+        )
+
+        response = self.client.get(
+            self.url, headers={"Range": f"bytes={len(CONTENT)}-"}
+        )
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(CONTENT)}")
+
+    def test_conditional_requests(self):
+        etag = self.client.head(self.url)["ETag"]
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Un If-Range que no coincide anula el Range: se envía todo el archivo
+        response = self.client.get(
+            self.url, headers={"Range": "bytes=0-9", "If-Range": '"otra"'}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            self.url, headers={"Range": "bytes=0-9", "If-Range": etag}
+        )
+        self.assertEqual(response.status_code, 206)
+
+    def test_head_sends_no_body(self):
+        with mock.patch.object(MockStorage, "stream") as stream:
+            response = self.client.head(self.url)
+        stream.assert_not_called()
+        self.assertEqual(response["Content-Length"], str(len(CONTENT)))
+
+    def test_access(self):
+        self.client.force_login(self.otro)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.gerente)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_front_proxy_modes(self):
+        with override_settings(
+            REPORT_DOWNLOAD_MODE="x-accel-redirect",
+            REPORT_DOWNLOAD_ACCEL_PREFIX="/interno/",
+        ):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/interno/" + self.report.pdf_file.name
+        )
+        self.assertEqual(response.content, b"")
+        with override_settings(REPORT_DOWNLOAD_MODE="x-sendfile"):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Sendfile"], self.report.pdf_file.path)
+
+
+class S3RangeStreamTest(SimpleTestCase):
+    def test_only_the_range_is_fetched(self):
+        with mock.patch.dict(os.environ, {"USE_MOCK_STORAGE": "False"}):
+            storage = PDFStorage(
+                bucket_name="bucket",
+                access_key="AKIATEST",
+                secret_key="secret",
+                region_name="us-east-1",
+            )
+        client = storage.connection.meta.client
+        chunk = CONTENT[10:20]
+        with Stubber(client) as stubber:
+            stubber.add_response(
+                "get_object",
+                {"Body": StreamingBody(io.BytesIO(chunk), len(chunk))},
+                {
+                    "Bucket": "bucket",
+                    "Key": "media/reports_pdfs/a.pdf",
+                    "Range": "bytes=10-19",
+                    "IfMatch": '"etag"',
+                },
+            )
+            streamed = storage.stream("reports_pdfs/a.pdf", 10, 19, 4, etag='"etag"')
+            self.assertEqual(list(streamed), [chunk[:4], chunk[4:8], chunk[8:]])
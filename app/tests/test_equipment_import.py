@@ -0,0 +1,321 @@
+import io
+import os
+import tempfile
+import time
+from datetime import date
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..equipment_import import (
+    ImportFileError,
+    import_equipment,
+    normalize_header,
+    read_rows,
+)
+from ..exports import iter_xlsx
+from ..models import (
+    ClientBranch,
+    ClientProfile,
+    Equipment,
+    EquipmentType,
+    EstadoEquipoChoices,
+    QualityControlDailyStat,
+    Role,
+    RoleChoices,
+    User,
+)
+
+HEADER = [
+    "Serial",
+    "Tipo de equipo",
+    "Marca",
+    "Modelo",
+    "Fecha de último control de calidad",
+    "Estado",
+    "NIT",
+    "Sede",
+]
+
+
+def csv_file(rows, delimiter=","):
+    lines = [delimiter.join(row) for row in rows]
+    return io.BytesIO(("\ufeff" + "\r\n".join(lines)).encode())
+
+
+def xlsx_file(rows):
+    return io.BytesIO(b"".join(iter_xlsx(rows[0], rows[1:])))
+
+
+class EquipmentImportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role_cliente, _ = Role.objects.get_or_create(name=RoleChoices.CLIENTE)
+        cls.cliente = User.objects.create_user(username="hospital", password="p")
+        cls.cliente.roles.add(role_cliente)
+        profile = ClientProfile.objects.create(
+            user=cls.cliente, razon_social="Hospital", nit="900123"
+        )
+        cls.sede = ClientBranch.objects.create(
+            company=profile,
+            nombre="Sede Norte",
+            direccion_instalacion="Calle 1",
+            departamento="Antioquia",
+            municipio="Medellín",
+        )
+        cls.tipo = EquipmentType.objects.create(name="Rayos X convencional")
+
+    def test_header_normalization(self):
+        self.assertEqual(
+            normalize_header("Fecha de Último Control de Calidad"),
+            "ultimo_control_calidad",
+        )
+        self.assertEqual(normalize_header(" tipo_equipo "), "tipo_equipo")
+
+    def test_creates_and_updates_by_serial(self):
+        existing = Equipment.objects.create(
+            serial="S-1",
+            nombre="Equipo viejo",
+            marca="Vieja",
+            fecha_ultimo_control_calidad=date(2024, 1, 10),
+        )
+        rows = [
+            HEADER,
+            [
+                "S-1",
+                "rayos x convencional",
+                "GE",
+                "M1",
+                "15/02/2024",
+                "En uso",
+                "900123",
+                "sede norte",
+            ],
+            ["S-2", "", "Philips", "", "2024-02-15", "", "hospital", ""],
+        ]
+        result = import_equipment(read_rows(csv_file(rows, ";"), "equipos.csv"))
+
+        self.assertEqual((result.total, result.created, result.updated), (2, 1, 1))
+        self.assertEqual(result.errors, [])
+        existing.refresh_from_db()
+        self.assertEqual(existing.marca, "GE")
+        self.assertEqual(existing.modelo, "M1")
+        # Las columnas que no están en el archivo no se tocan
+        self.assertEqual(existing.nombre, "Equipo viejo")
+        self.assertEqual(existing.equipment_type, self.tipo)
+        self.assertEqual(existing.user, self.cliente)
+        self.assertEqual(existing.sede, self.sede)
+        self.assertEqual(existing.fecha_ultimo_control_calidad, date(2024, 2, 15))
+        nuevo = Equipment.objects.get(serial="S-2")
+        self.assertEqual(nuevo.user, self.cliente)
+        self.assertIsNone(nuevo.modelo)
+        self.assertEqual(nuevo.estado_actual, EstadoEquipoChoices.EN_USO)
+
+        # bulk_create no envía señales: las estadísticas se recalculan
+        self.assertEqual(
+            dict(
+                QualityControlDailyStat.objects.filter(count__gt=0).values_list(
+                    "fecha", "count"
+                )
+            ),
+            {date(2024, 2, 15): 2},
+        )
+
+    def test_blank_cells_keep_stored_values(self):
+        existing = Equipment.objects.create(
+            serial="S-1",
+            marca="GE",
+            user=self.cliente,
+            sede=self.sede,
+            fecha_ultimo_control_calidad=date(2026, 1, 1),
+        )
+        rows = [
+            ["serial", "cliente", "marca", "fecha ultimo control calidad"],
+            ["S-1", "", "", ""],
+        ]
+        result = import_equipment(read_rows(csv_file(rows), "equipos.csv"))
+
+        self.assertEqual((result.updated, result.errors), (1, []))
+        existing.refresh_from_db()
+        self.assertEqual(existing.user, self.cliente)
+        self.assertEqual(existing.sede, self.sede)
+        self.assertEqual(existing.marca, "GE")
+        self.assertEqual(existing.fecha_ultimo_control_calidad, date(2026, 1, 1))
+        self.assertEqual(
+            dict(
+                QualityControlDailyStat.objects.filter(count__gt=0).values_list(
+                    "fecha", "count"
+                )
+            ),
+            {date(2026, 1, 1): 1},
+        )
+
+    def test_new_client_without_sede_clears_sede(self):
+        otro = User.objects.create_user(username="clinica", password="p")
+        otro.roles.add(Role.objects.get(name=RoleChoices.CLIENTE))
+        existing = Equipment.objects.create(
+            serial="S-1", user=self.cliente, sede=self.sede
+        )
+        Equipment.objects.create(serial="S-2", user=self.cliente, sede=self.sede)
+        rows = [["serial", "cliente"], ["S-1", "clinica"], ["S-2", "hospital"]]
+        result = import_equipment(read_rows(csv_file(rows), "equipos.csv"))
+
+        self.assertEqual((result.updated, result.errors), (2, []))
+        existing.refresh_from_db()
+        self.assertEqual(existing.user, otro)
+        self.assertIsNone(existing.sede)
+        # El mismo cliente conserva su sede
+        self.assertEqual(Equipment.objects.get(serial="S-2").sede, self.sede)
+
+    def test_row_errors_are_reported_and_skipped(self):
+        rows = [
+            HEADER,
+            ["A-1", "Tomógrafo", "", "", "", "", "", ""],
+            ["A-2", "", "", "", "31/02/2024", "", "", ""],
+            ["A-3", "", "", "", "", "Roto", "999", ""],
+            ["A-4", "", "", "", "", "", "900123", "Sede Sur"],
+            ["", "", "GE", "", "", "", "", ""],
+            ["A-5", "", "", "", "", "", "", ""],
+            ["A-5", "", "", "", "", "", "", ""],
+            ["", "", "", "", "", "", "", ""],
+        ]
+        result = import_equipment(read_rows(csv_file(rows), "equipos.csv"))
+
+        self.assertEqual(result.total, 7)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.error_rows, 6)
+        self.assertEqual(
+            [(error.row, error.column) for error in result.errors],
+            [
+                (2, "equipment_type"),
+                (3, "fecha_ultimo_control_calidad"),
+                (4, "estado_actual"),
+                (4, "user"),
+                (5, "sede"),
+                (6, "serial"),
+                (8, "serial"),
+            ],
+        )
+        self.assertEqual(
+            list(Equipment.objects.values_list("serial", flat=True)), ["A-5"]
+        )
+
+    def test_xlsx_with_excel_dates(self):
+        rows = [
+            ["Serial", "Marca", "Fecha de adquisición"],
+            ["X-1", "Siemens", 45337],
+            ["X-2", "Siemens", date(2024, 3, 1)],
+        ]
+        result = import_equipment(read_rows(xlsx_file(rows), "equipos.xlsx"))
+        self.assertEqual(result.created, 2)
+        self.assertEqual(
+            dict(Equipment.objects.values_list("serial", "fecha_adquisicion")),
+            {"X-1": date(2024, 2, 15), "X-2": date(2024, 3, 1)},
+        )
+
+    def test_dry_run_writes_nothing(self):
+        Equipment.objects.create(serial="D-1", marca="Vieja")
+        rows = [["serial", "marca"], ["D-1", "Nueva"], ["D-2", "Nueva"]]
+        result = import_equipment(
+            read_rows(csv_file(rows), "equipos.csv"), dry_run=True
+        )
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual(
+            list(Equipment.objects.values_list("serial", "marca")), [("D-1", "Vieja")]
+        )
+
+    def test_unreadable_files(self):
+        with self.assertRaises(ImportFileError):
+            import_equipment(read_rows(csv_file([["marca"], ["GE"]]), "equipos.csv"))
+        with self.assertRaises(ImportFileError):
+            import_equipment(read_rows(io.BytesIO(b"not a zip"), "equipos.xlsx"))
+        with self.assertRaises(ImportFileError):
+            read_rows(io.BytesIO(b""), "equipos.xls")
+
+    def test_ten_thousand_rows_in_few_queries(self):
+        rows = [["serial", "marca", "modelo", "último control de calidad"]] + [
+            [f"N-{i}", "GE", f"M{i % 7}", f"2024-01-{i % 28 + 1:02d}"]
+            for i in range(10000)
+        ]
+        started = time.monotonic()
+        with CaptureQueriesContext(connection) as queries:
+            result = import_equipment(read_rows(csv_file(rows), "equipos.csv"))
+        self.assertLess(time.monotonic() - started, 30)
+        # Consultas por lote, no por fila (SQLite parte los lotes en trozos
+        # más pequeños por su límite de parámetros)
+        self.assertLess(len(queries), len(rows) // 20)
+        self.assertEqual(result.created, 10000)
+        self.assertEqual(Equipment.objects.count(), 10000)
+        self.assertEqual(
+            sum(QualityControlDailyStat.objects.values_list("count", flat=True)), 10000
+        )
+
+
+class EquipmentImportEntryPointsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role_gerente, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        role_cliente, _ = Role.objects.get_or_create(name=RoleChoices.CLIENTE)
+        cls.gerente = User.objects.create_user(username="gerente_import", password="p")
+        cls.gerente.roles.add(role_gerente)
+        cls.cliente = User.objects.create_user(username="cliente_import", password="p")
+        cls.cliente.roles.add(role_cliente)
+
+    def upload(self, rows, **data):
+        content = csv_file(rows).getvalue()
+        return self.client.post(
+            reverse("equipos_import"),
+            {"archivo": SimpleUploadedFile("equipos.csv", content), **data},
+        )
+
+    def test_view_imports_and_lists_errors(self):
+        self.client.force_login(self.gerente)
+        response = self.upload(
+            [["serial", "estado"], ["V-1", "Dado de baja"], ["V-2", "Roto"]]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["result"].created, 1)
+        self.assertContains(response, "Estado desconocido.")
+        self.assertEqual(
+            Equipment.objects.get(serial="V-1").estado_actual,
+            EstadoEquipoChoices.DADO_DE_BAJA,
+        )
+
+    def test_view_validation_only(self):
+        self.client.force_login(self.gerente)
+        response = self.upload([["serial"], ["V-3"]], solo_validar="on")
+        self.assertTrue(response.context["result"].dry_run)
+        self.assertFalse(Equipment.objects.exists())
+
+    def test_view_rejects_other_formats_and_users(self):
+        self.client.force_login(self.gerente)
+        response = self.client.post(
+            reverse("equipos_import"),
+            {"archivo": SimpleUploadedFile("equipos.txt", b"serial\nT-1")},
+        )
+        self.assertFormError(
+            response.context["form"],
+            "archivo",
+            "Formato no soportado: use un archivo .csv o .xlsx.",
+        )
+        self.client.force_login(self.cliente)
+        self.assertEqual(self.client.get(reverse("equipos_import")).status_code, 403)
+
+    def test_command(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "equipos.csv")
+        with open(path, "wb") as file:
+            file.write(csv_file([["serial", "marca"], ["C-1", "GE"]]).getvalue())
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_equipment", path, "--dry-run", stdout=out, stderr=err)
+        self.assertIn("1 equipos nuevos", out.getvalue())
+        self.assertFalse(Equipment.objects.exists())
+        call_command("import_equipment", path, stdout=out, stderr=err)
+        self.assertTrue(Equipment.objects.filter(serial="C-1", marca="GE").exists())
+        with self.assertRaises(CommandError):
+            call_command("import_equipment", path + ".xls")
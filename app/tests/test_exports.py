@@ -0,0 +1,232 @@
+import csv
+import io
+import tracemalloc
+import zipfile
+from datetime import date
+from unittest import mock
+from xml.etree import ElementTree
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ..exports import iter_csv, iter_xlsx
+from ..models import (
+    ClientProfile,
+    Equipment,
+    EstadoReporteChoices,
+    Process,
+    ProcessStatusChoices,
+    ProcessTypeChoices,
+    Report,
+    Role,
+    RoleChoices,
+    User,
+)
+
+SHEET_NS = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def read_csv(response):
+    content = b"".join(response.streaming_content).decode("utf-8-sig")
+    return list(csv.reader(io.StringIO(content)))
+
+
+def read_xlsx(content):
+    """Devuelve las filas de la hoja como listas de textos / valores."""
+    with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+        assert workbook.testzip() is None
+        root = ElementTree.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+    rows = []
+    for row in root.iterfind("s:sheetData/s:row", SHEET_NS):
+        values = []
+        for cell in row.iterfind("s:c", SHEET_NS):
+            text = cell.find("s:is/s:t", SHEET_NS)
+            value = cell.find("s:v", SHEET_NS)
+            if text is not None:
+                values.append(text.text)
+            elif value is not None:
+                values.append(value.text)
+            else:
+                values.append(None)
+        rows.append(values)
+    return rows
+
+
+class ListExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role_gerente, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        role_cliente, _ = Role.objects.get_or_create(name=RoleChoices.CLIENTE)
+        cls.gerente = User.objects.create_user(username="gerente_export", password="p")
+        cls.gerente.roles.add(role_gerente)
+        cls.cliente = User.objects.create_user(username="cliente_export", password="p")
+        cls.cliente.roles.add(role_cliente)
+        ClientProfile.objects.create(
+            user=cls.cliente, razon_social="Clínica <Norte> & Cía", nit="9001"
+        )
+        cls.otro_cliente = User.objects.create_user(
+            username="otro_export", password="p"
+        )
+        cls.otro_cliente.roles.add(role_cliente)
+
+        cls.process = Process.objects.create(
+            user=cls.cliente,
+            process_type=ProcessTypeChoices.CONTROL_CALIDAD,
+            estado=ProcessStatusChoices.EN_REVISION,
+        )
+        Process.objects.create(
+            user=cls.otro_cliente, process_type=ProcessTypeChoices.ASESORIA
+        )
+        cls.equipo = Equipment.objects.create(
+            user=cls.cliente,
+            nombre="Arco en C",
+            serial="EXP-1",
+            process=cls.process,
+            fecha_vigencia_licencia=date(2025, 3, 31),
+        )
+        cls.otro_equipo = Equipment.objects.create(
+            user=cls.otro_cliente, nombre="Otro", serial="EXP-2"
+        )
+        cls.report = Report.objects.create(
+            user=cls.cliente,
+            process=cls.process,
+            equipment=cls.equipo,
+            title="Control anual",
+            estado_reporte=EstadoReporteChoices.APROBADO,
+        )
+        Report.objects.create(user=cls.otro_cliente, title="Blindajes")
+
+    def test_report_export_reuses_list_filters(self):
+        self.client.force_login(self.gerente)
+        response = self.client.get(
+            reverse("report_export"),
+            {"process_type": ProcessTypeChoices.CONTROL_CALIDAD, "page": "3"},
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="reportes_', response["Content-Disposition"])
+        header, *rows = read_csv(response)
+        self.assertEqual(header[:3], ["ID", "Título", "Estado"])
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(
+            rows[0][:5],
+            [
+                str(self.report.pk),
+                "Control anual",
+                "Aprobado",
+                "cliente_export",
+                "Clínica <Norte> & Cía",
+            ],
+        )
+
+    def test_client_only_exports_own_equipment(self):
+        self.client.force_login(self.cliente)
+        response = self.client.get(reverse("equipos_export"))
+        header, *rows = read_csv(response)
+        self.assertEqual([row[header.index("Serial")] for row in rows], ["EXP-1"])
+        self.assertEqual(rows[0][header.index("Vigencia de licencia")], "2025-03-31")
+
+    def test_client_exports_only_own_quality_control_history(self):
+        otro_proceso = Process.objects.create(
+            user=self.otro_cliente, process_type=ProcessTypeChoices.CONTROL_CALIDAD
+        )
+        Report.objects.create(
+            user=self.otro_cliente,
+            process=otro_proceso,
+            equipment=self.otro_equipo,
+            title="Control ajeno",
+        )
+        self.client.force_login(self.cliente)
+        for equipo, titles in (
+            (self.otro_equipo, []),
+            (self.equipo, ["Control anual"]),
+        ):
+            with self.subTest(equipo=equipo.serial):
+                response = self.client.get(
+                    reverse("report_export"),
+                    {
+                        "equipment_id": equipo.pk,
+                        "process_type": ProcessTypeChoices.CONTROL_CALIDAD,
+                    },
+                )
+                header, *rows = read_csv(response)
+                self.assertEqual([row[header.index("Título")] for row in rows], titles)
+
+    def test_process_export_as_xlsx(self):
+        self.client.force_login(self.gerente)
+        response = self.client.get(
+            reverse("process_internal_export"),
+            {"formato": "xlsx", "estado": ProcessStatusChoices.EN_REVISION},
+        )
+        self.assertEqual(
+            response["Content-Type"],
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        header, *rows = read_xlsx(b"".join(response.streaming_content))
+        self.assertEqual(
+            header[:4], ["ID", "Tipo de proceso", "Categoría de práctica", "Estado"]
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0][0], str(self.process.pk))
+        self.assertEqual(rows[0][1], "Control de Calidad")
+        self.assertEqual(rows[0][3], "En Revisión")
+        self.assertEqual(rows[0][5], "Clínica <Norte> & Cía")
+
+    def test_rows_are_not_loaded_as_model_instances(self):
+        self.client.force_login(self.gerente)
+        with mock.patch.object(Report, "from_db", side_effect=AssertionError):
+            response = self.client.get(reverse("report_export"))
+            self.assertEqual(len(read_csv(response)), 3)
+
+    def test_export_requires_list_permission(self):
+        self.client.force_login(self.cliente)
+        response = self.client.get(reverse("process_internal_export"))
+        self.assertEqual(response.status_code, 403)
+
+
+class XlsxStreamTest(TestCase):
+    def test_dates_and_escaping(self):
+        rows = [[1, "a & <b>", date(2024, 1, 1), None, True, "tab\x01"]]
+        header, row = read_xlsx(
+            b"".join(iter_xlsx(["n", "t", "d", "v", "b", "c"], rows))
+        )
+        self.assertEqual(header, ["n", "t", "d", "v", "b", "c"])
+        self.assertEqual(row, ["1", "a & <b>", "45292", None, "1", "tab"])
+
+    def test_formulas_are_written_as_text(self):
+        formula = '=HYPERLINK("http://x.co","ver")'
+        content = b"".join(iter_xlsx(["t"], [[formula]]))
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+        self.assertNotIn("<f>", sheet)
+        self.assertEqual(read_xlsx(content)[1], [formula])
+
+    def test_memory_stays_flat(self):
+        def rows(count):
+            for i in range(count):
+                yield [i, f"Equipo {i}", date(2024, 1, 1), "Clínica del Norte"]
+
+        def peak(count):
+            tracemalloc.start()
+            size = sum(
+                len(chunk) for chunk in iter_xlsx(["a", "b", "c", "d"], rows(count))
+            )
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return size, peak
+
+        small_size, small_peak = peak(2_000)
+        large_size, large_peak = peak(40_000)
+        self.assertGreater(large_size, small_size * 10)
+        # Veinte veces más filas no deben necesitar más memoria
+        self.assertLess(large_peak, small_peak * 2)
+
+
+class CsvStreamTest(TestCase):
+    def test_formula_prefixes_are_escaped(self):
+        values = ["=1+1", "+57 300", "-2", "@SUM(A1)", "\tx", "\rx", "a=b", -2]
+        content = "".join(iter_csv(["v"] * len(values), [values]))
+        row = list(csv.reader(io.StringIO(content.lstrip("\ufeff"))))[1]
+        self.assertEqual(
+            row, ["'=1+1", "'+57 300", "'-2", "'@SUM(A1)", "'\tx", "'\rx", "a=b", "-2"]
+        )
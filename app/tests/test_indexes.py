@@ -0,0 +1,179 @@
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from ..date_ranges import filter_date_range
+from ..models import (
+    DeadlineBucket,
+    Equipment,
+    Process,
+    ProcessStatusChoices,
+    ProcessStatusLog,
+    ProcessTypeChoices,
+    Report,
+    User,
+)
+
+
+class ListViewIndexTest(TestCase):
+    """Las consultas de los listados y tableros usan un índice.
+
+    Se comprueba con ``QuerySet.explain()`` que el plan nombra el índice
+    esperado. En PostgreSQL se analizan las tablas y se desactivan el
+    sequential scan y el ordenamiento explícito: con tablas tan pequeñas el
+    planificador los prefiere, o elige otro índice y ordena después, aunque
+    exista el índice que da las filas ya ordenadas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f"index_user_{i}", password="p")
+            for i in range(5)
+        ]
+        hoy = date(2024, 6, 1)
+        estados = list(ProcessStatusChoices.values)
+        tipos = list(ProcessTypeChoices.values)
+        equipos, procesos = [], []
+        for i in range(100):
+            user = cls.users[i % len(cls.users)]
+            equipos.append(
+                Equipment(
+                    user=user,
+                    nombre=f"Equipo {i}",
+                    serial=f"IDX-{i}",
+                    fecha_adquisicion=hoy - timedelta(days=i * 7),
+                    fecha_vigencia_licencia=hoy + timedelta(days=i * 3),
+                    fecha_ultimo_control_calidad=hoy - timedelta(days=i * 2),
+                    fecha_vencimiento_control_calidad=hoy + timedelta(days=i * 2),
+                )
+            )
+            procesos.append(
+                Process(
+                    user=user,
+                    process_type=tipos[i % len(tipos)],
+                    estado=estados[i % len(estados)],
+                    fecha_final=timezone.now() + timedelta(days=i - 50),
+                )
+            )
+        Equipment.objects.bulk_create(equipos)
+        # Como en producción, casi todos los procesos están finalizados; si no,
+        # el planificador prefiere recorrer un índice y filtrar por estado
+        procesos.extend(
+            Process(
+                user=cls.users[i % len(cls.users)],
+                process_type=tipos[i % len(tipos)],
+                estado=ProcessStatusChoices.FINALIZADO,
+            )
+            for i in range(1000)
+        )
+        Process.objects.bulk_create(procesos)
+        # El primer usuario es un cliente entre muchos: pocos reportes son suyos
+        Report.objects.bulk_create(
+            Report(
+                user=cls.users[0] if i % 50 == 0 else cls.users[1 + i % 4],
+                title=f"Informe {i}",
+            )
+            for i in range(1000)
+        )
+        cls.process = Process.objects.first()
+        ProcessStatusLog.objects.bulk_create(
+            ProcessStatusLog(proceso=cls.process, estado_nuevo=estado)
+            for estado in estados
+        )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                for model in (Equipment, Process, ProcessStatusLog, Report):
+                    cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def assertUsesIndex(self, queryset, index_name):
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+                    cursor.execute("SET LOCAL enable_sort = off")
+            plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_report_lists(self):
+        self.assertUsesIndex(
+            Report.objects.order_by("-created_at"), "report_created_idx"
+        )
+        self.assertUsesIndex(
+            Report.objects.filter(user=self.users[0]).order_by("-created_at"),
+            "report_user_created_idx",
+        )
+        desde = date.today() - timedelta(days=30)
+        self.assertUsesIndex(
+            # Como en el listado, que siempre ordena por fecha
+            filter_date_range(
+                Report.objects.order_by("-created_at"), "created_at", desde
+            ),
+            "report_created_idx",
+        )
+
+    def test_equipment_date_filters(self):
+        desde, hasta = date(2024, 1, 1), date(2024, 3, 1)
+        for field, index_name in (
+            ("fecha_adquisicion", "equipment_adquisicion_idx"),
+            ("fecha_vigencia_licencia", "equipment_licencia_idx"),
+            ("fecha_ultimo_control_calidad", "equipment_ultimo_cc_idx"),
+            ("fecha_vencimiento_control_calidad", "equipment_venc_cc_idx"),
+        ):
+            with self.subTest(field=field):
+                queryset = Equipment.objects.filter(
+                    **{f"{field}__gte": desde, f"{field}__lte": hasta}
+                )
+                self.assertUsesIndex(queryset, index_name)
+
+    def test_client_dashboard_equipment(self):
+        hoy = date(2024, 6, 1)
+        self.assertUsesIndex(
+            Equipment.objects.filter(
+                user=self.users[0],
+                fecha_vigencia_licencia__lte=hoy + timedelta(days=30),
+            ),
+            "equipment_user_licencia_idx",
+        )
+        self.assertUsesIndex(
+            Equipment.objects.filter(
+                user=self.users[0],
+                fecha_vencimiento_control_calidad__lte=hoy + timedelta(days=30),
+            ),
+            "equipment_user_venc_cc_idx",
+        )
+
+    def test_active_process_deadlines(self):
+        activos = Process.objects.exclude(estado=ProcessStatusChoices.FINALIZADO)
+        self.assertUsesIndex(
+            activos.order_by("fecha_final"), "process_active_final_idx"
+        )
+        self.assertUsesIndex(
+            activos.in_deadline_bucket(DeadlineBucket.PROXIMO),
+            "process_active_final_idx",
+        )
+        self.assertUsesIndex(
+            activos.filter(user=self.users[0]).order_by("-fecha_inicio"),
+            "process_active_user_idx",
+        )
+
+    def test_process_lists(self):
+        self.assertUsesIndex(
+            Process.objects.order_by("-fecha_inicio"), "process_fecha_inicio_idx"
+        )
+        self.assertUsesIndex(
+            Process.objects.filter(estado=ProcessStatusChoices.EN_PROGRESO).order_by(
+                "-fecha_inicio"
+            ),
+            "process_estado_inicio_idx",
+        )
+
+    def test_process_status_history(self):
+        self.assertUsesIndex(
+            ProcessStatusLog.objects.filter(proceso=self.process).order_by(
+                "-fecha_cambio"
+            ),
+            "processlog_proceso_fecha_idx",
+        )
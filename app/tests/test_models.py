@@ -76,6 +76,29 @@ class UserModelTest(TestCase):
                 username="dupuser", email="second@example.com", password="pwd"
             )
 
+    def test_role_checks_share_one_query(self):
+        """Role helpers load the user's role names once and reuse them."""
+        role_cliente, _ = Role.objects.get_or_create(name=RoleChoices.CLIENTE)
+        self.user.roles.add(role_cliente)
+        user = User.objects.get(pk=self.user.pk)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(user.is_cliente)
+            self.assertFalse(user.is_gerente)
+            self.assertFalse(user.is_interno)
+            self.assertTrue(user.has_role(RoleChoices.GERENTE, RoleChoices.CLIENTE))
+
+    def test_role_cache_cleared_when_roles_change(self):
+        """Changing the roles through the instance refreshes the cached names."""
+        role_gerente, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        self.assertFalse(self.user.is_gerente)
+
+        self.user.roles.add(role_gerente)
+        self.assertTrue(self.user.is_gerente)
+
+        self.user.roles.clear()
+        self.assertFalse(self.user.is_gerente)
+
 
 class ReportModelTest(TestCase):
     def setUp(self):
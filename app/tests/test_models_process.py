@@ -1,8 +1,13 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from app.models import (
     ChecklistItemDefinition,
+    ChecklistItemStatusChoices,
+    ChecklistItemStatusLog,
     PracticeCategoryChoices,
     Process,
     ProcessStatusChoices,
@@ -476,6 +481,63 @@ class ProcessChecklistModelTests(TestCase):
             process_ctrl.checklist_items.filter(definition=self.def4_ctrl).exists()
         )  # Added assertion for 4th item
 
+    def test_checklist_items_are_bulk_created_without_status_logs(self):
+        """All items go in one INSERT and, as before, creation writes no item log."""
+        with CaptureQueriesContext(connection) as queries:
+            process = Process.objects.create(
+                process_type=ProcessTypeChoices.CONTROL_CALIDAD,
+                user=self.test_user,
+            )
+        item_inserts = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('INSERT INTO "app_processchecklistitem"')
+        ]
+        self.assertEqual(len(item_inserts), 1)
+        self.assertEqual(process.checklist_items.count(), 4)
+        self.assertFalse(
+            process.checklist_items.exclude(
+                status=ChecklistItemStatusChoices.PENDIENTE
+            ).exists()
+        )
+        self.assertFalse(
+            ChecklistItemStatusLog.objects.filter(item__process=process).exists()
+        )
+
+    @override_settings(CHECKLIST_DEFINITIONS_CACHE_TIMEOUT=60)
+    def test_checklist_definitions_cache(self):
+        """Definition ids are cached per type and refreshed when a definition changes."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Process.objects.create(
+            process_type=ProcessTypeChoices.CONTROL_CALIDAD, user=self.test_user
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            Process.objects.create(
+                process_type=ProcessTypeChoices.CONTROL_CALIDAD, user=self.test_user
+            )
+        self.assertFalse(
+            any(
+                'FROM "app_checklistitemdefinition"' in query["sql"]
+                for query in queries.captured_queries
+            )
+        )
+
+        new_definition = ChecklistItemDefinition.objects.create(
+            process_type=ProcessTypeChoices.CONTROL_CALIDAD,
+            name="Ítem adicional",
+            order=5,
+            percentage=0,
+        )
+        process = Process.objects.create(
+            process_type=ProcessTypeChoices.CONTROL_CALIDAD, user=self.test_user
+        )
+        self.assertEqual(process.checklist_items.count(), 5)
+        self.assertTrue(
+            process.checklist_items.filter(definition=new_definition).exists()
+        )
+
     def test_get_progress_percentage(self):
         """Test calculation of progress percentage."""
         process = Process.objects.create(
@@ -671,6 +733,61 @@ class ProcessChecklistModelTests(TestCase):
             modification_log.estado_anterior, ProcessStatusChoices.EN_PROGRESO
         )
 
+    def test_status_change_uses_loaded_values_instead_of_reselecting(self):
+        """Saving a loaded process compares estado with its snapshot, no extra SELECT."""
+        created = Process.objects.create(
+            process_type=ProcessTypeChoices.CALCULO_BLINDAJES, user=self.test_user
+        )
+        process = Process.objects.get(pk=created.pk)
+        process.estado = ProcessStatusChoices.EN_REVISION
+
+        with CaptureQueriesContext(connection) as queries:
+            process.save(user_who_modified=self.test_user)
+
+        self.assertFalse(
+            any(
+                query["sql"].startswith("SELECT")
+                and 'FROM "app_process" WHERE "app_process"."id" =' in query["sql"]
+                for query in queries.captured_queries
+            )
+        )
+        log = process.status_logs.latest("fecha_cambio")
+        self.assertEqual(log.estado_anterior, ProcessStatusChoices.EN_PROGRESO)
+        self.assertEqual(log.estado_nuevo, ProcessStatusChoices.EN_REVISION)
+
+    def test_status_change_respects_update_fields(self):
+        """An estado left out of update_fields is neither logged nor marked as saved."""
+        process = Process.objects.create(
+            process_type=ProcessTypeChoices.CALCULO_BLINDAJES, user=self.test_user
+        )
+        process.estado = ProcessStatusChoices.EN_REVISION
+        process.fecha_asignacion = timezone.now()
+        process.save(update_fields=["fecha_asignacion"])
+        self.assertEqual(process.status_logs.count(), 1)
+
+        process.save(update_fields=["estado"])
+        self.assertEqual(process.status_logs.count(), 2)
+        log = process.status_logs.latest("fecha_cambio")
+        self.assertEqual(log.estado_anterior, ProcessStatusChoices.EN_PROGRESO)
+
+    def test_checklist_item_status_change_with_update_fields(self):
+        """Saving only status also writes is_completed and logs the change."""
+        process = Process.objects.create(
+            process_type=ProcessTypeChoices.CALCULO_BLINDAJES, user=self.test_user
+        )
+        item = process.checklist_items.get(definition=self.def1_calc)
+        item.status = ChecklistItemStatusChoices.APROBADO
+        item.save(update_fields=["status"], user_who_modified=self.technical_user)
+
+        item.refresh_from_db()
+        self.assertTrue(item.is_completed)
+        log = ChecklistItemStatusLog.objects.get(item=item)
+        self.assertEqual(log.estado_anterior, ChecklistItemStatusChoices.PENDIENTE)
+        self.assertEqual(log.estado_nuevo, ChecklistItemStatusChoices.APROBADO)
+
+        item.save(update_fields=["status"])
+        self.assertEqual(ChecklistItemStatusLog.objects.filter(item=item).count(), 1)
+
     def test_create_checklist_items_niveles_de_referencia(self):
         """Test that checklist items are created for the 'Niveles de Referencia' process type."""
         # Contar cuántos items deberían crearse (la suma de los de blindajes)
@@ -1,10 +1,12 @@
 import os
 import tempfile
+from unittest import mock
 
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
+from ..middleware import SESSION_REFRESHED_AT_KEY
 from ..models import (
     Equipment,
     Process,
@@ -65,6 +67,38 @@ class AuthenticationTest(TestCase):
         self.assertIsNone(self.client.session.get("_auth_user_id"))
 
 
+@override_settings(SESSION_SAVE_EVERY_REQUEST=False, SESSION_REFRESH_INTERVAL_MINUTES=5)
+class ThrottledSessionRefreshTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="pwd")
+        self.client.force_login(self.user)
+
+    def _get_home(self, now):
+        with mock.patch("app.middleware._now", return_value=now):
+            return self.client.get(reverse("home"))
+
+    def test_session_refreshed_only_after_interval(self):
+        """The session cookie is re-issued once per interval, not per request."""
+        response = self._get_home(1_000_000)
+        self.assertIn("sessionid", response.cookies)
+        self.assertEqual(self.client.session[SESSION_REFRESHED_AT_KEY], 1_000_000)
+
+        response = self._get_home(1_000_000 + 60)
+        self.assertNotIn("sessionid", response.cookies)
+        self.assertEqual(self.client.session[SESSION_REFRESHED_AT_KEY], 1_000_000)
+
+        response = self._get_home(1_000_000 + 5 * 60)
+        self.assertIn("sessionid", response.cookies)
+        self.assertEqual(
+            self.client.session[SESSION_REFRESHED_AT_KEY], 1_000_000 + 5 * 60
+        )
+
+    def test_anonymous_requests_do_not_create_sessions(self):
+        self.client.logout()
+        response = self._get_home(1_000_000)
+        self.assertNotIn("sessionid", response.cookies)
+
+
 class ProtectedResourceTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
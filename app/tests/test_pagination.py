@@ -0,0 +1,239 @@
+import html
+from datetime import timedelta
+from urllib.parse import parse_qs
+
+from django.db import connection
+from django.db.models import F
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import (
+    ClientProfile,
+    Equipment,
+    Process,
+    ProcessTypeChoices,
+    Report,
+    Role,
+    RoleChoices,
+    User,
+)
+from ..pagination import KeysetPaginator, UnsupportedOrdering
+
+
+def walk(paginator):
+    """Recorre todas las páginas hacia adelante y luego hacia atrás."""
+    pages = [paginator.get_page()]
+    while pages[-1].has_next():
+        pages.append(paginator.get_page(pages[-1].next_cursor))
+    backwards = [pages[-1]]
+    while backwards[-1].has_previous():
+        backwards.append(paginator.get_page(backwards[-1].previous_cursor))
+    return pages, backwards[::-1]
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="keyset", password="p")
+        reports = Report.objects.bulk_create(
+            Report(user=cls.user, title=f"Informe {i}") for i in range(11)
+        )
+        # Varios reportes con el mismo created_at: el desempate es la pk
+        base = timezone.now().replace(microsecond=123456)
+        for i, report in enumerate(reports):
+            Report.objects.filter(pk=report.pk).update(
+                created_at=base - timedelta(seconds=i // 3)
+            )
+
+    def assertWalksLikeOffset(self, queryset, per_page=4):
+        expected = [obj.pk for obj in queryset]
+        pages, backwards = walk(KeysetPaginator(queryset, per_page))
+        self.assertEqual([obj.pk for page in pages for obj in page], expected)
+        self.assertEqual(
+            [[obj.pk for obj in page] for page in backwards],
+            [[obj.pk for obj in page] for page in pages],
+        )
+        self.assertFalse(pages[0].has_previous())
+        self.assertFalse(pages[-1].has_next())
+
+    def test_ties_are_broken_by_pk(self):
+        self.assertWalksLikeOffset(Report.objects.order_by("-created_at", "-pk"))
+        paginator = KeysetPaginator(Report.objects.order_by("-created_at"), 4)
+        self.assertEqual([key.name for key in paginator.keys], ["created_at", "pk"])
+        pages, _ = walk(paginator)
+        pks = [obj.pk for page in pages for obj in page]
+        self.assertEqual(len(pks), 11)
+        self.assertEqual(len(set(pks)), 11)
+
+    def test_nullable_keys_keep_null_placement(self):
+        process = Process.objects.create(
+            user=self.user, process_type=ProcessTypeChoices.ASESORIA
+        )
+        for i in range(7):
+            Equipment.objects.create(
+                nombre=f"Equipo {i}",
+                serial=f"KS-{i}",
+                process=process if i % 2 else None,
+            )
+        fecha = F("process__fecha_inicio")
+        for ordering, nulls_last in (
+            (fecha.desc(nulls_last=True), True),
+            (fecha.asc(nulls_first=True), False),
+        ):
+            with self.subTest(ordering=ordering):
+                queryset = Equipment.objects.order_by(ordering)
+                pages, _ = walk(KeysetPaginator(queryset, 2))
+                self.assertEqual(
+                    [equipo.process_id is None for equipo in pages[0]],
+                    [not nulls_last] * 2,
+                )
+                self.assertWalksLikeOffset(
+                    Equipment.objects.order_by(ordering, "-pk"), per_page=2
+                )
+        # Sin indicarlo, donde los pone el motor (primero en PostgreSQL),
+        # como la paginación por desplazamiento de la misma vista
+        for ordering in ("-process__fecha_inicio", "process__fecha_inicio"):
+            with self.subTest(ordering=ordering):
+                self.assertWalksLikeOffset(
+                    Equipment.objects.order_by(ordering, "-pk"), per_page=2
+                )
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = KeysetPaginator(Report.objects.order_by("-created_at"), 4)
+        first = [obj.pk for obj in paginator.get_page()]
+        for cursor in ("no-es-un-cursor", "e30", "eyJkIjogIm5leHQiLCAidiI6IFsxXX0"):
+            with self.subTest(cursor=cursor):
+                self.assertEqual([obj.pk for obj in paginator.get_page(cursor)], first)
+
+    def test_unsupported_ordering(self):
+        with self.assertRaises(UnsupportedOrdering):
+            KeysetPaginator(Report.objects.order_by("?"), 4)
+
+    def test_count_modes(self):
+        queryset = Report.objects.order_by("-created_at")
+        self.assertIsNone(KeysetPaginator(queryset, 4, count_mode="none").count)
+        self.assertEqual(KeysetPaginator(queryset, 4, count_mode="exact").count, 11)
+        paginator = KeysetPaginator(queryset, 4)
+        if connection.vendor != "postgresql":
+            # Sin estadísticas del planificador se cuenta
+            self.assertEqual(paginator.count, 11)
+            self.assertFalse(paginator.count_is_estimated)
+
+
+@override_settings(KEYSET_PAGINATION=True, KEYSET_PAGINATION_COUNT="none")
+class KeysetListViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role_gerente, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        role_cliente, _ = Role.objects.get_or_create(name=RoleChoices.CLIENTE)
+        cls.gerente = User.objects.create_user(username="gerente_keyset", password="p")
+        cls.gerente.roles.add(role_gerente)
+        cls.clientes = []
+        for i in range(3):
+            cliente = User.objects.create_user(username=f"cliente_ks_{i}", password="p")
+            cliente.roles.add(role_cliente)
+            cls.clientes.append(cliente)
+        ClientProfile.objects.create(user=cls.clientes[0], razon_social="Zeta", nit="1")
+        ClientProfile.objects.create(user=cls.clientes[1], razon_social="Alfa", nit="2")
+        Report.objects.bulk_create(
+            Report(user=cls.clientes[0], title=f"Informe {i}") for i in range(25)
+        )
+        Process.objects.bulk_create(
+            Process(user=cls.clientes[i % 3], process_type=ProcessTypeChoices.ASESORIA)
+            for i in range(25)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.gerente)
+
+    def follow_pages(self, url, params, context_name):
+        seen = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertTrue(response.context["keyset_pagination"])
+            seen.extend(response.context[context_name])
+            page = response.context["page_obj"]
+            if not page.has_next():
+                return seen, response
+            response = self.client.get(url, {**params, "cursor": page.next_cursor})
+
+    def test_report_list_pages_by_cursor_without_count(self):
+        url = reverse("report_list")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"page": "2"})
+        self.assertFalse(
+            any("COUNT(" in query["sql"].upper() for query in queries.captured_queries)
+        )
+        self.assertEqual(len(response.context["reports"]), 20)
+        self.assertContains(response, "cursor=")
+        self.assertNotContains(response, "page=2")
+
+        reports, _ = self.follow_pages(url, {}, "reports")
+        self.assertEqual(
+            [report.pk for report in reports],
+            list(
+                Report.objects.order_by("-created_at", "-pk").values_list(
+                    "pk", flat=True
+                )
+            ),
+        )
+
+    def test_equipment_list_keeps_offset_order(self):
+        proceso = Process.objects.first()
+        for i in range(25):
+            Equipment.objects.create(
+                user=self.clientes[0],
+                nombre=f"Equipo {i}",
+                serial=f"KL-{i}",
+                process=proceso if i % 2 else None,
+            )
+        url = reverse("equipos_list")
+        equipos, _ = self.follow_pages(url, {}, "equipos")
+        with self.settings(KEYSET_PAGINATION=False):
+            offset = [
+                equipo
+                for page in ("1", "2")
+                for equipo in self.client.get(url, {"page": page}).context["equipos"]
+            ]
+        # Los equipos sin proceso quedan en el mismo extremo en ambos modos
+        self.assertEqual(
+            [equipo.process_id is None for equipo in equipos],
+            [equipo.process_id is None for equipo in offset],
+        )
+
+    def test_internal_process_list_keeps_sort_options(self):
+        url = reverse("process_internal_list")
+        params = {"sort_by": "cliente", "sort_dir": "asc"}
+        procesos, response = self.follow_pages(url, params, "procesos")
+        self.assertEqual(len(procesos), 25)
+        self.assertEqual(len({proceso.pk for proceso in procesos}), 25)
+        razones = [
+            getattr(getattr(p.user, "client_profile", None), "razon_social", None)
+            for p in procesos
+        ]
+        # Alfa, Zeta y al final los clientes sin perfil (NULLS LAST)
+        self.assertEqual(razones, sorted(razones, key=lambda r: (r is None, r or "")))
+        # Los enlaces conservan el orden elegido
+        previous = response.context["page_obj"].previous_cursor
+        self.assertContains(response, "sort_by=cliente&amp;sort_dir=asc&amp;cursor=")
+        response = self.client.get(url, {**params, "cursor": previous})
+        self.assertEqual(len(response.context["procesos"]), 20)
+
+    @override_settings(KEYSET_PAGINATION=False)
+    def test_offset_pagination_by_default(self):
+        response = self.client.get(reverse("report_list"), {"page": "2"})
+        self.assertFalse(response.context["keyset_pagination"])
+        self.assertEqual(response.context["page_obj"].number, 2)
+
+
+class UrlReplaceTest(TestCase):
+    def test_none_removes_the_parameter(self):
+        request = RequestFactory().get("/", {"page": "3", "marca": "GE"})
+        template = Template(
+            "{% load app_extras %}{% url_replace cursor='abc' page=None %}"
+        )
+        rendered = html.unescape(template.render(Context({"request": request})))
+        self.assertEqual(parse_qs(rendered), {"marca": ["GE"], "cursor": ["abc"]})
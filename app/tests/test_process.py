@@ -1,7 +1,9 @@
 import re
 from datetime import date, datetime, timedelta, timezone
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone as tz
 
@@ -9,6 +11,7 @@ from ..models import (
     Anotacion,
     ChecklistItemDefinition,
     ChecklistItemStatusChoices,
+    ChecklistItemStatusLog,
     Equipment,
     Process,
     ProcessChecklistItem,
@@ -239,6 +242,39 @@ class ProcessAPITest(TestCase):
         self.assertTemplateUsed(response, "process/process_list.html")
         self.assertIn("equipos", response.context)
 
+    def test_process_list_most_recent_process_and_constant_queries(self):
+        """El proceso más reciente (directo o vía reportes) se resuelve en SQL."""
+        # El equipo 1 tiene un reporte del proceso más reciente con progreso 50%
+        Report.objects.create(
+            user=self.user,
+            process=self.process,
+            equipment=self.equipo1_proc1,
+            title="Reporte reciente",
+        )
+        self.client.get(self.url)  # Calentar la sesión
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        progress_map = response.context["equipment_progress_map"]
+        self.assertEqual(progress_map[self.equipo1_proc1.id]["process"], self.process)
+        self.assertEqual(progress_map[self.equipo1_proc1.id]["progress"], 50)
+        self.assertEqual(
+            progress_map[self.equipo4_proc4.id]["process"],
+            self.proceso4_blindajes_progreso,
+        )
+
+        # Más reportes por equipo no añaden consultas
+        for equipo in (self.equipo1_proc1, self.equipo2_proc2, self.equipo4_proc4):
+            for i in range(3):
+                Report.objects.create(
+                    user=self.user,
+                    process=self.proceso2_calidad_finalizado,
+                    equipment=equipo,
+                    title=f"Reporte {i}",
+                )
+        with self.assertNumQueries(len(queries)):
+            self.client.get(self.url)
+
     def test_process_detail_view(self):
         process = Process.objects.create(
             user=self.user,
@@ -677,6 +713,69 @@ class ProcessAPITest(TestCase):
         self.assertEqual(self.item1.completed_at, completed_at)
         self.assertIsNone(self.item1.completed_by)
 
+    def test_progress_form_saves_checklist_in_bulk(self):
+        """Changed items go in one UPDATE and their logs in one INSERT."""
+        items = [self.item1, self.item2]
+        for order in range(3, 16):
+            definition = ChecklistItemDefinition.objects.create(
+                process_type=ProcessTypeChoices.ASESORIA,
+                name=f"Ítem {order}",
+                order=order,
+                percentage=0,
+            )
+            items.append(
+                ProcessChecklistItem.objects.create(
+                    process=self.process, definition=definition
+                )
+            )
+        data = {
+            "estado": ProcessStatusChoices.EN_PROGRESO,
+            "checklist_items-TOTAL_FORMS": str(len(items)),
+            "checklist_items-INITIAL_FORMS": str(len(items)),
+            "checklist_items-MIN_NUM_FORMS": "0",
+            "checklist_items-MAX_NUM_FORMS": "1000",
+        }
+        for index, item in enumerate(items):
+            data[f"checklist_items-{index}-id"] = str(item.id)
+            data[f"checklist_items-{index}-status"] = (
+                ChecklistItemStatusChoices.APROBADO
+            )
+        url = reverse("process_progress", args=[self.process.id])
+        self.client.get(url)  # Calienta la sesión
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+
+        statements = [query["sql"] for query in queries.captured_queries]
+        self.assertEqual(
+            sum(
+                sql.startswith('UPDATE "app_processchecklistitem"')
+                for sql in statements
+            ),
+            1,
+        )
+        self.assertEqual(
+            sum(
+                sql.startswith('INSERT INTO "app_checklistitemstatuslog"')
+                for sql in statements
+            ),
+            1,
+        )
+        # Ninguna consulta por ítem
+        self.assertLess(len(statements), len(items))
+        # item2 ya estaba aprobado y no cambió: ni log ni completed_by
+        self.assertEqual(
+            ChecklistItemStatusLog.objects.filter(item__process=self.process).count(),
+            len(items) - 1,
+        )
+        self.assertEqual(
+            ProcessChecklistItem.objects.filter(
+                process=self.process, is_completed=True, completed_by=self.user
+            ).count(),
+            len(items) - 1,
+        )
+
     def test_process_detail_view_shows_status_logs(self):
         # Forzar algunos cambios de estado para generar logs
         self.proc1.estado = ProcessStatusChoices.EN_REVISION
@@ -0,0 +1,369 @@
+import logging
+import shutil
+import tempfile
+from datetime import date
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.contrib.auth.tokens import default_token_generator
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import get_resolver, resolve, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from ..middleware import QueryBudgetMiddleware
+from ..models import (
+    Anotacion,
+    ClientBranch,
+    ClientProfile,
+    Equipment,
+    HistorialTuboRayosX,
+    Process,
+    ProcessTypeChoices,
+    Report,
+    Role,
+    RoleChoices,
+    User,
+)
+from ..query_budget import QUERY_BUDGETS, QueryBudgetExceeded, fingerprint
+from .utils import QueryBudgetTestMixin
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ViewQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    """Cada vista de app/urls.py respeta su presupuesto de consultas."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Los PDF de setUpTestData van a un MEDIA_ROOT temporal
+        cls.addClassCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        role_gerente, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        role_cliente, _ = Role.objects.get_or_create(name=RoleChoices.CLIENTE)
+        role_director, _ = Role.objects.get_or_create(name=RoleChoices.DIRECTOR_TECNICO)
+
+        # Gerente con todos los permisos de la app (sin ser superusuario, para
+        # que las comprobaciones de permisos cuenten como en producción)
+        cls.gerente = User.objects.create_user(
+            username="gerente_budget", password="pwd"
+        )
+        cls.gerente.roles.add(role_gerente)
+        cls.gerente.user_permissions.set(
+            Permission.objects.filter(content_type__app_label="app")
+        )
+        cls.interno = User.objects.create_user(
+            username="interno_budget", password="pwd"
+        )
+        cls.interno.roles.add(role_director)
+
+        # Varias filas por tabla para que un N+1 se note en el conteo
+        cls.clientes = []
+        for i in range(3):
+            cliente = User.objects.create_user(
+                username=f"cliente_budget_{i}", password="pwd"
+            )
+            cliente.roles.add(role_cliente)
+            profile = ClientProfile.objects.create(
+                user=cliente, razon_social=f"Cliente {i}", nit=f"900{i}"
+            )
+            branch = ClientBranch.objects.create(company=profile, nombre=f"Sede {i}")
+            process = Process.objects.create(
+                user=cliente, process_type=ProcessTypeChoices.CONTROL_CALIDAD
+            )
+            process.assigned_to.add(cls.interno, cls.gerente)
+            equipment = Equipment.objects.create(
+                user=cliente,
+                nombre=f"Equipo {i}",
+                serial=f"SN-BUDGET-{i}",
+                process=process,
+                sede=branch,
+                fecha_ultimo_control_calidad=date.today(),
+            )
+            HistorialTuboRayosX.objects.create(
+                equipment=equipment,
+                marca="Marca",
+                modelo="Modelo",
+                serial=f"TUBO-{i}",
+                fecha_cambio=date.today(),
+            )
+            for j in range(2):
+                Report.objects.create(
+                    user=cliente,
+                    process=process,
+                    equipment=equipment,
+                    title=f"Reporte {i}-{j}",
+                    pdf_file=SimpleUploadedFile("budget.pdf", b"pdf"),
+                )
+            Anotacion.objects.create(
+                proceso=process, usuario=cls.gerente, contenido="Nota"
+            )
+            cls.clientes.append((cliente, profile, branch, process, equipment))
+
+        cls.cliente, cls.profile, cls.branch, cls.process, cls.equipment = cls.clientes[
+            0
+        ]
+        cls.report = Report.objects.filter(equipment=cls.equipment).first()
+
+    def url_cases(self):
+        """Devuelve ``(url_name, url, usuario[, cuerpo POST])`` para cada vista."""
+        uid = urlsafe_base64_encode(force_bytes(self.cliente.pk))
+        token = default_token_generator.make_token(self.cliente)
+        pk = {"pk": self.process.pk}
+        return [
+            ("home", reverse("home"), self.cliente),
+            ("dashboard_gerente", reverse("dashboard_gerente"), self.gerente),
+            ("dashboard_interno", reverse("dashboard_interno"), self.interno),
+            ("login", reverse("login"), None),
+            ("logout", reverse("logout"), self.gerente),
+            ("password_reset", reverse("password_reset"), None),
+            ("password_reset_done", reverse("password_reset_done"), None),
+            (
+                "password_reset_confirm",
+                reverse(
+                    "password_reset_confirm", kwargs={"uidb64": uid, "token": token}
+                ),
+                None,
+            ),
+            ("password_reset_complete", reverse("password_reset_complete"), None),
+            ("password_change", reverse("password_change"), self.gerente),
+            ("password_change_done", reverse("password_change_done"), self.gerente),
+            ("user_list", reverse("user_list"), self.gerente),
+            (
+                "user_detail",
+                reverse("user_detail", kwargs={"pk": self.cliente.pk}),
+                self.gerente,
+            ),
+            ("user_create", reverse("user_create"), self.gerente),
+            (
+                "user_update",
+                reverse("user_update", kwargs={"pk": self.cliente.pk}),
+                self.gerente,
+            ),
+            (
+                "user_delete",
+                reverse("user_delete", kwargs={"pk": self.cliente.pk}),
+                self.gerente,
+            ),
+            (
+                "client_profile_create",
+                reverse("client_profile_create", kwargs={"user_pk": self.interno.pk}),
+                self.gerente,
+            ),
+            (
+                "client_profile_update",
+                reverse("client_profile_update", kwargs={"pk": self.profile.pk}),
+                self.gerente,
+            ),
+            (
+                "client_branch_create",
+                reverse("client_branch_create", kwargs={"profile_pk": self.profile.pk}),
+                self.gerente,
+            ),
+            (
+                "client_branch_update",
+                reverse("client_branch_update", kwargs={"pk": self.branch.pk}),
+                self.gerente,
+            ),
+            ("report_list", reverse("report_list"), self.gerente),
+            (
+                "report_detail",
+                reverse("report_detail", kwargs={"pk": self.report.pk}),
+                self.gerente,
+            ),
+            (
+                "report_download",
+                reverse("report_download", kwargs={"pk": self.report.pk}),
+                self.cliente,
+            ),
+            ("report_create", reverse("report_create"), self.gerente),
+            (
+                "report_upload",
+                reverse("report_upload"),
+                self.gerente,
+                {
+                    "filename": "informe.pdf",
+                    "size": 1024,
+                    "content_type": "application/pdf",
+                    "checksum": "47DEQpj8HBSa+/TImW+5JCeuQeRkm5NMpJWZG3hSuFU=",
+                },
+            ),
+            (
+                "report_update",
+                reverse("report_update", kwargs={"pk": self.report.pk}),
+                self.gerente,
+            ),
+            (
+                "report_delete",
+                reverse("report_delete", kwargs={"pk": self.report.pk}),
+                self.gerente,
+            ),
+            (
+                "report_status_and_note",
+                reverse("report_status_and_note", kwargs={"pk": self.report.pk}),
+                self.gerente,
+            ),
+            ("report_export", reverse("report_export"), self.gerente),
+            ("process_list", reverse("process_list"), self.gerente),
+            ("process_internal_list", reverse("process_internal_list"), self.gerente),
+            (
+                "process_internal_export",
+                reverse("process_internal_export") + "?formato=xlsx",
+                self.gerente,
+            ),
+            ("process_detail", reverse("process_detail", kwargs=pk), self.gerente),
+            ("process_create", reverse("process_create"), self.gerente),
+            ("process_update", reverse("process_update", kwargs=pk), self.gerente),
+            ("process_delete", reverse("process_delete", kwargs=pk), self.gerente),
+            (
+                "process_update_assignment",
+                reverse("process_update_assignment", kwargs=pk),
+                self.gerente,
+            ),
+            ("process_progress", reverse("process_progress", kwargs=pk), self.gerente),
+            (
+                "anotacion_create",
+                reverse("anotacion_create", kwargs={"process_id": self.process.pk}),
+                self.gerente,
+            ),
+            ("equipos_list", reverse("equipos_list"), self.gerente),
+            ("equipos_export", reverse("equipos_export"), self.gerente),
+            ("equipos_import", reverse("equipos_import"), self.gerente),
+            (
+                "equipos_detail",
+                reverse("equipos_detail", kwargs={"pk": self.equipment.pk}),
+                self.gerente,
+            ),
+            ("equipos_create", reverse("equipos_create"), self.gerente),
+            (
+                "equipos_update",
+                reverse("equipos_update", kwargs={"pk": self.equipment.pk}),
+                self.gerente,
+            ),
+            (
+                "equipos_delete",
+                reverse("equipos_delete", kwargs={"pk": self.equipment.pk}),
+                self.gerente,
+            ),
+            (
+                "tubo_update",
+                reverse("tubo_update", kwargs={"pk": self.equipment.pk}),
+                self.gerente,
+            ),
+            (
+                "select2_model_user",
+                reverse("select2_model_user") + "?term=cliente",
+                self.gerente,
+            ),
+            (
+                "ajax_load_user_processes",
+                reverse("ajax_load_user_processes") + f"?user_id={self.cliente.pk}",
+                self.gerente,
+            ),
+            (
+                "ajax_load_user_equipment",
+                reverse("ajax_load_user_equipment") + f"?user_id={self.cliente.pk}",
+                self.gerente,
+            ),
+            (
+                "ajax_load_client_branches",
+                reverse("ajax_load_client_branches") + f"?user_id={self.cliente.pk}",
+                self.gerente,
+            ),
+        ]
+
+    def test_every_app_url_has_a_budget(self):
+        app_url_names = {
+            pattern.name
+            for pattern in get_resolver("app.urls").url_patterns
+            if getattr(pattern, "name", None)
+        }
+        self.assertEqual(app_url_names - set(QUERY_BUDGETS), set())
+        self.assertEqual({url_name for url_name, *_ in self.url_cases()}, app_url_names)
+
+    def test_views_stay_within_query_budget(self):
+        for url_name, url, user, *data in self.url_cases():
+            with self.subTest(url_name=url_name):
+                self.assertEqual(resolve(url.split("?")[0]).url_name, url_name)
+                if user:
+                    self.client.force_login(user)
+                # Las vistas solo POST llevan su cuerpo JSON como cuarto valor
+                if data:
+                    method = "POST"
+                    request = partial(
+                        self.client.post, url, data[0], content_type="application/json"
+                    )
+                else:
+                    method = "GET"
+                    request = partial(self.client.get, url)
+                # Se mide la primera request tras el login, la más cara: además
+                # carga el usuario sin caché y refresca la sesión.
+                with self.assertQueryBudget(url_name, method):
+                    response = request()
+                    if response.streaming:
+                        # Las exportaciones consultan mientras se transmiten
+                        b"".join(response.streaming_content)
+                self.assertLess(response.status_code, 400, url_name)
+                self.client.logout()
+
+
+class QueryBudgetMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get_response(self, request):
+        request.resolver_match = resolve(request.path)
+        for _ in range(3):
+            list(User.objects.filter(username="nadie"))
+        return HttpResponse("ok")
+
+    def test_disabled_middleware_is_not_used(self):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        with override_settings(QUERY_BUDGET_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                QueryBudgetMiddleware(self.get_response)
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGETS={"login": 2})
+    def test_logs_when_budget_is_exceeded(self):
+        middleware = QueryBudgetMiddleware(self.get_response)
+        with self.assertLogs("app.middleware", level=logging.WARNING) as logs:
+            middleware(self.factory.get(reverse("login")))
+        self.assertIn("exceeded its query budget of 2", logs.output[0])
+        self.assertIn("3x SELECT", logs.output[0])
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGETS={"login": 2})
+    def test_get_budget_does_not_apply_to_post(self):
+        middleware = QueryBudgetMiddleware(self.get_response)
+        with self.assertNoLogs("app.middleware", level=logging.WARNING):
+            middleware(self.factory.post(reverse("login")))
+        with self.assertLogs("app.middleware", level=logging.WARNING):
+            middleware(self.factory.head(reverse("login")))
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGETS={"login": {"POST": 2}})
+    def test_budget_per_method(self):
+        middleware = QueryBudgetMiddleware(self.get_response)
+        with self.assertNoLogs("app.middleware", level=logging.WARNING):
+            middleware(self.factory.get(reverse("login")))
+        with self.assertLogs("app.middleware", level=logging.WARNING) as logs:
+            middleware(self.factory.post(reverse("login")))
+        self.assertIn("POST /login/", logs.output[0])
+
+    @override_settings(
+        QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True, QUERY_BUDGETS={"login": 2}
+    )
+    def test_raises_when_configured(self):
+        middleware = QueryBudgetMiddleware(self.get_response)
+        with self.assertRaises(QueryBudgetExceeded):
+            middleware(self.factory.get(reverse("login")))
+
+    def test_fingerprint_collapses_in_lists(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s,  %s)'),
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s)'),
+        )
@@ -2,7 +2,9 @@ import os
 
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from app.models import Anotacion, Process, ProcessTypeChoices, Report, Role
 
@@ -121,3 +123,27 @@ class ReportHistoryTests(TestCase):
             pdf_file=self.file1,
         )
         self.assertEqual(Anotacion.objects.count(), 0)
+
+    def test_file_change_on_loaded_report_does_not_reselect_it(self):
+        """The stored file name comes from the load snapshot, not a second SELECT."""
+        report = Report.objects.get(pk=self.report.pk)
+        report.pdf_file = self.file1
+
+        with CaptureQueriesContext(connection) as queries:
+            report.save(user_who_modified=self.tech_user)
+
+        self.assertFalse(
+            any(
+                query["sql"].startswith("SELECT")
+                and 'FROM "app_report"' in query["sql"]
+                for query in queries.captured_queries
+            )
+        )
+        self.assertEqual(Anotacion.objects.count(), 1)
+
+    def test_no_anotacion_if_file_not_in_update_fields(self):
+        """A file that is not written (update_fields) is not reported as changed."""
+        self.report.pdf_file = self.file1
+        self.report.title = "Updated Title"
+        self.report.save(update_fields=["title"], user_who_modified=self.tech_user)
+        self.assertEqual(Anotacion.objects.count(), 0)
@@ -1147,7 +1147,7 @@ class Select2WidgetTest(TestCase):
         # Verificar la presencia de los atributos y clases de Select2
         self.assertContains(
             response,
-            'class="modelselect2widget form-select django-select2 django-select2-heavy"',
+            'class="clientselect2widget form-select django-select2 django-select2-heavy"',
         )
         self.assertContains(
             response, 'data-placeholder="Escriba para buscar un cliente..."'
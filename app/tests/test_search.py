@@ -0,0 +1,99 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import ClientProfile, Equipment, Report, Role, RoleChoices, User
+from ..views import ClientSelect2Widget
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role_cliente, _ = Role.objects.get_or_create(name=RoleChoices.CLIENTE)
+        role_gerente, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        cls.gerente = User.objects.create_user(username="gerente_search", password="p")
+        cls.gerente.roles.add(role_gerente)
+
+        cls.cliente = User.objects.create_user(
+            username="cliente_search",
+            password="p",
+            first_name="Juan",
+            last_name="Pérez",
+        )
+        cls.cliente.roles.add(role_cliente)
+        ClientProfile.objects.create(
+            user=cls.cliente, razon_social="Clínica del Norte", nit="900123456"
+        )
+        cls.otro_cliente = User.objects.create_user(
+            username="otro_search", password="p", first_name="Ana", last_name="Gómez"
+        )
+        cls.otro_cliente.roles.add(role_cliente)
+
+        cls.equipo = Equipment.objects.create(
+            nombre="Arco en C", marca="Siemens", modelo="Cios", serial="SN-001"
+        )
+        cls.otro_equipo = Equipment.objects.create(
+            nombre="Mamógrafo", marca="GE", modelo="Senographe", serial="SN-002"
+        )
+        cls.report = Report.objects.create(
+            user=cls.cliente,
+            equipment=cls.equipo,
+            title="Control de calidad anual",
+            description="Medidas de kV y dosis",
+        )
+        cls.otro_report = Report.objects.create(
+            user=cls.cliente, equipment=cls.otro_equipo, title="Cálculo de blindajes"
+        )
+
+    def test_every_word_must_match_some_field(self):
+        """Words can match different fields, but all of them must match."""
+        clientes = User.objects.filter(roles__name=RoleChoices.CLIENTE)
+        self.assertQuerySetEqual(
+            search.search(clientes, "juan norte", search.CLIENT_FIELDS),
+            [self.cliente],
+        )
+        self.assertFalse(
+            search.search(clientes, "juan gómez", search.CLIENT_FIELDS).exists()
+        )
+        self.assertEqual(search.search(clientes, "  ", search.CLIENT_FIELDS).count(), 2)
+
+    def test_user_lookup_searches_client_profile(self):
+        self.client.force_login(self.gerente)
+        response = self.client.get(reverse("select2_model_user"), {"term": "900123"})
+        self.assertEqual(
+            [result["id"] for result in response.json()["results"]], [self.cliente.pk]
+        )
+
+    def test_client_select2_widget_uses_search(self):
+        widget = ClientSelect2Widget()
+        request = RequestFactory().get("/")
+        self.assertQuerySetEqual(
+            widget.filter_queryset(request, "clínica pérez"), [self.cliente]
+        )
+
+    def test_equipment_list_searches_marca_and_nombre(self):
+        self.client.force_login(self.gerente)
+        url = reverse("equipos_list")
+        for term in ("siemens", "arco", "SN-001"):
+            response = self.client.get(url, {"text_search_term": term})
+            self.assertEqual(list(response.context["equipos"]), [self.equipo])
+
+    def test_report_list_searches_title_and_description(self):
+        self.client.force_login(self.gerente)
+        url = reverse("report_list")
+        response = self.client.get(url, {"q": "dosis"})
+        self.assertEqual(list(response.context["reports"]), [self.report])
+        response = self.client.get(url, {"q": "blindajes", "marca": "ge"})
+        self.assertEqual(list(response.context["reports"]), [self.otro_report])
+
+    @skipUnless(connection.vendor == "postgresql", "Ranking requires PostgreSQL")
+    def test_results_are_ranked_on_postgresql(self):
+        Equipment.objects.create(nombre="Equipo Siemens de respaldo", serial="SN-003")
+        results = search.search(
+            Equipment.objects.order_by("pk"), "siemens", search.EQUIPMENT_FIELDS
+        )
+        self.assertEqual(results.first(), self.equipo)
+        self.assertTrue(all(hasattr(equipo, "search_rank") for equipo in results))
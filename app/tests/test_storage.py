@@ -0,0 +1,160 @@
+import hashlib
+import os
+import posixpath
+import shutil
+import tempfile
+from unittest import mock
+
+from botocore.stub import Stubber
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import storage
+from ..models import Report, Role, RoleChoices, User
+from ..storage import MockStorage, PDFStorage
+
+PDF = b"%PDF-1.4\n%%EOF"
+
+
+@override_settings(PDF_URL_CACHE_TIMEOUT=2700)
+class PresignedUrlCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch.dict(os.environ, {"USE_MOCK_STORAGE": "False"}):
+            self.storage = PDFStorage(
+                bucket_name="bucket",
+                access_key="AKIATEST",
+                secret_key="secret",
+                region_name="us-east-1",
+                querystring_expire=3600,
+            )
+        client = self.storage.connection.meta.client
+        patcher = mock.patch.object(
+            client, "generate_presigned_url", wraps=client.generate_presigned_url
+        )
+        self.sign = patcher.start()
+        self.addCleanup(patcher.stop)
+        storage.URL_CACHE_STATS.clear()
+
+    def test_url_is_signed_once(self):
+        url = self.storage.url("reports_pdfs/a.pdf")
+        self.assertIn("Signature=", url)
+        self.assertEqual(self.storage.url("reports_pdfs/a.pdf"), url)
+        self.assertEqual(self.sign.call_count, 1)
+        self.assertEqual(
+            storage.url_cache_stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        )
+        # Otros parámetros no pasan por la caché
+        self.assertNotEqual(self.storage.url("reports_pdfs/a.pdf", expire=60), url)
+        self.assertEqual(self.sign.call_count, 2)
+
+    def test_batch_signs_only_the_misses(self):
+        cached = self.storage.url("reports_pdfs/a.pdf")
+        names = ["reports_pdfs/a.pdf", "reports_pdfs/b.pdf", "reports_pdfs/a.pdf"]
+        with mock.patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            urls = self.storage.urls(name for name in names)
+        get_many.assert_called_once()
+        self.assertEqual(set(urls), {"reports_pdfs/a.pdf", "reports_pdfs/b.pdf"})
+        self.assertEqual(urls["reports_pdfs/a.pdf"], cached)
+        self.assertIn("reports_pdfs/b.pdf", urls["reports_pdfs/b.pdf"])
+        self.assertEqual(self.sign.call_count, 2)
+
+    def test_entries_expire_before_the_url(self):
+        with override_settings(PDF_URL_CACHE_TIMEOUT=10_000):
+            self.assertEqual(self.storage._url_cache_timeout(), 3540)
+        with mock.patch.object(cache, "set_many", wraps=cache.set_many) as set_many:
+            self.storage.url("reports_pdfs/a.pdf")
+        self.assertEqual(set_many.call_args.args[1], 2700)
+
+    @override_settings(PDF_URL_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.storage.url("reports_pdfs/a.pdf")
+        self.storage.url("reports_pdfs/a.pdf")
+        self.assertEqual(self.sign.call_count, 2)
+        self.assertEqual(storage.url_cache_stats()["hit_rate"], None)
+
+
+class ReportListPdfLinkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role, _ = Role.objects.get_or_create(name=RoleChoices.GERENTE)
+        cls.gerente = User.objects.create_user(username="gerente_urls", password="p")
+        cls.gerente.roles.add(role)
+        cls.report = Report.objects.create(user=cls.gerente, title="Con PDF")
+        Report.objects.create(user=cls.gerente, title="Sin PDF")
+
+    def test_list_links_each_pdf(self):
+        self.report.pdf_file.save("enlace.pdf", ContentFile(b"%PDF-1.4"))
+        self.addCleanup(self.report.pdf_file.delete, save=False)
+        self.client.force_login(self.gerente)
+        with mock.patch.object(
+            type(self.report.pdf_file.storage),
+            "urls",
+            autospec=True,
+            side_effect=lambda storage, names: {name: f"/pdf/{name}" for name in names},
+        ) as urls:
+            response = self.client.get(reverse("report_list"))
+        urls.assert_called_once()
+        self.assertContains(response, f'href="/pdf/{self.report.pdf_file.name}"')
+        self.assertContains(response, "fa-file-pdf", count=1)
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.storage = MockStorage()
+
+    def test_identical_content_is_stored_once(self):
+        with mock.patch.object(
+            FileSystemStorage,
+            "_save",
+            autospec=True,
+            side_effect=FileSystemStorage._save,
+        ) as write:
+            first = self.storage.save("reports_pdfs/a.pdf", ContentFile(PDF))
+            second = self.storage.save("reports_pdfs/b.pdf", ContentFile(PDF))
+        digest = hashlib.sha256(PDF).hexdigest()
+        self.assertEqual(first, f"reports_pdfs/sha256/{digest}/a.pdf")
+        self.assertEqual(second, first)
+        self.assertEqual(write.call_count, 1)
+        other = self.storage.save("reports_pdfs/a.pdf", ContentFile(PDF + b"\n"))
+        self.assertNotEqual(other, first)
+        self.assertEqual(self.storage.open(other).read(), PDF + b"\n")
+
+    def test_names_fit_max_length(self):
+        name = self.storage.save(
+            "reports_pdfs/" + "x" * 200 + ".pdf", ContentFile(PDF), max_length=120
+        )
+        self.assertLessEqual(len(name), 120)
+        self.assertTrue(name.endswith("x.pdf"))
+
+    def test_s3_skips_the_put_for_known_content(self):
+        with mock.patch.dict(os.environ, {"USE_MOCK_STORAGE": "False"}):
+            s3 = PDFStorage(
+                bucket_name="bucket",
+                access_key="AKIATEST",
+                secret_key="secret",
+                region_name="us-east-1",
+            )
+        existing = f"reports_pdfs/sha256/{hashlib.sha256(PDF).hexdigest()}/a.pdf"
+        with Stubber(s3.connection.meta.client) as stubber:
+            # Solo se lista el directorio del digest: sin PutObject
+            stubber.add_response(
+                "list_objects",
+                {"Contents": [{"Key": f"media/{existing}"}], "IsTruncated": False},
+                {
+                    "Bucket": "bucket",
+                    "Delimiter": "/",
+                    "Prefix": f"media/{posixpath.dirname(existing)}/",
+                },
+            )
+            self.assertEqual(s3.save("reports_pdfs/b.pdf", ContentFile(PDF)), existing)
+            stubber.assert_no_pending_responses()
@@ -0,0 +1,244 @@
+import io
+import os
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .. import storage_gc
+from ..models import FileDeletion, Process, ProcessTypeChoices, Report, User
+from ..storage import MockStorage, PDFStorage
+
+
+def make_due():
+    FileDeletion.objects.update(delete_after=timezone.now())
+
+
+@skipUnless(
+    isinstance(storage_gc.report_storage(), MockStorage), "Requiere USE_MOCK_STORAGE"
+)
+class StorageGarbageCollectionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="gc", password="p")
+
+    def setUp(self):
+        self.storage = storage_gc.report_storage()
+
+    def report(self, content, user=None, **kwargs):
+        report = Report.objects.create(
+            user=user or self.user,
+            title="Informe",
+            pdf_file=ContentFile(b"%PDF-1.4 " + content, name="gc.pdf"),
+            **kwargs,
+        )
+        name = report.pdf_file.name
+        self.addCleanup(lambda: self.storage.exists(name) and self.storage.delete(name))
+        return report
+
+    def test_cascade_deletes_queue_the_files_without_touching_storage(self):
+        cliente = User.objects.create_user(username="gc_cliente", password="p")
+        process = Process.objects.create(
+            user=cliente, process_type=ProcessTypeChoices.ASESORIA
+        )
+        names = {
+            self.report(b"uno", user=cliente).pdf_file.name,
+            self.report(b"dos", user=cliente, process=process).pdf_file.name,
+        }
+        with mock.patch.object(MockStorage, "delete") as delete:
+            cliente.delete()
+        delete.assert_not_called()
+        self.assertEqual(
+            set(FileDeletion.objects.values_list("name", flat=True)), names
+        )
+
+        # Aún no vencen: un reporte nuevo podría estar reutilizando el archivo
+        self.assertEqual(storage_gc.drain(), 0)
+        make_due()
+        with self.assertLogs("app.storage_gc", "INFO"):
+            self.assertEqual(storage_gc.drain(), 2)
+        self.assertFalse(any(self.storage.exists(name) for name in names))
+        self.assertFalse(FileDeletion.objects.exists())
+
+    def test_shared_file_is_deleted_with_its_last_report(self):
+        reports = [self.report(b"compartido") for _ in range(2)]
+        name = reports[0].pdf_file.name
+        self.assertEqual(reports[1].pdf_file.name, name)
+        for report in reports:
+            report.delete()
+            make_due()
+            storage_gc.drain()
+            self.assertEqual(self.storage.exists(name), report is reports[0])
+        self.assertFalse(FileDeletion.objects.exists())
+
+    def test_failed_deletions_are_retried_later(self):
+        name = self.report(b"falla").pdf_file.name
+        Report.objects.all().delete()
+        make_due()
+        with mock.patch.object(
+            MockStorage, "delete_many", return_value={name: "AccessDenied"}
+        ):
+            storage_gc.drain()
+        deletion = FileDeletion.objects.get()
+        self.assertEqual((deletion.attempts, deletion.last_error), (1, "AccessDenied"))
+        self.assertGreater(deletion.delete_after, timezone.now())
+        FileDeletion.objects.update(
+            attempts=storage_gc.MAX_ATTEMPTS, delete_after=timezone.now()
+        )
+        self.assertEqual(storage_gc.drain(), 0)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_reconciliation_scan(self):
+        referenced = self.report(b"en uso").pdf_file.name
+        orphan = self.storage.save("reports_pdfs/huerfano.pdf", ContentFile(b"x"))
+        queued = self.storage.save("reports_pdfs/encolado.pdf", ContentFile(b"y"))
+        for name in (orphan, queued):
+            self.addCleanup(
+                lambda name=name: self.storage.exists(name)
+                and self.storage.delete(name)
+            )
+        storage_gc.queue_deletion([queued])
+
+        found = list(storage_gc.find_orphans(min_age=timedelta(0), chunk_size=2))
+        self.assertIn(orphan, found)
+        self.assertNotIn(referenced, found)
+        self.assertNotIn(queued, found)
+        # Los archivos recientes pueden ser cargas en curso
+        self.assertNotIn(orphan, storage_gc.find_orphans())
+
+        out = io.StringIO()
+        call_command(
+            "storage_gc", "--scan", "--min-age-hours=0", "--dry-run", stdout=out
+        )
+        self.assertIn(orphan, out.getvalue())
+        self.assertFalse(FileDeletion.objects.filter(name=orphan).exists())
+        call_command("storage_gc", "--scan", "--min-age-hours=0", stdout=io.StringIO())
+        self.assertTrue(FileDeletion.objects.filter(name=orphan).exists())
+
+        make_due()
+        call_command("storage_gc", "--once", stdout=io.StringIO())
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertTrue(self.storage.exists(referenced))
+
+
+@skipUnless(
+    connection.vendor == "postgresql"
+    and isinstance(storage_gc.report_storage(), MockStorage),
+    "Requiere PostgreSQL y USE_MOCK_STORAGE",
+)
+class StorageGarbageCollectionRaceTest(TransactionTestCase):
+    """drain y un reporte que reutiliza el mismo PDF, en dos conexiones."""
+
+    serialized_rollback = True
+
+    def setUp(self):
+        self.storage = storage_gc.report_storage()
+        self.user = User.objects.create_user(username="gc_carrera", password="p")
+        report = Report.objects.create(
+            user=self.user,
+            title="Borrado",
+            pdf_file=ContentFile(b"%PDF-1.4 carrera", name="gc.pdf"),
+        )
+        self.name = report.pdf_file.name
+        self.addCleanup(
+            lambda: self.storage.exists(self.name) and self.storage.delete(self.name)
+        )
+        report.delete()
+        make_due()
+
+    def in_thread(self, func):
+        """Start ``func`` in another thread, with its own connection."""
+        result = {}
+
+        def run():
+            try:
+                result["value"] = func()
+            except Exception as e:
+                result["error"] = e
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread, result
+
+    def reuse_file(self):
+        return Report.objects.create(user=self.user, title="Nuevo", pdf_file=self.name)
+
+    def test_save_waits_for_drain_and_finds_the_file_gone(self):
+        delete_many = MockStorage.delete_many
+        started = []
+
+        def delete_while_saving(storage, names):
+            # drain ya comprobó las referencias: el reporte espera al bloqueo
+            thread, result = self.in_thread(self.reuse_file)
+            started.append((thread, result))
+            thread.join(0.5)
+            self.assertTrue(thread.is_alive())
+            return delete_many(storage, names)
+
+        with mock.patch.object(MockStorage, "delete_many", delete_while_saving):
+            with self.assertLogs("app.storage_gc", "INFO"):
+                storage_gc.drain()
+        thread, result = started[0]
+        thread.join()
+        self.assertIsInstance(result.get("error"), ValidationError)
+        self.assertFalse(Report.objects.exists())
+        self.assertFalse(self.storage.exists(self.name))
+
+    def test_drain_waits_for_save_and_keeps_the_file(self):
+        with transaction.atomic():
+            self.reuse_file()
+            # El reporte aún no está confirmado: drain espera al bloqueo
+            thread, result = self.in_thread(storage_gc.drain)
+            thread.join(0.5)
+            self.assertTrue(thread.is_alive())
+        thread.join()
+        self.assertEqual(result.get("value"), 1)
+        self.assertTrue(self.storage.exists(self.name))
+        self.assertFalse(FileDeletion.objects.exists())
+
+
+class S3BatchDeleteTest(SimpleTestCase):
+    def test_delete_objects_batches(self):
+        with mock.patch.dict(os.environ, {"USE_MOCK_STORAGE": "False"}):
+            storage = PDFStorage(
+                bucket_name="bucket",
+                access_key="AKIATEST",
+                secret_key="secret",
+                region_name="us-east-1",
+            )
+        names = [f"reports_pdfs/{i}.pdf" for i in range(2500)]
+        client = storage.connection.meta.client
+        with mock.patch.object(
+            client,
+            "delete_objects",
+            side_effect=[
+                {},
+                {
+                    "Errors": [
+                        {
+                            "Key": "media/reports_pdfs/1500.pdf",
+                            "Code": "X",
+                            "Message": "y",
+                        }
+                    ]
+                },
+                {},
+            ],
+        ) as delete_objects:
+            errors = storage.delete_many(names)
+        self.assertEqual(errors, {"reports_pdfs/1500.pdf": "X: y"})
+        sizes = [
+            len(call.kwargs["Delete"]["Objects"])
+            for call in delete_objects.call_args_list
+        ]
+        self.assertEqual(sizes, [1000, 1000, 500])
+        first = delete_objects.call_args_list[0].kwargs["Delete"]["Objects"][0]
+        self.assertEqual(first, {"Key": "media/reports_pdfs/0.pdf"})
@@ -0,0 +1,152 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import tasks
+from ..models import Task, TaskStatusChoices, User
+
+calls = []
+
+
+@tasks.task(name="tests.record", max_attempts=3)
+def record(value):
+    calls.append(value)
+
+
+@tasks.task(name="tests.fail", max_attempts=2)
+def fail():
+    raise ConnectionError("SMTP caído")
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueued_on_commit_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue(record, "hola")
+            try:
+                with transaction.atomic():
+                    tasks.enqueue(record, "revertida")
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(
+            list(Task.objects.values_list("name", "payload")),
+            [("tests.record", {"args": ["hola"], "kwargs": {}})],
+        )
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, ["hola"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_unregistered_functions_and_arguments_fail_early(self):
+        with self.assertRaises(ValueError):
+            tasks.enqueue(print, "x")
+        with self.assertRaises(TypeError):
+            tasks.enqueue(record, object())
+
+    def test_retries_with_backoff_then_dead_letter(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue(fail)
+        with self.assertLogs("app.tasks", "WARNING") as logs:
+            self.assertEqual(tasks.run_pending(), 1)
+        self.assertIn("se reintenta en 30 s", logs.output[0])
+        task = Task.objects.get()
+        self.assertEqual(task.status, TaskStatusChoices.PENDING)
+        self.assertEqual(task.attempts, 1)
+        self.assertIn("SMTP caído", task.last_error)
+        self.assertGreater(task.run_after, timezone.now() + timedelta(seconds=25))
+        # Todavía no toca
+        self.assertEqual(tasks.run_pending(), 0)
+
+        Task.objects.update(run_after=timezone.now())
+        with self.assertLogs("app.tasks", "ERROR"):
+            tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.status, TaskStatusChoices.DEAD)
+        self.assertEqual(task.attempts, 2)
+        Task.objects.update(run_after=timezone.now())
+        self.assertEqual(tasks.run_pending(), 0)
+        self.assertEqual(
+            [tasks.retry_delay(n) for n in (1, 2, 3, 10)], [30, 60, 120, 3600]
+        )
+
+    def test_stale_running_tasks_are_claimed_again(self):
+        Task.objects.create(
+            name="tests.record",
+            payload={"args": ["otra vez"], "kwargs": {}},
+            status=TaskStatusChoices.RUNNING,
+            attempts=1,
+            locked_at=timezone.now() - tasks.LOCK_TIMEOUT - timedelta(seconds=1),
+        )
+        Task.objects.create(
+            name="tests.record",
+            payload={"args": ["en curso"], "kwargs": {}},
+            status=TaskStatusChoices.RUNNING,
+            attempts=1,
+            locked_at=timezone.now(),
+        )
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, ["otra vez"])
+
+    @override_settings(TASK_QUEUE_EAGER=True)
+    def test_eager_mode_runs_in_process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue(record, "ya")
+        self.assertEqual(calls, ["ya"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_run_tasks_command(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue(record, 1)
+            tasks.enqueue(record, 2)
+        out = io.StringIO()
+        call_command("run_tasks", "--once", "--batch-size", "1", stdout=out)
+        self.assertEqual(calls, [1, 2])
+        self.assertIn("Tareas ejecutadas: 2.", out.getvalue())
+
+
+class QueuedSideEffectsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="correo", password="p", email="correo@example.com"
+        )
+
+    def test_password_reset_email_is_queued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("password_reset"), {"email": "correo@example.com"}
+            )
+        self.assertRedirects(response, reverse("password_reset_done"))
+        self.assertEqual(mail.outbox, [])
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["correo@example.com"])
+        self.assertNotIn("\n", mail.outbox[0].subject)
+
+    def test_password_email_payload_has_no_secrets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("password_reset"), {"email": "correo@example.com"})
+        task = Task.objects.get()
+        self.assertEqual(
+            task.payload["args"],
+            [
+                self.user.pk,
+                "registration/password_reset_subject.txt",
+                "registration/password_reset_email.html",
+                "testserver",
+            ],
+        )
+        tasks.run_pending()
+        # El token se genera al enviar y sigue siendo válido
+        uid, token = mail.outbox[0].body.split("/reset/")[1].split("/")[:2]
+        self.assertTrue(default_token_generator.check_token(self.user, token))
+        self.assertNotIn(token, str(task.payload))
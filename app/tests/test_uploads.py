@@ -0,0 +1,240 @@
+import base64
+import hashlib
+import json
+import os
+from unittest import mock, skipUnless
+
+from botocore.stub import Stubber
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import uploads
+from ..models import EstadoReporteChoices, FileDeletion, Report, Role, RoleChoices, User
+from ..storage import MockStorage, PDFStorage
+
+PDF = b"%PDF-1.4\n" + b"0" * 2048 + b"\n%%EOF"
+
+
+def checksum(content):
+    return base64.b64encode(hashlib.sha256(content).digest()).decode()
+
+
+def announce(content=PDF, **overrides):
+    return {
+        "filename": "Informe final.pdf",
+        "size": len(content),
+        "content_type": "application/pdf",
+        "checksum": checksum(content),
+        **overrides,
+    }
+
+
+class StartUploadTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="subidor", password="p")
+
+    def test_rejects_what_the_bucket_would_not_accept(self):
+        cases = {
+            "extensión": announce(filename="informe.exe"),
+            "tipo": announce(content_type="text/html"),
+            "vacío": announce(size=0),
+            "tamaño": announce(size="1024"),
+            "checksum": announce(checksum="no-es-base64"),
+        }
+        for case, data in cases.items():
+            with self.subTest(case):
+                with self.assertRaises(uploads.UploadError):
+                    uploads.start_upload(self.user, **data)
+        with override_settings(REPORT_UPLOAD_MAX_SIZE=2 * 1024 * 1024):
+            with self.assertRaisesMessage(uploads.UploadError, "2 MB"):
+                uploads.start_upload(self.user, **announce(size=2 * 1024 * 1024 + 1))
+
+    def test_names_are_content_addressed_and_fit_the_field(self):
+        digest = hashlib.sha256(PDF).hexdigest()
+        name = uploads.upload_name("../" + "a" * 400 + ".pdf", digest)
+        self.assertTrue(name.startswith(f"reports_pdfs/sha256/{digest}/aaa"))
+        self.assertTrue(name.endswith(".pdf"))
+        self.assertLessEqual(len(name), Report._meta.get_field("pdf_file").max_length)
+
+
+class S3DirectUploadTest(TestCase):
+    """El POST prefirmado y la verificación contra S3, sin red."""
+
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"USE_MOCK_STORAGE": "False"}):
+            self.storage = PDFStorage(
+                bucket_name="bucket",
+                access_key="AKIATEST",
+                secret_key="secret",
+                region_name="us-east-1",
+            )
+
+    def test_presigned_post_pins_size_type_and_checksum(self):
+        presigned = self.storage.direct_upload(
+            "reports_pdfs/x/a.pdf", 10, "application/pdf", "Y2hlY2s=", 900
+        )
+        self.assertIn("bucket", presigned["url"])
+        fields = presigned["fields"]
+        self.assertEqual(fields["key"], "media/reports_pdfs/x/a.pdf")
+        self.assertEqual(fields["x-amz-checksum-sha256"], "Y2hlY2s=")
+        policy = json.loads(base64.b64decode(fields["policy"]))
+        self.assertIn(["content-length-range", 10, 10], policy["conditions"])
+        self.assertIn({"Content-Type": "application/pdf"}, policy["conditions"])
+
+    def test_object_info(self):
+        client = self.storage.connection.meta.client
+        with Stubber(client) as stubber:
+            stubber.add_response(
+                "head_object",
+                {
+                    "ContentLength": 10,
+                    "ContentType": "application/pdf",
+                    "ChecksumSHA256": "Y2hlY2s=",
+                },
+                {
+                    "Bucket": "bucket",
+                    "Key": "media/reports_pdfs/x/a.pdf",
+                    "ChecksumMode": "ENABLED",
+                },
+            )
+            stubber.add_client_error("head_object", "404")
+            self.assertEqual(
+                self.storage.object_info("reports_pdfs/x/a.pdf"),
+                {"size": 10, "content_type": "application/pdf", "checksum": "Y2hlY2s="},
+            )
+            self.assertIsNone(self.storage.object_info("reports_pdfs/x/b.pdf"))
+
+
+@skipUnless(
+    isinstance(uploads.report_storage(), MockStorage), "Requiere USE_MOCK_STORAGE"
+)
+class DirectUploadFlowTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="tecnico", password="p")
+        cls.user.user_permissions.add(
+            Permission.objects.get(
+                codename="upload_report", content_type__app_label="app"
+            )
+        )
+        cls.cliente = User.objects.create_user(username="cliente_pdf", password="p")
+        cls.cliente.roles.add(Role.objects.get_or_create(name=RoleChoices.CLIENTE)[0])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.storage = uploads.report_storage()
+
+    def start(self, content=PDF, **overrides):
+        response = self.client.post(
+            reverse("report_upload"),
+            announce(content, **overrides),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        upload = response.json()
+        if upload["url"]:
+            name = upload["fields"]["key"]
+            self.addCleanup(
+                lambda: self.storage.exists(name) and self.storage.delete(name)
+            )
+        return upload
+
+    def send(self, upload, content=PDF, **fields):
+        data = {**upload["fields"], **fields}
+        data["file"] = SimpleUploadedFile("informe.pdf", content)
+        return self.client.post(upload["url"], data)
+
+    def create_report(self, token):
+        return self.client.post(
+            reverse("report_create"),
+            {
+                "title": "Informe directo",
+                "user": self.cliente.pk,
+                "estado_reporte": EstadoReporteChoices.EN_GENERACION,
+                "pdf_upload": token,
+            },
+        )
+
+    def test_report_points_to_the_uploaded_object(self):
+        upload = self.start()
+        self.assertEqual(self.send(upload).status_code, 204)
+        with mock.patch.object(MockStorage, "_save") as save:
+            response = self.create_report(upload["upload"])
+        self.assertRedirects(
+            response, reverse("report_list"), fetch_redirect_response=False
+        )
+        # El servidor no vuelve a subir el archivo
+        save.assert_not_called()
+        report = Report.objects.get(title="Informe directo")
+        self.assertEqual(report.pdf_file.name, upload["fields"]["key"])
+        self.assertTrue(report.pdf_file.name.endswith("/Informe_final.pdf"))
+        with report.pdf_file.open() as stored:
+            self.assertEqual(stored.read(), PDF)
+
+    def test_known_content_is_not_uploaded_again(self):
+        first = self.start()
+        self.send(first)
+        again = self.start(filename="Copia.pdf")
+        self.assertIsNone(again["url"])
+        response = self.create_report(again["upload"])
+        self.assertRedirects(
+            response, reverse("report_list"), fetch_redirect_response=False
+        )
+        report = Report.objects.get(title="Informe directo")
+        self.assertEqual(report.pdf_file.name, first["fields"]["key"])
+
+    def test_mock_bucket_enforces_the_policy(self):
+        upload = self.start()
+        cases = {
+            "contenido": self.send(upload, PDF.replace(b"0", b"1")),
+            "tamaño": self.send(upload, PDF + b"\n"),
+            "clave": self.send(upload, key="reports_pdfs/otro.pdf"),
+            "tipo": self.send(upload, **{"Content-Type": "text/html"}),
+            "política": self.send(upload, policy="falsa"),
+        }
+        for case, response in cases.items():
+            with self.subTest(case):
+                self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.storage.exists(upload["fields"]["key"]))
+
+    def test_form_rejects_missing_foreign_or_mismatched_uploads(self):
+        upload = self.start()
+        response = self.create_report(upload["upload"])
+        self.assertContains(response, "no llegó al almacenamiento")
+
+        self.send(upload)
+        form = uploads_form(self.cliente, upload["upload"])
+        self.assertIn("no es válida", form.errors["pdf_file"][0])
+
+        # Un archivo que no es PDF no se acepta aunque cuadre el checksum
+        html = b"<html>" + b"0" * 100
+        upload = self.start(html)
+        self.assertEqual(self.send(upload, html).status_code, 204)
+        form = uploads_form(self.user, upload["upload"])
+        self.assertIn("no coincide", form.errors["pdf_file"][0])
+        self.assertEqual(FileDeletion.objects.get().name, upload["fields"]["key"])
+
+    def test_presign_requires_report_permissions(self):
+        self.client.force_login(self.cliente)
+        response = self.client.post(
+            reverse("report_upload"), announce(), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+def uploads_form(user, token):
+    from ..views import ReportForm
+
+    form = ReportForm(
+        {
+            "title": "Informe",
+            "estado_reporte": EstadoReporteChoices.EN_GENERACION,
+            "pdf_upload": token,
+        },
+        user=user,
+    )
+    form.is_valid()
+    return form
@@ -5,6 +5,7 @@ from django.core import mail
 from django.test import TestCase
 from django.urls import reverse
 
+from app import tasks
 from app.models import ClientBranch, ClientProfile, Role, RoleChoices, User
 
 
@@ -88,12 +89,15 @@ class UserCreateFormTest(TestCase):
             "email": "interno@x.com",
             "role": self.role_admin.id,
         }
-        response = self.client.post(self.url, data)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, data)
         self.assertEqual(response.status_code, 302)
         user = User.objects.get(username="interno")
         self.assertTrue(user.roles.filter(name=RoleChoices.GERENTE).exists())
         self.assertFalse(hasattr(user, "client_profile"))
-        # Verificacion de correo de bienvenida
+        # Verificacion de correo de bienvenida: lo envía el worker de tareas
+        self.assertEqual(len(mail.outbox), 0)
+        tasks.run_pending()
         self.assertEqual(len(mail.outbox), 1)
         email = mail.outbox[0]
         self.assertEqual(email.to, ["interno@x.com"])
@@ -113,10 +117,12 @@ class UserCreateFormTest(TestCase):
         }
 
         # 1. Crear el usuario
-        response = self.client.post(self.url, user_data)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, user_data)
         new_user = User.objects.get(username="cliente_nuevo")
 
         # Verificar que se envió el correo de bienvenida
+        tasks.run_pending()
         self.assertEqual(len(mail.outbox), 1)
         email = mail.outbox[0]
         self.assertEqual(email.to, ["cliente@nuevo.com"])
@@ -319,12 +325,14 @@ class PasswordResetFlowTest(TestCase):
         # Asegurarse de que no hay ninguna sesión activa de un test anterior
         self.client.logout()
         # Paso 1: Solicitar el restablecimiento
-        response = self.client.post(
-            reverse("password_reset"), {"email": "test@example.com"}
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("password_reset"), {"email": "test@example.com"}
+            )
         self.assertRedirects(response, reverse("password_reset_done"))
 
-        # Paso 2: Verificar que se envió un correo
+        # Paso 2: Verificar que se envió un correo (desde la cola de tareas)
+        tasks.run_pending()
         self.assertEqual(len(mail.outbox), 1)
         email = mail.outbox[0]
         self.assertEqual(email.to, ["test@example.com"])
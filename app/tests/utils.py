@@ -0,0 +1,23 @@
+from contextlib import contextmanager
+
+from ..query_budget import get_budget, record_queries
+
+
+class QueryBudgetTestMixin:
+    """Assertions for the per-view query budgets declared in ``app.query_budget``."""
+
+    @contextmanager
+    def assertQueryBudget(self, url_name, method="GET"):
+        """Fail if the block runs more queries than the budget of ``url_name``."""
+        budget = get_budget(url_name, method)
+        if budget is None:
+            self.fail(f"No {method} query budget declared for '{url_name}'.")
+        with record_queries() as recorder:
+            yield recorder
+        queries = "\n".join(sql[:150] for sql, _ in recorder.queries)
+        self.assertLessEqual(
+            recorder.count,
+            budget,
+            f"'{url_name}' exceeded its query budget of {budget}: "
+            f"{recorder.summary()}\n{queries}",
+        )
@@ -0,0 +1,151 @@
+"""Direct uploads of report PDFs from the browser to the bucket.
+
+Sending a large PDF through the report form ties up a gunicorn worker for the
+whole client upload and then again for the copy to S3. Instead, the report
+form asks ``start_upload`` (through ``ReportUploadView``) for a presigned POST,
+the browser sends the file straight to the bucket, and the form is submitted
+with the returned ``upload`` token in place of the file. ``finish_upload``
+then checks that the stored object has the announced size, content type and
+SHA-256 checksum before the ``Report`` row points to it.
+
+The token is signed and bound to the user, so a form cannot claim someone
+else's (or an arbitrary) object. With ``USE_MOCK_STORAGE`` the same flow runs
+against ``mock_direct_upload``, a local stand-in for the bucket endpoint.
+Uploading the file with the form still works (browsers without Web Crypto).
+
+Uploads use the content-addressed names of ``PDFStorage``: the announced
+checksum gives the name up front, so when the bucket already holds the same
+PDF no presigned POST is returned and the browser skips the upload.
+"""
+
+import base64
+import binascii
+import datetime
+import os
+
+from django.conf import settings
+from django.core import signing
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.text import get_valid_filename
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from . import storage_gc
+from .models import Report
+from .storage import BLOB_PREFIX_LENGTH, DirectUploadError, blob_name
+
+PDF_CONTENT_TYPE = "application/pdf"
+# Validez de la URL prefirmada y del token que la acompaña
+UPLOAD_EXPIRES = datetime.timedelta(minutes=15)
+TOKEN_MAX_AGE = datetime.timedelta(hours=2)
+TOKEN_SALT = "app.uploads"
+
+
+class UploadError(Exception):
+    """The upload cannot be started or does not match what was announced."""
+
+
+def report_storage():
+    return Report._meta.get_field("pdf_file").storage
+
+
+def upload_name(filename, digest):
+    """Content-addressed storage name for ``filename``; fits the field."""
+    field = Report._meta.get_field("pdf_file")
+    room = field.max_length - len(field.upload_to) - BLOB_PREFIX_LENGTH
+    base, ext = os.path.splitext(get_valid_filename(os.path.basename(filename)))
+    return blob_name(field.upload_to + base[: room - len(ext)] + ext, digest)
+
+
+def start_upload(user, filename, size, content_type, checksum):
+    """Validate an announced upload and return the presigned POST for it.
+
+    Returns ``{"url", "fields", "upload"}``: the browser posts ``fields`` and
+    the file (last) to ``url`` and submits ``upload`` with the form. ``url``
+    is ``None`` when the same content is already stored.
+    """
+    if os.path.splitext(filename or "")[1].lower() != ".pdf":
+        raise UploadError("Archivo no válido. Solo se permiten archivos PDF.")
+    if content_type != PDF_CONTENT_TYPE:
+        raise UploadError("Archivo no válido. Solo se permiten archivos PDF.")
+    max_size = settings.REPORT_UPLOAD_MAX_SIZE
+    if not isinstance(size, int) or not 0 < size <= max_size:
+        raise UploadError(
+            f"El archivo debe pesar como máximo {max_size // (1024 * 1024)} MB."
+        )
+    try:
+        digest = base64.b64decode(checksum or "", validate=True)
+        if len(digest) != 32:
+            raise ValueError
+    except (binascii.Error, ValueError):
+        raise UploadError("Checksum SHA-256 inválido.")
+
+    storage = report_storage()
+    name = upload_name(filename, digest.hex())
+    stored = storage.find_blob(name)
+    if stored:
+        presigned = {"url": None, "fields": {}}
+        name = stored
+    else:
+        presigned = storage.direct_upload(
+            name,
+            size,
+            content_type,
+            checksum,
+            expires=int(UPLOAD_EXPIRES.total_seconds()),
+        )
+    token = signing.dumps(
+        {
+            "name": name,
+            "size": size,
+            "checksum": checksum,
+            "stored": bool(stored),
+            "user": user.pk,
+        },
+        salt=TOKEN_SALT,
+    )
+    return {"url": presigned["url"], "fields": presigned["fields"], "upload": token}
+
+
+def finish_upload(user, token):
+    """Return the storage name of a verified upload made with ``token``."""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        raise UploadError("La carga del archivo expiró; vuelva a adjuntarlo.")
+    if user is None or data["user"] != user.pk:
+        raise UploadError("La carga del archivo no es válida; vuelva a adjuntarlo.")
+
+    info = report_storage().object_info(data["name"])
+    if info is None:
+        raise UploadError("El archivo no llegó al almacenamiento; vuelva a adjuntarlo.")
+    if data.get("stored"):
+        # Ya estaba almacenado: su nombre incluye el SHA-256 del contenido
+        return data["name"]
+    if (
+        info["size"] != data["size"]
+        or info["content_type"] != PDF_CONTENT_TYPE
+        or info["checksum"] != data["checksum"]
+    ):
+        # No se usará: se borra en segundo plano
+        storage_gc.queue_deletion([data["name"]])
+        raise UploadError(
+            "El archivo recibido no coincide con el adjuntado; vuelva a intentarlo."
+        )
+    return data["name"]
+
+
+@csrf_exempt
+@require_POST
+def mock_direct_upload(request):
+    """Local stand-in for the bucket's POST endpoint (``USE_MOCK_STORAGE``)."""
+    storage = report_storage()
+    if not hasattr(storage, "receive_direct_upload"):
+        raise Http404
+    if "file" not in request.FILES:
+        return HttpResponseForbidden("Missing file.")
+    try:
+        storage.receive_direct_upload(request.POST, request.FILES["file"])
+    except DirectUploadError as e:
+        return HttpResponseForbidden(str(e))
+    return HttpResponse(status=204)
@@ -13,23 +13,30 @@ from app.views import (
     EquiposCreateView,
     EquiposDeleteView,
     EquiposDetailView,
+    EquiposExportView,
+    EquiposImportView,
     EquiposListView,
     EquiposUpdateView,
     EquipoTuboUpdateView,
     ProcessCreateView,
     ProcessDeleteView,
     ProcessDetailView,
+    ProcessInternalExportView,
     ProcessInternalListView,
     ProcessListView,
     ProcessProgressUpdateView,
     ProcessUpdateAssignmentView,
     ProcessUpdateView,
+    QueuedPasswordResetForm,
     ReportCreateView,
     ReportDeleteView,
     ReportDetailView,
+    ReportDownloadView,
+    ReportExportView,
     ReportListView,
     ReportStatusAndNoteUpdateView,
     ReportUpdateView,
+    ReportUploadView,
     UserCreateView,
     UserDeleteView,
     UserDetailView,
@@ -58,6 +65,7 @@ urlpatterns = [
     path(
         "reset_password/",
         auth_views.PasswordResetView.as_view(
+            form_class=QueuedPasswordResetForm,
             template_name="registration/password_reset_form.html",
             email_template_name="registration/password_reset_email.html",
             subject_template_name="registration/password_reset_subject.txt",
@@ -128,8 +136,15 @@ urlpatterns = [
     ),
     # Report URLs
     path("reports/", ReportListView.as_view(), name="report_list"),
+    path("reports/export/", ReportExportView.as_view(), name="report_export"),
     path("reports/<int:pk>/", ReportDetailView.as_view(), name="report_detail"),
+    path(
+        "reports/<int:pk>/download/",
+        ReportDownloadView.as_view(),
+        name="report_download",
+    ),
     path("reports/create/", ReportCreateView.as_view(), name="report_create"),
+    path("reports/upload/", ReportUploadView.as_view(), name="report_upload"),
     path("reports/<int:pk>/update/", ReportUpdateView.as_view(), name="report_update"),
     path("reports/<int:pk>/delete/", ReportDeleteView.as_view(), name="report_delete"),
     path(
@@ -144,6 +159,11 @@ urlpatterns = [
         ProcessInternalListView.as_view(),
         name="process_internal_list",
     ),
+    path(
+        "processes/internal/export/",
+        ProcessInternalExportView.as_view(),
+        name="process_internal_export",
+    ),
     path("processes/<int:pk>/", ProcessDetailView.as_view(), name="process_detail"),
     path("processes/create/", ProcessCreateView.as_view(), name="process_create"),
     path(
@@ -169,6 +189,8 @@ urlpatterns = [
     ),
     # Equipment URLs
     path("equipos/", EquiposListView.as_view(), name="equipos_list"),
+    path("equipos/export/", EquiposExportView.as_view(), name="equipos_export"),
+    path("equipos/import/", EquiposImportView.as_view(), name="equipos_import"),
     path("equipos/<int:pk>/", EquiposDetailView.as_view(), name="equipos_detail"),
     path("equipos/create/", EquiposCreateView.as_view(), name="equipos_create"),
     path(
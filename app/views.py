@@ -1,59 +1,94 @@
+import json
 import logging
 import os
 from datetime import date, datetime, timedelta
 
 from dateutil.relativedelta import relativedelta
 from django import forms
-from django.conf import settings
 from django.contrib.auth import logout
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.views import LoginView, redirect_to_login
 from django.core.exceptions import ValidationError
-from django.core.mail import send_mail
-from django.db.models import Count, F, Max, Q
-from django.db.models.functions import TruncMonth
-from django.forms import inlineformset_factory
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import (
+    BigIntegerField,
+    Case,
+    F,
+    Max,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    Sum,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest, TruncMonth
+from django.forms import BaseInlineFormSet, inlineformset_factory
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
-from django.utils.encoding import force_bytes
-from django.utils.http import urlsafe_base64_encode
+from django.utils.functional import cached_property
 from django.views import View
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
+    FormView,
     ListView,
     TemplateView,
     UpdateView,
 )
 from django_select2.forms import ModelSelect2Widget
 
+from . import downloads, equipment_import, exports, search, tasks, uploads
+from .date_ranges import filter_date_range, parse_date
+from .exports import Column
 from .models import (
     Anotacion,
     ChecklistItemStatusChoices,
     ClientBranch,
     ClientProfile,
+    DeadlineBucket,
     Equipment,
+    EstadoEquipoChoices,
+    EstadoReporteChoices,
     HistorialTuboRayosX,
+    PracticeCategoryChoices,
     Process,
     ProcessChecklistItem,
+    ProcessDailyStat,
     ProcessStatusChoices,
+    ProcessStatusLog,
     ProcessTypeChoices,
+    QualityControlDailyStat,
     Report,
     Role,
     RoleChoices,
     User,
 )
+from .pagination import KeysetPaginationMixin
 
 logger = logging.getLogger(__name__)
 
 
 # Forms
+class ClientSelect2Widget(ModelSelect2Widget):
+    """Select2 de clientes que busca con ``app.search`` (nombre, razón social, NIT)."""
+
+    model = User
+    search_fields = [f"{field}__icontains" for field in search.CLIENT_FIELDS]
+
+    def filter_queryset(self, request, term, queryset=None, **dependent_fields):
+        if queryset is None:
+            queryset = self.get_queryset()
+        if dependent_fields:
+            queryset = queryset.filter(**dependent_fields)
+        return search.search(queryset, term, search.CLIENT_FIELDS)
+
+
 class UserCreationAsAdminForm(forms.ModelForm):
     role = forms.ModelChoiceField(
         queryset=Role.objects.none(),  # Se setea dinámicamente en la vista
@@ -164,14 +199,7 @@ class ReportForm(forms.ModelForm):
     user = forms.ModelChoiceField(
         queryset=User.objects.filter(roles__name=RoleChoices.CLIENTE),
         label="Cliente Asociado",
-        widget=ModelSelect2Widget(
-            model=User,
-            search_fields=[
-                "username__icontains",
-                "first_name__icontains",
-                "last_name__icontains",
-                "client_profile__razon_social__icontains",  # ¡Busca también por razón social!
-            ],
+        widget=ClientSelect2Widget(
             attrs={
                 "data-placeholder": "Escriba para buscar un cliente...",
                 "lang": "es",
@@ -179,9 +207,21 @@ class ReportForm(forms.ModelForm):
         ),
     )
     # --- FIN: WIDGET SELECT2 ---
+    # Token de la carga directa al bucket (lo llena el JS del formulario)
+    pdf_upload = forms.CharField(required=False, widget=forms.HiddenInput)
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.user = user
+        # El PDF puede llegar por carga directa en lugar de en el formulario;
+        # la obligatoriedad se comprueba en clean()
+        self.fields["pdf_file"].required = False
+        self.fields["pdf_file"].widget.attrs.update(
+            {
+                "accept": ".pdf,application/pdf",
+                "data-direct-upload-url": reverse("report_upload"),
+            }
+        )
 
         user_id_for_filtering = None
         if (
@@ -200,9 +240,12 @@ class ReportForm(forms.ModelForm):
 
         if "process" in self.fields:
             if user_id_for_filtering:
-                self.fields["process"].queryset = Process.objects.filter(
-                    user_id=user_id_for_filtering
-                ).order_by("process_type")
+                # select_related: las opciones se muestran con __str__
+                self.fields["process"].queryset = (
+                    Process.objects.filter(user_id=user_id_for_filtering)
+                    .select_related("user")
+                    .order_by("process_type")
+                )
             else:
                 # If no user_id, and it's a new form, queryset should be empty.
                 # If it's bound but user_id couldn't be determined, also empty to prevent validation errors with wrong choices.
@@ -215,9 +258,11 @@ class ReportForm(forms.ModelForm):
 
         if "equipment" in self.fields:
             if user_id_for_filtering:
-                self.fields["equipment"].queryset = Equipment.objects.filter(
-                    user_id=user_id_for_filtering
-                ).order_by("nombre")
+                self.fields["equipment"].queryset = (
+                    Equipment.objects.filter(user_id=user_id_for_filtering)
+                    .select_related("equipment_type", "user")
+                    .order_by("nombre")
+                )
             else:
                 if not (self.instance and self.instance.pk):
                     self.fields["equipment"].queryset = Equipment.objects.none()
@@ -265,6 +310,21 @@ class ReportForm(forms.ModelForm):
         # Si es obligatorio, la validación de 'required' se maneja antes.
         return file
 
+    def clean(self):
+        cleaned_data = super().clean()
+        token = cleaned_data.get("pdf_upload")
+        if token:
+            # El archivo ya está en el bucket: se verifica y se usa su nombre
+            try:
+                cleaned_data["pdf_file"] = uploads.finish_upload(self.user, token)
+            except uploads.UploadError as e:
+                self.add_error("pdf_file", str(e))
+        elif not cleaned_data.get("pdf_file") and "pdf_file" not in self.errors:
+            self.add_error(
+                "pdf_file", self.fields["pdf_file"].error_messages["required"]
+            )
+        return cleaned_data
+
 
 class ReportStatusAndNoteForm(forms.ModelForm):
     anotacion = forms.CharField(
@@ -286,14 +346,7 @@ class ProcessForm(forms.ModelForm):
     user = forms.ModelChoiceField(
         queryset=User.objects.filter(roles__name=RoleChoices.CLIENTE),
         label="Cliente Asociado",
-        widget=ModelSelect2Widget(
-            model=User,
-            search_fields=[
-                "username__icontains",
-                "first_name__icontains",
-                "last_name__icontains",
-                "client_profile__razon_social__icontains",  # ¡Busca también por razón social!
-            ],
+        widget=ClientSelect2Widget(
             attrs={
                 "data-placeholder": "Escriba para buscar un cliente...",
                 "lang": "es",
@@ -362,10 +415,56 @@ class ProcessChecklistItemForm(forms.ModelForm):
         }
 
 
+class LoadedObjectChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField que resuelve el id entre objetos ya cargados."""
+
+    def __init__(self, objects, *args, **kwargs):
+        self.objects = objects
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects[str(value)]
+        except KeyError:
+            raise ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+
+
+class BaseProcessChecklistItemFormSet(BaseInlineFormSet):
+    def __init__(self, *args, queryset=None, **kwargs):
+        # La plantilla muestra la definición de cada ítem
+        if queryset is None:
+            queryset = self.model._default_manager.select_related("definition")
+        super().__init__(*args, queryset=queryset, **kwargs)
+
+    @cached_property
+    def items_by_pk(self):
+        return {str(item.pk): item for item in self.get_queryset()}
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        # Validar el id contra los ítems del formset evita una consulta por fila
+        pk_name = self.model._meta.pk.name
+        field = form.fields[pk_name]
+        form.fields[pk_name] = LoadedObjectChoiceField(
+            self.items_by_pk,
+            queryset=field.queryset,
+            initial=field.initial,
+            required=False,
+            widget=field.widget,
+        )
+
+
 ProcessChecklistItemFormSet = inlineformset_factory(
     Process,
     ProcessChecklistItem,
     form=ProcessChecklistItemForm,
+    formset=BaseProcessChecklistItemFormSet,
     extra=0,
     can_delete=False,
 )
@@ -420,14 +519,7 @@ class EquipmentForm(forms.ModelForm):
     user = forms.ModelChoiceField(
         queryset=User.objects.filter(roles__name=RoleChoices.CLIENTE),
         label="Cliente Propietario",
-        widget=ModelSelect2Widget(
-            model=User,
-            search_fields=[
-                "username__icontains",
-                "first_name__icontains",
-                "last_name__icontains",
-                "client_profile__razon_social__icontains",  # ¡Busca también por razón social!
-            ],
+        widget=ClientSelect2Widget(
             attrs={
                 "data-placeholder": "Escriba para buscar un cliente...",
                 "lang": "es",
@@ -455,9 +547,12 @@ class EquipmentForm(forms.ModelForm):
 
         if "process" in self.fields:
             if user_id_for_filtering:
-                self.fields["process"].queryset = Process.objects.filter(
-                    user_id=user_id_for_filtering
-                ).order_by("process_type")
+                # select_related: las opciones se muestran con __str__
+                self.fields["process"].queryset = (
+                    Process.objects.filter(user_id=user_id_for_filtering)
+                    .select_related("user")
+                    .order_by("process_type")
+                )
             else:
                 # For new forms or if user_id is missing, set to none.
                 # This ensures that if 'user' is selected via JS, the process list is initially empty
@@ -526,6 +621,55 @@ class HistorialTuboRayosXForm(forms.ModelForm):
         }
 
 
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Restablecimiento de contraseña que envía el correo con la cola de tareas.
+
+    La tarea guarda solo el id del usuario y genera el token al enviar.
+    """
+
+    def send_mail(
+        self,
+        subject_template_name,
+        email_template_name,
+        context,
+        from_email,
+        to_email,
+        html_email_template_name=None,
+    ):
+        tasks.enqueue(
+            tasks.send_password_email,
+            context["user"].pk,
+            subject_template_name,
+            email_template_name,
+            context["domain"],
+            use_https=context["protocol"] == "https",
+            html_email_template_name=html_email_template_name,
+            from_email=from_email,
+        )
+
+
+class EquipmentImportForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo",
+        help_text=(
+            "CSV o XLSX con una fila de encabezados. Columnas: serial (obligatoria), "
+            "tipo, nombre, marca, modelo, práctica asociada, fechas de adquisición, "
+            "vigencia de licencia, último control y vencimiento del control de "
+            "calidad, estado, cliente (NIT o usuario) y sede. Las celdas vacías no "
+            "modifican los equipos existentes."
+        ),
+    )
+    solo_validar = forms.BooleanField(
+        label="Solo validar (no guardar cambios)", required=False
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data["archivo"]
+        if not archivo.name.lower().endswith((".csv", ".xlsx")):
+            raise ValidationError("Formato no soportado: use un archivo .csv o .xlsx.")
+        return archivo
+
+
 # AJAX & Utility Views
 def load_user_processes(request):
     user_id = request.GET.get("user_id")
@@ -565,38 +709,26 @@ def load_client_branches(request):
 
 
 def send_welcome_and_set_password_email(user, request):
-    """Genera un enlace para establecer la contraseña y lo envía al nuevo usuario."""
-    try:
-        token = default_token_generator.make_token(user)
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
+    """Encola el correo de bienvenida con el enlace para establecer la contraseña.
 
-        # Construye la URL completa para el enlace
-        reset_link = request.build_absolute_uri(
-            reverse("password_reset_confirm", kwargs={"uidb64": uid, "token": token})
-        )
-
-        # Renderiza el asunto y el cuerpo del correo desde plantillas
-        subject = render_to_string("registration/account_created_subject.txt")
-        message = render_to_string(
+    El envío lo hace el worker de tareas cuando se confirma la transacción, para
+    no bloquear la petición con la conexión SMTP. El token y el enlace se generan
+    al enviar, así que no quedan guardados en la tabla de tareas.
+    """
+    try:
+        tasks.enqueue(
+            tasks.send_password_email,
+            user.pk,
+            "registration/account_created_subject.txt",
             "registration/account_created_email.html",
-            {
-                "user": user,
-                "reset_link": reset_link,
-            },
-        )
-
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            fail_silently=False,
+            request.get_host(),
+            use_https=request.is_secure(),
         )
         logger.info(
-            f"Correo de bienvenida y para establecer contraseña enviado a {user.email}"
+            f"Correo de bienvenida y para establecer contraseña encolado para {user.email}"
         )
     except Exception as e:
-        logger.error(f"Error al enviar correo de bienvenida a {user.email}: {e}")
+        logger.error(f"Error al preparar el correo de bienvenida a {user.email}: {e}")
 
 
 # Login view
@@ -613,55 +745,118 @@ def logout_view(request):
     return redirect("login")
 
 
-class DashboardGerenteView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class KnownCountPaginator(Paginator):
+    """Paginator que recibe el total ya calculado y no ejecuta su propio COUNT."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @property
+    def count(self):
+        return self._known_count
+
+
+class DeadlineBucketsMixin:
+    """Clasifica procesos activos en vencidos / próximos / en progreso en SQL.
+
+    Una sola consulta agregada obtiene los tres conteos (gráfica de torta) y
+    cada grupo se pagina por separado, así que solo se cargan las filas de la
+    página que se muestra.
+    """
+
+    dias_proximos_a_vencer = 30
+    bucket_paginate_by = 20
+    bucket_page_params = {
+        DeadlineBucket.VENCIDO: "page_vencidos",
+        DeadlineBucket.PROXIMO: "page_proximos",
+        DeadlineBucket.EN_PROGRESO: "page_en_progreso",
+    }
+    bucket_context_names = {
+        DeadlineBucket.VENCIDO: "procesos_vencidos",
+        DeadlineBucket.PROXIMO: "procesos_proximos",
+        DeadlineBucket.EN_PROGRESO: "procesos_en_progreso",
+    }
+
+    def get_deadline_buckets(self, procesos_activos):
+        """Devuelve ``(conteos, contexto)`` con una página por grupo."""
+        hoy = timezone.localdate()
+        # Conteos en una sola consulta COUNT(...) FILTER (WHERE ...)
+        conteos = procesos_activos.with_deadline_bucket(
+            today=hoy, dias_proximos=self.dias_proximos_a_vencer
+        ).deadline_bucket_counts()
+
+        context = {}
+        for bucket, context_name in self.bucket_context_names.items():
+            # Filtrar por rangos de fecha_final (no por la anotación) usa el índice
+            procesos = (
+                procesos_activos.in_deadline_bucket(
+                    bucket, today=hoy, dias_proximos=self.dias_proximos_a_vencer
+                )
+                .with_deadline_bucket(
+                    today=hoy, dias_proximos=self.dias_proximos_a_vencer
+                )
+                .order_by(F("fecha_final").asc(nulls_last=True), "pk")
+            )
+            paginator = KnownCountPaginator(
+                procesos, self.bucket_paginate_by, conteos[bucket]
+            )
+            page = paginator.get_page(
+                self.request.GET.get(self.bucket_page_params[bucket])
+            )
+            context[context_name] = page
+            context[f"total_{context_name}"] = conteos[bucket]
+        return conteos, context
+
+
+class ListExportMixin:
+    """Exporta a CSV o XLSX (``?formato=``) el resultado de un listado.
+
+    Se combina con la vista del listado para reutilizar su ``get_queryset()``:
+    mismos filtros, orden y restricciones por rol, pero sin paginar. Las filas
+    se transmiten a medida que se leen (ver ``app.exports``).
+    """
+
+    export_columns = ()
+    export_filename = "export"
+
+    def get(self, request, *args, **kwargs):
+        filename = f"{self.export_filename}_{timezone.localdate():%Y%m%d}"
+        return exports.export_response(
+            self.get_queryset(),
+            self.export_columns,
+            filename,
+            request.GET.get("formato", "csv"),
+        )
+
+
+class DashboardGerenteView(
+    DeadlineBucketsMixin, LoginRequiredMixin, PermissionRequiredMixin, TemplateView
+):
     template_name = "dashboard_gerente.html"
     permission_required = "app.view_report"  # O un permiso más específico para gerentes
     raise_exception = True
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        hoy = timezone.now().date()
-
-        # Define el umbral para "próximo a vencer"
-        dias_proximos_a_vencer = 30
-        fecha_limite_proximos = hoy + timedelta(days=dias_proximos_a_vencer)
+        hoy = timezone.localdate()
 
-        # Obtener todos los procesos no finalizados, optimizando consultas
+        # Procesos no finalizados, clasificados y paginados en la base de datos
         procesos_activos = (
             Process.objects.exclude(estado=ProcessStatusChoices.FINALIZADO)
             .select_related("user__client_profile")
             .prefetch_related("assigned_to")
         )
-
-        procesos_vencidos = []
-        procesos_proximos = []
-        procesos_en_progreso = []
-
-        for p in procesos_activos:
-            if p.fecha_final:
-                fecha_final_date = p.fecha_final.date()
-                if fecha_final_date < hoy:
-                    p.dias_vencido = (hoy - fecha_final_date).days
-                    procesos_vencidos.append(p)
-                elif hoy <= fecha_final_date <= fecha_limite_proximos:
-                    procesos_proximos.append(p)
-                else:
-                    procesos_en_progreso.append(p)
-            else:
-                # Si no tiene fecha final, va a "en progreso"
-                procesos_en_progreso.append(p)
-
-        context["procesos_vencidos"] = procesos_vencidos
-        context["procesos_proximos"] = procesos_proximos
-        context["procesos_en_progreso"] = procesos_en_progreso
+        conteos, buckets_context = self.get_deadline_buckets(procesos_activos)
+        context.update(buckets_context)
 
         # Datos para la gráfica de torta
         context["chart_data"] = {
             "labels": ["Vencidos", "Próximos a Vencer", "En Progreso"],
             "data": [
-                len(procesos_vencidos),
-                len(procesos_proximos),
-                len(procesos_en_progreso),
+                conteos[DeadlineBucket.VENCIDO],
+                conteos[DeadlineBucket.PROXIMO],
+                conteos[DeadlineBucket.EN_PROGRESO],
             ],
         }
 
@@ -671,27 +866,20 @@ class DashboardGerenteView(LoginRequiredMixin, PermissionRequiredMixin, Template
         interval = self.request.GET.get("interval", "current_month")
         start_date_str = self.request.GET.get("start_date")
         end_date_str = self.request.GET.get("end_date")
-        start_date, end_date = None, None
-
-        if start_date_str and end_date_str:
-            try:
-                start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-                end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-                interval = "custom"
-            except ValueError:
-                start_date, end_date = None, None
-
-        if not (start_date and end_date):
-            if interval == "last_3_months":
-                start_date = hoy - relativedelta(months=3)
-                end_date = hoy
-            elif interval == "current_year":
-                start_date = hoy.replace(month=1, day=1)
-                end_date = hoy
-            else:
-                interval = "current_month"
-                start_date = hoy.replace(day=1)
-                end_date = hoy
+        start_date, end_date = parse_date(start_date_str), parse_date(end_date_str)
+
+        if start_date and end_date:
+            interval = "custom"
+        elif interval == "last_3_months":
+            start_date = hoy - relativedelta(months=3)
+            end_date = hoy
+        elif interval == "current_year":
+            start_date = hoy.replace(month=1, day=1)
+            end_date = hoy
+        else:
+            interval = "current_month"
+            start_date = hoy.replace(day=1)
+            end_date = hoy
 
         context["selected_interval"] = interval
         context["start_date_form"] = (
@@ -699,12 +887,14 @@ class DashboardGerenteView(LoginRequiredMixin, PermissionRequiredMixin, Template
         )
         context["end_date_form"] = end_date.strftime("%Y-%m-%d") if end_date else ""
 
-        # 2. Query base para procesos finalizados en el rango
-        completed_processes = Process.objects.filter(
-            estado=ProcessStatusChoices.FINALIZADO,
-            fecha_final__date__gte=start_date,
-            fecha_final__date__lte=end_date,
-        ).prefetch_related("assigned_to")
+        # 2. Estadísticas precalculadas de procesos finalizados en el rango
+        # (ProcessDailyStat, mantenida por app.stats)
+        completed_stats = filter_date_range(
+            ProcessDailyStat.objects.filter(estado=ProcessStatusChoices.FINALIZADO),
+            "fecha",
+            start_date,
+            end_date,
+        )
 
         # 3. Datos para la Gráfica 1: Procesos por Tipo
         process_types_to_chart = [
@@ -714,9 +904,12 @@ class DashboardGerenteView(LoginRequiredMixin, PermissionRequiredMixin, Template
             ProcessTypeChoices.ESTUDIO_AMBIENTAL,
         ]
         type_counts = (
-            completed_processes.filter(process_type__in=process_types_to_chart)
+            completed_stats.filter(
+                assigned_to__isnull=True, process_type__in=process_types_to_chart
+            )
             .values("process_type")
-            .annotate(count=Count("id"))
+            .annotate(count=Sum("count"))
+            .order_by()
         )
         type_counts_dict = {item["process_type"]: item["count"] for item in type_counts}
         context["process_type_chart_data"] = {
@@ -727,31 +920,43 @@ class DashboardGerenteView(LoginRequiredMixin, PermissionRequiredMixin, Template
         }
 
         # 4. Datos para la Gráfica 2: Procesos completados por Usuario
+        # Una sola consulta agrupada sobre las filas por asignado,
+        # excluyendo a los clientes en SQL.
+        assignment_counts = (
+            completed_stats.filter(assigned_to__isnull=False)
+            .exclude(assigned_to__roles__name=RoleChoices.CLIENTE)
+            .values(
+                "assigned_to_id",
+                "assigned_to__first_name",
+                "assigned_to__last_name",
+                "assigned_to__username",
+            )
+            .annotate(count=Sum("count"))
+            .order_by("assigned_to_id")
+        )
+
         user_completion_counts = {}
-        internal_users = User.objects.exclude(roles__name=RoleChoices.CLIENTE)
-        for user in internal_users:
-            user_completion_counts[user.get_full_name() or user.username] = 0
-
-        for process in completed_processes:
-            for user in process.assigned_to.all():
-                if not user.roles.filter(name=RoleChoices.CLIENTE).exists():
-                    user_key = user.get_full_name() or user.username
-                    if user_key in user_completion_counts:
-                        user_completion_counts[user_key] += 1
-
-        filtered_user_counts = {
-            user: count for user, count in user_completion_counts.items() if count > 0
-        }
+        for item in assignment_counts:
+            full_name = (
+                f"{item['assigned_to__first_name']} {item['assigned_to__last_name']}"
+            ).strip()
+            user_key = full_name or item["assigned_to__username"]
+            user_completion_counts[user_key] = (
+                user_completion_counts.get(user_key, 0) + item["count"]
+            )
+
         context["user_completion_chart_data"] = {
-            "labels": list(filtered_user_counts.keys()),
-            "data": list(filtered_user_counts.values()),
+            "labels": list(user_completion_counts.keys()),
+            "data": list(user_completion_counts.values()),
         }
         # --- FIN: Lógica para las nuevas gráficas de barras ---
 
         return context
 
 
-class DashboardInternoView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class DashboardInternoView(
+    DeadlineBucketsMixin, LoginRequiredMixin, PermissionRequiredMixin, TemplateView
+):
     template_name = "dashboard_interno.html"
     permission_required = (
         "app.change_report"  # Un permiso básico que tengan los usuarios internos
@@ -761,11 +966,6 @@ class DashboardInternoView(LoginRequiredMixin, PermissionRequiredMixin, Template
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         usuario_actual = self.request.user
-        hoy = timezone.now().date()
-
-        # Define el umbral para "próximo a vencer" (ej. 30 días)
-        dias_proximos_a_vencer = 30
-        fecha_limite_proximos = hoy + timedelta(days=dias_proximos_a_vencer)
 
         # Obtener procesos asignados al usuario actual que no estén finalizados
         procesos_asignados = (
@@ -773,28 +973,8 @@ class DashboardInternoView(LoginRequiredMixin, PermissionRequiredMixin, Template
             .exclude(estado=ProcessStatusChoices.FINALIZADO)
             .select_related("user__client_profile")
         )  # Optimiza la consulta para obtener el perfil del cliente
-
-        procesos_vencidos = []
-        procesos_proximos = []
-        procesos_en_progreso = []
-
-        for p in procesos_asignados:
-            if p.fecha_final:
-                fecha_final_date = p.fecha_final.date()
-                if fecha_final_date < hoy:
-                    p.dias_vencido = (hoy - fecha_final_date).days
-                    procesos_vencidos.append(p)
-                elif hoy <= fecha_final_date <= fecha_limite_proximos:
-                    procesos_proximos.append(p)
-                else:
-                    procesos_en_progreso.append(p)
-            else:
-                # Si no tiene fecha final, se considera "en progreso"
-                procesos_en_progreso.append(p)
-
-        context["procesos_vencidos"] = procesos_vencidos
-        context["procesos_proximos"] = procesos_proximos
-        context["procesos_en_progreso"] = procesos_en_progreso
+        conteos, buckets_context = self.get_deadline_buckets(procesos_asignados)
+        context.update(buckets_context)
 
         # Datos para la gráfica de torta
         context["chart_data"] = {
@@ -804,9 +984,9 @@ class DashboardInternoView(LoginRequiredMixin, PermissionRequiredMixin, Template
                 "Mis Otros Procesos",
             ],
             "data": [
-                len(procesos_vencidos),
-                len(procesos_proximos),
-                len(procesos_en_progreso),
+                conteos[DeadlineBucket.VENCIDO],
+                conteos[DeadlineBucket.PROXIMO],
+                conteos[DeadlineBucket.EN_PROGRESO],
             ],
         }
 
@@ -825,20 +1005,16 @@ def main(request):
         }
         return render(request, "welcome.html", context)
 
-    if request.user.roles.filter(name=RoleChoices.GERENTE).exists():
+    if request.user.is_gerente:
         # Si es gerente, redirigir a su dashboard
         return redirect("dashboard_gerente")
 
-    if (
-        request.user.roles.filter(name=RoleChoices.DIRECTOR_TECNICO).exists()
-        or request.user.roles.filter(name=RoleChoices.PERSONAL_TECNICO_APOYO).exists()
-        or request.user.roles.filter(name=RoleChoices.PERSONAL_ADMINISTRATIVO).exists()
-    ):
+    if request.user.is_interno:
         # Si es interno, redirigir a su dashboard
         return redirect("dashboard_interno")
 
     # Si el usuario está autenticado, mostrar la página principal con acceso a todas las funcionalidades
-    if request.user.roles.filter(name=RoleChoices.CLIENTE).exists():
+    if request.user.is_cliente:
         proceso_activo = request.GET.get("proceso_activo")
         reportes_para_tabla = None
         equipos_asociados = None
@@ -860,85 +1036,59 @@ def main(request):
         procesos_activos_cliente = (
             Process.objects.filter(user=request.user)
             .exclude(estado=ProcessStatusChoices.FINALIZADO)
+            .with_progress()
             .order_by("-fecha_inicio")
         )
 
-        # 1. Obtener la fecha de inicio más reciente de un proceso relevante (activo y del tipo filtrado)
-        #    asociado a cada equipo a través de los REPORTES DEL USUARIO.
-
-        # Construir el filtro para los procesos dentro de los reportes
-        filtro_proceso_en_reporte = ~Q(process__estado=ProcessStatusChoices.FINALIZADO)
-        if proceso_activo and proceso_activo != "todos":
-            filtro_proceso_en_reporte &= Q(process__process_type=proceso_activo)
-
-        # Obtener {equipment_id: max_fecha_relevante_via_reporte}
-        map_equipo_a_fecha_max_proceso_reporte = {
-            item["equipment_id"]: item["max_fecha_relevante"]
-            for item in Report.objects.filter(
-                user=request.user,  # Reportes del usuario actual
-                equipment__isnull=False,  # Reporte asociado a un equipo
-                process__isnull=False,  # Reporte asociado a un proceso
+        # Top 5 de equipos ordenados por el proceso activo más reciente asociado,
+        # ya sea directamente (equipo.process) o a través de los reportes del
+        # usuario. Todo se resuelve en una sola consulta con LIMIT.
+        filtrar_por_tipo = proceso_activo and proceso_activo != "todos"
+
+        # a. Proceso directamente asociado al equipo
+        filtro_proceso_directo = Q(process__isnull=False) & ~Q(
+            process__estado=ProcessStatusChoices.FINALIZADO
+        )
+        if filtrar_por_tipo:
+            filtro_proceso_directo &= Q(process__process_type=proceso_activo)
+
+        # b. Fecha más reciente de los procesos vía reportes del usuario
+        reportes_del_equipo = Report.objects.filter(
+            user=request.user,
+            equipment=OuterRef("pk"),
+            process__isnull=False,
+        ).exclude(process__estado=ProcessStatusChoices.FINALIZADO)
+        if filtrar_por_tipo:
+            reportes_del_equipo = reportes_del_equipo.filter(
+                process__process_type=proceso_activo
             )
-            .filter(filtro_proceso_en_reporte)
-            .values("equipment_id")  # Agrupar por equipo
+        fecha_max_via_reportes = (
+            reportes_del_equipo.order_by()
+            .values("equipment")
+            .annotate(max_fecha=Max("process__fecha_inicio"))
+            .values("max_fecha")
+        )
+
+        equipos_asociados = (
+            Equipment.objects.filter(user=request.user)
             .annotate(
-                max_fecha_relevante=Max(
-                    "process__fecha_inicio"
-                )  # Fecha más reciente del proceso del reporte
+                fecha_proceso_directo=Case(
+                    When(filtro_proceso_directo, then=F("process__fecha_inicio")),
+                    default=None,
+                ),
+                fecha_proceso_reportes=Subquery(fecha_max_via_reportes),
             )
-            .order_by()  # Limpiar cualquier ordenación por defecto
-            if item["equipment_id"] is not None
-        }
-
-        # 2. Iterar sobre todos los equipos del usuario para determinar si califican y cuál es su fecha de ordenación.
-        equipos_candidatos_con_fecha_ordenacion = []
-        # Usar select_related para optimizar el acceso a equipo.process y equipo.user
-        todos_los_equipos_del_usuario = Equipment.objects.filter(
-            user=request.user
-        ).select_related("process", "user")
-
-        for equipo in todos_los_equipos_del_usuario:
-            fechas_relevantes_para_este_equipo = []
-
-            # a. Considerar el proceso directamente asociado al equipo
-            if equipo.process:
-                proceso_directo_cumple_tipo = (
-                    proceso_activo
-                    and proceso_activo != "todos"
-                    and equipo.process.process_type == proceso_activo
-                ) or (
-                    not proceso_activo or proceso_activo == "todos"
-                )  # No hay filtro de tipo o es "todos"
-                if (
-                    equipo.process.estado != ProcessStatusChoices.FINALIZADO
-                    and proceso_directo_cumple_tipo
-                ):
-                    fechas_relevantes_para_este_equipo.append(
-                        equipo.process.fecha_inicio
-                    )
-
-            # b. Considerar procesos vía reportes (usando el mapa precalculado)
-            if equipo.id in map_equipo_a_fecha_max_proceso_reporte:
-                fechas_relevantes_para_este_equipo.append(
-                    map_equipo_a_fecha_max_proceso_reporte[equipo.id]
-                )
-
-            # Si el equipo tiene al menos una fecha relevante (es decir, un proceso activo asociado que cumple el filtro)
-            if fechas_relevantes_para_este_equipo:
-                # La fecha de ordenación para este equipo será la más reciente de todas sus fechas relevantes
-                fecha_ordenacion_para_equipo = max(fechas_relevantes_para_este_equipo)
-                equipos_candidatos_con_fecha_ordenacion.append(
-                    (equipo, fecha_ordenacion_para_equipo)
+            .annotate(
+                # GREATEST no ignora NULL en todos los motores; Coalesce lo evita
+                fecha_ordenacion=Greatest(
+                    Coalesce("fecha_proceso_directo", "fecha_proceso_reportes"),
+                    Coalesce("fecha_proceso_reportes", "fecha_proceso_directo"),
                 )
-
-        # 3. Ordenar los equipos candidatos por su fecha de ordenación (más reciente primero)
-        equipos_candidatos_con_fecha_ordenacion.sort(key=lambda x: x[1], reverse=True)
-
-        # 4. Tomar los primeros 5 equipos
-        equipos_asociados = [
-            ec_con_fecha[0]
-            for ec_con_fecha in equipos_candidatos_con_fecha_ordenacion[:5]
-        ]
+            )
+            .filter(fecha_ordenacion__isnull=False)
+            .select_related("process", "user")
+            .order_by("-fecha_ordenacion", "pk")[:5]
+        )
 
         # Obtener una lista de los tipos de proceso que el usuario realmente tiene
         user_process_types = list(
@@ -971,7 +1121,9 @@ def main(request):
 
 
 # User Views
-class UserListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class UserListView(
+    KeysetPaginationMixin, LoginRequiredMixin, PermissionRequiredMixin, ListView
+):
     model = User
     template_name = "users/user_list.html"
     context_object_name = (
@@ -982,6 +1134,10 @@ class UserListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     raise_exception = True
     paginate_by = 20
 
+    def get_queryset(self):
+        # Los roles de toda la página en una sola consulta
+        return super().get_queryset().prefetch_related("roles")
+
     def get_context_data(self, **kwargs):
         """Añade la lógica para mostrar los roles de cada usuario."""
         # Primero, obtenemos el contexto base de la clase padre
@@ -1293,21 +1449,15 @@ class UserLookupView(LoginRequiredMixin, View):
         # Obtener el queryset base de clientes
         queryset = User.objects.filter(roles__name=RoleChoices.CLIENTE)
 
-        # Filtrar si hay un término de búsqueda
-        if term:
-            queryset = queryset.filter(
-                Q(username__icontains=term)
-                | Q(first_name__icontains=term)
-                | Q(last_name__icontains=term)
-                | Q(client_profile__razon_social__icontains=term)
-            )
-
         # Limitar resultados y optimizar.
         # Usamos F() para ordenar por un campo que puede ser nulo, poniendo los nulos al final.
         queryset = queryset.select_related("client_profile").order_by(
             F("client_profile__razon_social").asc(nulls_last=True),
             "username",  # Añadimos un segundo orden para consistencia
-        )[:20]
+        )
+
+        # Filtrar si hay un término de búsqueda; los más parecidos primero
+        queryset = search.search(queryset, term, search.CLIENT_FIELDS)[:20]
 
         # Formatear los resultados para Select2, manejando de forma segura los perfiles nulos.
         results = []
@@ -1327,7 +1477,9 @@ class UserLookupView(LoginRequiredMixin, View):
 
 
 # Report Views
-class ReportListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class ReportListView(
+    KeysetPaginationMixin, LoginRequiredMixin, PermissionRequiredMixin, ListView
+):
     model = Report
     template_name = "reports/report_list.html"
     context_object_name = "reports"
@@ -1351,7 +1503,7 @@ class ReportListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         queryset = super().get_queryset()
 
         # Filtrar por usuario si es CLIENTE
-        if self.request.user.roles.filter(name=RoleChoices.CLIENTE).exists():
+        if self.request.user.is_cliente:
             queryset = queryset.filter(user=self.request.user)
         # Para otros roles (admin, etc.), por defecto se muestran todos los reportes
         # o podrías añadir lógica de filtrado adicional si es necesario.
@@ -1373,12 +1525,18 @@ class ReportListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         if equipment_id_filter and process_type_filter == "control_calidad":
             try:
                 equipment_id = int(equipment_id_filter)
-                equipo = Equipment.objects.get(id=equipment_id)
+                equipos = Equipment.objects.all()
+                if self.request.user.is_cliente:
+                    equipos = equipos.filter(user=self.request.user)
+                equipo = equipos.get(id=equipment_id)
                 queryset = equipo.get_quality_control_history()
                 equipment_filter_cc_applied_successfully = True
-            except (ValueError, TypeError, Equipment.DoesNotExist):
+            except (ValueError, TypeError):
                 # Si equipment_id no es un entero válido, no aplicar este filtro
                 pass
+            except Equipment.DoesNotExist:
+                # Equipo inexistente o de otro cliente: no tiene historial
+                queryset = queryset.none()
         elif equipment_id_filter:
             try:
                 queryset = queryset.filter(equipment__id=equipment_id_filter)
@@ -1386,6 +1544,11 @@ class ReportListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
                 # Si equipment_id no es un entero válido, no aplicar este filtro
                 pass
 
+        # El historial del equipo reemplaza el queryset: un cliente solo ve
+        # sus propios reportes
+        if self.request.user.is_cliente:
+            queryset = queryset.filter(user=self.request.user)
+
         # Filtrar por tipo de proceso
         if (
             not equipment_filter_cc_applied_successfully
@@ -1393,29 +1556,18 @@ class ReportListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         ):
             queryset = queryset.filter(process__process_type=process_type_filter)
 
-        # Filtrar por fecha de inicio
-        if start_date_str:
-            try:
-                start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-                queryset = queryset.filter(created_at__date__gte=start_date)
-            except ValueError:
-                pass  # Ignorar fecha inválida
-
-        # Filtrar por fecha de fin
-        if end_date_str:
-            try:
-                end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-                queryset = queryset.filter(created_at__date__lte=end_date)
-            except ValueError:
-                pass  # Ignorar fecha inválida
+        # Filtrar por rango de fechas (las fechas inválidas se ignoran)
+        queryset = filter_date_range(
+            queryset, "created_at", start_date_str, end_date_str
+        )
 
         # Filtrar por marca, modelo y serial del equipo
-        if marca_filter:
-            queryset = queryset.filter(equipment__marca__icontains=marca_filter)
-        if modelo_filter:
-            queryset = queryset.filter(equipment__modelo__icontains=modelo_filter)
-        if serial_filter:
-            queryset = queryset.filter(equipment__serial__icontains=serial_filter)
+        for field, value in (
+            ("equipment__marca", marca_filter),
+            ("equipment__modelo", modelo_filter),
+            ("equipment__serial", serial_filter),
+        ):
+            queryset = search.search(queryset, value, [field], ranked=False)
 
         # --- NUEVO: Filtrar por sede ---
         if sede_filter:
@@ -1430,7 +1582,12 @@ class ReportListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
             except (ValueError, TypeError):
                 pass  # Ignorar si no es un número
 
-        return queryset.order_by("-created_at")
+        # Búsqueda por título y descripción; los más parecidos primero
+        return search.search(
+            queryset.select_related("user").order_by("-created_at"),
+            self.request.GET.get("q"),
+            search.REPORT_FIELDS,
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1443,13 +1600,14 @@ class ReportListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         context["start_date"] = self.request.GET.get("start_date", "")
         context["end_date"] = self.request.GET.get("end_date", "")
         context["selected_equipment_id"] = self.request.GET.get("equipment_id")
-        if self.request.user.roles.filter(name=RoleChoices.CLIENTE).exists():
+        if self.request.user.is_cliente:
             context["all_equipment"] = Equipment.objects.filter(user=self.request.user)
         else:
             context["all_equipment"] = Equipment.objects.all()
         context["marca_filter"] = self.request.GET.get("marca", "")
         context["modelo_filter"] = self.request.GET.get("modelo", "")
         context["serial_filter"] = self.request.GET.get("serial", "")
+        context["search_term"] = self.request.GET.get("q", "").strip()
 
         # --- NUEVO: Contexto para el filtro de Sede/Cliente ---
         context["selected_sede_id"] = self.request.GET.get("sede")
@@ -1464,7 +1622,7 @@ class ReportListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
             except (User.DoesNotExist, ValueError):
                 context["selected_client_object"] = None
 
-        if self.request.user.roles.filter(name=RoleChoices.CLIENTE).exists():
+        if self.request.user.is_cliente:
             # El cliente solo ve sus propias sedes
             context["client_branches"] = ClientBranch.objects.filter(
                 company__user=self.request.user
@@ -1478,9 +1636,33 @@ class ReportListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
             except Equipment.DoesNotExist:
                 pass
 
+        # URLs de los PDF de la página en una sola consulta a la caché
+        with_pdf = [report for report in context["reports"] if report.pdf_file]
+        pdf_urls = uploads.report_storage().urls(
+            report.pdf_file.name for report in with_pdf
+        )
+        for report in with_pdf:
+            report.pdf_url = pdf_urls[report.pdf_file.name]
+
         return context
 
 
+class ReportExportView(ListExportMixin, ReportListView):
+    export_filename = "reportes"
+    export_columns = (
+        Column("pk", "ID"),
+        Column("title", "Título"),
+        Column("estado_reporte", "Estado", EstadoReporteChoices),
+        Column("user__username", "Usuario"),
+        Column("user__client_profile__razon_social", "Razón social"),
+        Column("process__process_type", "Tipo de proceso", ProcessTypeChoices),
+        Column("equipment__nombre", "Equipo"),
+        Column("equipment__serial", "Serial"),
+        Column("created_at", "Fecha de creación"),
+        Column("fecha_vencimiento", "Fecha de vencimiento"),
+    )
+
+
 class ReportDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
     model = Report
     template_name = "reports/report_detail.html"
@@ -1501,6 +1683,34 @@ class ReportDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
         return PermissionRequiredMixin.handle_no_permission(self)
 
 
+class ReportDownloadView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Descarga autenticada del PDF de un reporte, con soporte de Range.
+
+    Los clientes solo pueden descargar sus propios reportes, como en
+    ReportListView. Ver app/downloads.py.
+    """
+
+    login_url = "/login/"
+    permission_required = "app.view_report"
+    raise_exception = True
+
+    def handle_no_permission(self):
+        if not self.request.user.is_authenticated:
+            return redirect_to_login(
+                self.request.get_full_path(),
+                self.get_login_url(),
+                self.get_redirect_field_name(),
+            )
+        return PermissionRequiredMixin.handle_no_permission(self)
+
+    def get(self, request, pk):
+        queryset = Report.objects.exclude(pdf_file="").only("pk", "pdf_file")
+        if request.user.is_cliente:
+            queryset = queryset.filter(user=request.user)
+        report = get_object_or_404(queryset, pk=pk)
+        return downloads.file_response(request, report.pdf_file)
+
+
 class ReportCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     permission_required = "app.upload_report"
     raise_exception = True
@@ -1521,12 +1731,22 @@ class ReportCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
         # Delegate to PermissionRequiredMixin's original behavior.
         return PermissionRequiredMixin.handle_no_permission(self)
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["user"] = self.request.user
+        return kwargs
+
     def form_valid(self, form):
         # Guardar la instancia sin hacer commit a la BD para poder modificarla
         self.object = form.save(commit=False)
 
         # Llamar al método save() del modelo, pasando el usuario que modifica
-        self.object.save(user_who_modified=self.request.user)
+        try:
+            self.object.save(user_who_modified=self.request.user)
+        except ValidationError as e:
+            # El PDF reutilizado se borró mientras se enviaba el formulario
+            form.add_error(None, e)
+            return self.form_invalid(form)
 
         logger.info(f"Archivo guardado exitosamente: {self.object.pdf_file.name}")
         logger.info(f"URL del archivo: {self.object.pdf_file.url}")
@@ -1554,13 +1774,55 @@ class ReportUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
         # Delegate to PermissionRequiredMixin's original behavior.
         return PermissionRequiredMixin.handle_no_permission(self)
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["user"] = self.request.user
+        return kwargs
+
     def form_valid(self, form):
         self.object = form.save(commit=False)
         # Llamar al método save() del modelo, pasando el usuario que modifica
-        self.object.save(user_who_modified=self.request.user)
+        try:
+            self.object.save(user_who_modified=self.request.user)
+        except ValidationError as e:
+            # El PDF reutilizado se borró mientras se enviaba el formulario
+            form.add_error(None, e)
+            return self.form_invalid(form)
         return redirect(self.get_success_url())
 
 
+class ReportUploadView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Prepara la carga directa de un PDF de reporte al bucket.
+
+    Recibe en JSON el nombre, tamaño, tipo y SHA-256 (base64) del archivo y
+    devuelve el POST prefirmado y el token que el formulario envía después.
+    """
+
+    http_method_names = ["post"]
+    login_url = "/login/"
+    raise_exception = True
+
+    def has_permission(self):
+        user = self.request.user
+        return user.has_perm("app.upload_report") or user.has_perm("app.change_report")
+
+    def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+            upload = uploads.start_upload(
+                request.user,
+                data.get("filename"),
+                data.get("size"),
+                data.get("content_type"),
+                data.get("checksum"),
+            )
+        except (ValueError, AttributeError):
+            return JsonResponse({"error": "Solicitud inválida."}, status=400)
+        except uploads.UploadError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse(upload)
+
+
 class ReportDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
     model = Report
     template_name = "reports/report_confirm_delete.html"
@@ -1618,7 +1880,7 @@ class ReportStatusAndNoteUpdateView(
 
 
 # Equipos Views
-class EquiposListView(LoginRequiredMixin, ListView):
+class EquiposListView(KeysetPaginationMixin, LoginRequiredMixin, ListView):
     model = Equipment
     template_name = "equipos/equipos_list.html"
     context_object_name = "equipos"
@@ -1642,7 +1904,7 @@ class EquiposListView(LoginRequiredMixin, ListView):
         sede_filter = self.request.GET.get("sede")
         client_user_filter = self.request.GET.get("client_user")
 
-        if self.request.user.roles.filter(name=RoleChoices.CLIENTE).exists():
+        if self.request.user.is_cliente:
             queryset = Equipment.objects.filter(user=self.request.user)
         else:
             queryset = Equipment.objects.all()
@@ -1651,12 +1913,6 @@ class EquiposListView(LoginRequiredMixin, ListView):
             queryset = queryset.filter(process__process_type=process_type_filter)
         # Si process_type_filter es "todos", no se aplica filtro adicional de tipo de proceso.
 
-        if text_search_term:
-            queryset = queryset.filter(
-                Q(modelo__icontains=text_search_term)
-                | Q(serial__icontains=text_search_term)
-            )
-
         # Filtrar por fecha de adquisición
         if inicio_adq_date_str:
             try:
@@ -1756,7 +2012,12 @@ class EquiposListView(LoginRequiredMixin, ListView):
             except (ValueError, TypeError):
                 pass  # Ignorar si no es un número
 
-        return queryset.order_by("-process__fecha_inicio")
+        # Búsqueda por serial, marca, modelo y nombre; los más parecidos primero
+        return search.search(
+            queryset.order_by("-process__fecha_inicio"),
+            text_search_term,
+            search.EQUIPMENT_FIELDS,
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1792,7 +2053,7 @@ class EquiposListView(LoginRequiredMixin, ListView):
             except (User.DoesNotExist, ValueError):
                 context["selected_client_object"] = None
 
-        if self.request.user.roles.filter(name=RoleChoices.CLIENTE).exists():
+        if self.request.user.is_cliente:
             # El cliente solo ve sus propias sedes
             context["client_branches"] = ClientBranch.objects.filter(
                 company__user=self.request.user
@@ -1822,7 +2083,7 @@ class EquiposListView(LoginRequiredMixin, ListView):
 
         # --- 2. Lógica para la gráfica del gerente ---
         context["show_chart"] = False
-        if self.request.user.roles.filter(name=RoleChoices.GERENTE).exists():
+        if self.request.user.is_gerente:
             context["show_chart"] = True
 
             interval = self.request.GET.get("interval", "current_month")
@@ -1840,15 +2101,16 @@ class EquiposListView(LoginRequiredMixin, ListView):
                 start_date = now.date().replace(day=1)
                 title = "Mes Actual"
 
-            # Contar controles de calidad por mes para el usuario actual
+            # Contar controles de calidad por mes a partir de la tabla diaria
+            # precalculada (QualityControlDailyStat)
             qs = (
-                Equipment.objects.filter(
-                    fecha_ultimo_control_calidad__gte=start_date,
-                    fecha_ultimo_control_calidad__lte=now.date(),
+                QualityControlDailyStat.objects.filter(
+                    fecha__gte=start_date,
+                    fecha__lte=now.date(),
                 )
-                .annotate(month=TruncMonth("fecha_ultimo_control_calidad"))
+                .annotate(month=TruncMonth("fecha"))
                 .values("month")
-                .annotate(count=Count("id"))
+                .annotate(count=Sum("count"))
                 .order_by("month")
             )
 
@@ -1892,6 +2154,26 @@ class EquiposListView(LoginRequiredMixin, ListView):
         return context
 
 
+class EquiposExportView(ListExportMixin, EquiposListView):
+    export_filename = "equipos"
+    export_columns = (
+        Column("pk", "ID"),
+        Column("nombre", "Nombre"),
+        Column("equipment_type__name", "Tipo de equipo"),
+        Column("marca", "Marca"),
+        Column("modelo", "Modelo"),
+        Column("serial", "Serial"),
+        Column("estado_actual", "Estado", EstadoEquipoChoices),
+        Column("user__client_profile__razon_social", "Razón social"),
+        Column("sede__nombre", "Sede"),
+        Column("practica_asociada", "Práctica asociada"),
+        Column("fecha_adquisicion", "Fecha de adquisición"),
+        Column("fecha_vigencia_licencia", "Vigencia de licencia"),
+        Column("fecha_ultimo_control_calidad", "Último control de calidad"),
+        Column("fecha_vencimiento_control_calidad", "Vencimiento control de calidad"),
+    )
+
+
 class EquiposDetailView(LoginRequiredMixin, DetailView):
     model = Equipment
     template_name = "equipos/equipos_detail.html"
@@ -1900,7 +2182,7 @@ class EquiposDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        equipo = self.get_object()
+        equipo = self.object
 
         procesos_activos_asociados = set()
 
@@ -1909,7 +2191,9 @@ class EquiposDetailView(LoginRequiredMixin, DetailView):
             procesos_activos_asociados.add(equipo.process)
 
         # 2. Procesos asociados a través de reportes vinculados al equipo
-        reportes_del_equipo = Report.objects.filter(equipment=equipo)
+        reportes_del_equipo = Report.objects.filter(equipment=equipo).select_related(
+            "process"
+        )
         for reporte in reportes_del_equipo:
             if (
                 reporte.process
@@ -1960,6 +2244,36 @@ class EquiposCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView)
             return self.form_invalid(form)
 
 
+class EquiposImportView(LoginRequiredMixin, PermissionRequiredMixin, FormView):
+    """Carga masiva de equipos desde CSV o XLSX.
+
+    Los seriales nuevos se crean y los existentes se actualizan con las
+    columnas del archivo; las filas con errores se omiten y se listan.
+    """
+
+    form_class = EquipmentImportForm
+    template_name = "equipos/equipos_import.html"
+    login_url = "/login/"
+    permission_required = "app.manage_equipment"
+
+    def form_valid(self, form):
+        archivo = form.cleaned_data["archivo"]
+        try:
+            result = equipment_import.import_equipment(
+                equipment_import.read_rows(archivo, archivo.name),
+                dry_run=form.cleaned_data["solo_validar"],
+            )
+        except equipment_import.ImportFileError as e:
+            form.add_error("archivo", str(e))
+            return self.form_invalid(form)
+        logger.info(
+            f"Importación de equipos por {self.request.user}: {result.created} "
+            f"creados, {result.updated} actualizados, {result.error_rows} filas "
+            f"con errores (validación: {result.dry_run})."
+        )
+        return self.render_to_response(self.get_context_data(form=form, result=result))
+
+
 class EquipoTuboUpdateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = HistorialTuboRayosX
     form_class = HistorialTuboRayosXForm
@@ -2040,7 +2354,7 @@ class EquiposUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView)
 
 
 # Process Views
-class ProcessListView(LoginRequiredMixin, ListView):
+class ProcessListView(KeysetPaginationMixin, LoginRequiredMixin, ListView):
     model = Equipment
     template_name = "process/process_list.html"
     context_object_name = "equipos"
@@ -2055,7 +2369,7 @@ class ProcessListView(LoginRequiredMixin, ListView):
         inicio_end_date_str = self.request.GET.get("inicio_end_date")
         fin_start_date_str = self.request.GET.get("fin_start_date")
         fin_end_date_str = self.request.GET.get("fin_end_date")
-        if self.request.user.roles.filter(name=RoleChoices.CLIENTE).exists():
+        if self.request.user.is_cliente:
             queryset = Equipment.objects.filter(user=self.request.user)
         else:
             queryset = Equipment.objects.all()
@@ -2070,51 +2384,44 @@ class ProcessListView(LoginRequiredMixin, ListView):
             queryset = queryset.filter(process__estado=process_status_filter)
         # Si process_status_filter es "todos", no se aplica filtro adicional de estado.
 
-        # Filtrar por fecha de inicio
-        if inicio_start_date_str:
-            try:
-                inicio_start_date = datetime.strptime(
-                    inicio_start_date_str, "%Y-%m-%d"
-                ).date()
-                queryset = queryset.filter(
-                    process__fecha_inicio__date__gte=inicio_start_date
-                )
-            except ValueError:
-                pass  # Ignorar fecha inválida
-
-        if inicio_end_date_str:
-            try:
-                inicio_end_date = datetime.strptime(
-                    inicio_end_date_str, "%Y-%m-%d"
-                ).date()
-                queryset = queryset.filter(
-                    process__fecha_inicio__date__lte=inicio_end_date
-                )
-            except ValueError:
-                pass  # Ignorar fecha inválida
-
-        # Filtrar por fecha de fin
-        if fin_start_date_str:
-            try:
-                fin_start_date = datetime.strptime(
-                    fin_start_date_str, "%Y-%m-%d"
-                ).date()
-                queryset = queryset.filter(
-                    process__fecha_final__date__gte=fin_start_date
-                )
-            except ValueError:
-                pass  # Ignorar fecha inválida
-
-        if fin_end_date_str:
-            try:
-                fin_end_date = datetime.strptime(fin_end_date_str, "%Y-%m-%d").date()
-                queryset = queryset.filter(process__fecha_final__date__lte=fin_end_date)
-            except ValueError:
-                pass  # Ignorar fecha inválida
+        # Filtrar por fechas de inicio y fin (las fechas inválidas se ignoran)
+        queryset = filter_date_range(
+            queryset,
+            "process__fecha_inicio",
+            inicio_start_date_str,
+            inicio_end_date_str,
+        )
+        queryset = filter_date_range(
+            queryset, "process__fecha_final", fin_start_date_str, fin_end_date_str
+        )
 
-        queryset = queryset.prefetch_related(
-            "process__checklist_items",  # Proceso directo y su checklist
-            "reports__process__checklist_items",  # Procesos vía reportes y sus checklists
+        # Proceso más reciente del equipo, directo o vía sus reportes, resuelto
+        # en la misma consulta. Los reportes se recorren por equipment_id, que
+        # está indexado, y el resultado se combina con el proceso directo.
+        procesos_via_reportes = Report.objects.filter(
+            equipment=OuterRef("pk"), process__isnull=False
+        ).order_by("-process__fecha_inicio", "-process_id")
+        queryset = queryset.annotate(
+            fecha_proceso_reportes=Subquery(
+                procesos_via_reportes.values("process__fecha_inicio")[:1]
+            ),
+            proceso_reportes_id=Subquery(
+                procesos_via_reportes.values("process_id")[:1]
+            ),
+        ).annotate(
+            # GREATEST no ignora NULL en todos los motores; Coalesce lo evita
+            fecha_ultimo_proceso=Greatest(
+                Coalesce("process__fecha_inicio", "fecha_proceso_reportes"),
+                Coalesce("fecha_proceso_reportes", "process__fecha_inicio"),
+            ),
+            ultimo_proceso_id=Case(
+                When(
+                    process__fecha_inicio=F("fecha_ultimo_proceso"),
+                    then="process_id",
+                ),
+                default="proceso_reportes_id",
+                output_field=BigIntegerField(),
+            ),
         )
 
         return queryset.order_by("-process__fecha_inicio")
@@ -2123,31 +2430,14 @@ class ProcessListView(LoginRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         equipos = context["equipos"]
 
-        # --- LÓGICA PARA CALCULAR EL PROGRESO DEL PROCESO MÁS RECIENTE ---
+        # --- PROGRESO DEL PROCESO MÁS RECIENTE ---
+        # Una sola consulta para los procesos de la página, con el progreso anotado
+        procesos_recientes = Process.objects.with_progress().in_bulk(
+            {equipo.ultimo_proceso_id for equipo in equipos} - {None}
+        )
         equipment_progress_map = {}
         for equipo in equipos:
-            candidate_processes = set()
-
-            # 1. Recolectar proceso asociado directamente
-            if equipo.process:
-                candidate_processes.add(equipo.process)
-
-            # 2. Recolectar procesos asociados vía reportes (usa datos precargados)
-            for report in equipo.reports.all():
-                if report.process:
-                    candidate_processes.add(report.process)
-
-            most_recent_process = None
-            if candidate_processes:
-                # Filtrar procesos sin fecha de inicio para evitar errores
-                valid_processes = [p for p in candidate_processes if p.fecha_inicio]
-                if valid_processes:
-                    # 3. Seleccionar el más reciente por fecha de inicio
-                    most_recent_process = sorted(
-                        valid_processes, key=lambda p: p.fecha_inicio, reverse=True
-                    )[0]
-
-            # Guardar el proceso y su progreso en un mapa
+            most_recent_process = procesos_recientes.get(equipo.ultimo_proceso_id)
             if most_recent_process:
                 equipment_progress_map[equipo.id] = {
                     "process": most_recent_process,
@@ -2173,7 +2463,9 @@ class ProcessListView(LoginRequiredMixin, ListView):
         return context
 
 
-class ProcessInternalListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class ProcessInternalListView(
+    KeysetPaginationMixin, LoginRequiredMixin, PermissionRequiredMixin, ListView
+):
     """Process List for Internal Users.
 
     Vista para que los usuarios internos vean una lista de TODOS los procesos,
@@ -2192,7 +2484,8 @@ class ProcessInternalListView(LoginRequiredMixin, PermissionRequiredMixin, ListV
             super()
             .get_queryset()
             .select_related("user__client_profile")
-            .prefetch_related("checklist_items", "assigned_to")
+            .prefetch_related("assigned_to")
+            .with_progress()
         )
 
         # --- Reutilizamos la lógica de filtros existentes ---
@@ -2219,34 +2512,13 @@ class ProcessInternalListView(LoginRequiredMixin, PermissionRequiredMixin, ListV
             except (ValueError, TypeError):
                 pass  # Ignorar si el ID no es válido
 
-        # Lógica de filtros de fecha (adaptada para el modelo Process)
-        try:
-            if inicio_start_date_str:
-                queryset = queryset.filter(
-                    fecha_inicio__date__gte=datetime.strptime(
-                        inicio_start_date_str, "%Y-%m-%d"
-                    ).date()
-                )
-            if inicio_end_date_str:
-                queryset = queryset.filter(
-                    fecha_inicio__date__lte=datetime.strptime(
-                        inicio_end_date_str, "%Y-%m-%d"
-                    ).date()
-                )
-            if fin_start_date_str:
-                queryset = queryset.filter(
-                    fecha_final__date__gte=datetime.strptime(
-                        fin_start_date_str, "%Y-%m-%d"
-                    ).date()
-                )
-            if fin_end_date_str:
-                queryset = queryset.filter(
-                    fecha_final__date__lte=datetime.strptime(
-                        fin_end_date_str, "%Y-%m-%d"
-                    ).date()
-                )
-        except ValueError:
-            pass  # Ignorar fechas con formato incorrecto
+        # Filtros de fecha (las fechas inválidas se ignoran)
+        queryset = filter_date_range(
+            queryset, "fecha_inicio", inicio_start_date_str, inicio_end_date_str
+        )
+        queryset = filter_date_range(
+            queryset, "fecha_final", fin_start_date_str, fin_end_date_str
+        )
 
         # --- NUEVA LÓGICA DE ORDENAMIENTO ---
         sort_by = self.request.GET.get("sort_by", "fecha_inicio")
@@ -2333,12 +2605,49 @@ class ProcessInternalListView(LoginRequiredMixin, PermissionRequiredMixin, ListV
         return context
 
 
+class ProcessInternalExportView(ListExportMixin, ProcessInternalListView):
+    export_filename = "procesos"
+    export_columns = (
+        Column("pk", "ID"),
+        Column("process_type", "Tipo de proceso", ProcessTypeChoices),
+        Column("practice_category", "Categoría de práctica", PracticeCategoryChoices),
+        Column("estado", "Estado", ProcessStatusChoices),
+        Column("user__username", "Usuario"),
+        Column("user__client_profile__razon_social", "Razón social"),
+        Column("fecha_inicio", "Fecha de inicio"),
+        Column("fecha_asignacion", "Fecha de asignación"),
+        Column("fecha_final", "Fecha final"),
+    )
+
+
 class ProcessDetailView(LoginRequiredMixin, DetailView):
     model = Process
     template_name = "process/process_detail.html"
     context_object_name = "process"
     login_url = "/login/"
 
+    def get_queryset(self):
+        # Todo lo que muestra la plantilla, sin una consulta por anotación o log
+        return (
+            super()
+            .get_queryset()
+            .with_progress()
+            .select_related("user__client_profile")
+            .prefetch_related(
+                "assigned_to",
+                Prefetch(
+                    "anotaciones",
+                    queryset=Anotacion.objects.select_related("usuario"),
+                ),
+                Prefetch(
+                    "status_logs",
+                    queryset=ProcessStatusLog.objects.select_related(
+                        "usuario_modifico"
+                    ),
+                ),
+            )
+        )
+
 
 class ProcessCreateView(LoginRequiredMixin, CreateView):
     model = Process
@@ -2454,28 +2763,36 @@ class ProcessProgressUpdateView(LoginRequiredMixin, UpdateView):
         checklist_formset = ProcessChecklistItemFormSet(
             request.POST, instance=self.object
         )
+        # Una sola consulta: el formset reutiliza estos ítems al validar y guardar
+        has_items = bool(checklist_formset.get_queryset())
         # Permitir formset vacío si no hay items
-        if not self.object.checklist_items.exists():
+        if not has_items:
             checklist_formset.empty_permitted = True
 
-        if form.is_valid() and (
-            not self.object.checklist_items.exists() or checklist_formset.is_valid()
-        ):
-            process_instance = form.save(commit=False)
-            process_instance.save(user_who_modified=request.user)
-            if self.object.checklist_items.exists():
-                checklist_items = checklist_formset.save(commit=False)
-                for item in checklist_items:
-                    if item.status == ChecklistItemStatusChoices.APROBADO:
-                        item.completed_by = request.user
-                    item.save(user_who_modified=self.request.user)
-                checklist_formset.save_m2m()
+        if form.is_valid() and (not has_items or checklist_formset.is_valid()):
+            with transaction.atomic():
+                process_instance = form.save(commit=False)
+                process_instance.save(user_who_modified=request.user)
+                if has_items:
+                    self.save_checklist(checklist_formset)
             return redirect(self.get_success_url())
         else:
             return self.render_to_response(
                 self.get_context_data(form=form, checklist_formset=checklist_formset)
             )
 
+    def save_checklist(self, checklist_formset):
+        """Guarda en bloque los ítems modificados y sus cambios de estado."""
+        checklist_items = checklist_formset.save(commit=False)
+        for item in checklist_items:
+            if item.status == ChecklistItemStatusChoices.APROBADO:
+                item.completed_by = self.request.user
+        ProcessChecklistItem.objects.bulk_save(
+            checklist_items,
+            fields=[*checklist_formset.form._meta.fields, "completed_by"],
+            user_who_modified=self.request.user,
+        )
+
 
 class AnotacionCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = Anotacion
@@ -76,9 +76,12 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
+    # Primero, para contar también las consultas de sesión y autenticación
+    "app.middleware.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "app.middleware.ThrottledSessionRefreshMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -86,10 +89,91 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Presupuesto de consultas SQL por vista (ver app/query_budget.py). Pensado para
+# dev/CI: registra el número de consultas, el tiempo SQL y las consultas
+# repetidas de cada request, y avisa (o falla) al superar el presupuesto.
+QUERY_BUDGET_ENABLED = os.getenv("QUERY_BUDGET_ENABLED", str(DEBUG)).lower() == "true"
+QUERY_BUDGET_RAISE = os.getenv("QUERY_BUDGET_RAISE", "False").lower() == "true"
+# Presupuesto para URLs sin entrada propia (None = sin límite)
+QUERY_BUDGET_DEFAULT = None
+
+# Paginación por cursor (keyset) en los listados grandes (ver app/pagination.py):
+# evita el COUNT(*) y el OFFSET de las páginas profundas. Desactivada por defecto.
+KEYSET_PAGINATION = os.getenv("KEYSET_PAGINATION", "False").lower() == "true"
+# Total en la cabecera: "exact" (COUNT), "estimated" (estadísticas de
+# PostgreSQL) o "none"
+KEYSET_PAGINATION_COUNT = os.getenv("KEYSET_PAGINATION_COUNT", "estimated")
+
+# Cola de tareas en segundo plano (ver app/tasks.py): los correos se guardan en
+# la tabla de tareas y los ejecuta "python manage.py run_tasks". Los PDF de los
+# reportes borrados los elimina "python manage.py storage_gc" (app/storage_gc.py).
+# TASK_QUEUE_EAGER=True las ejecuta en el mismo proceso (desarrollo sin worker).
+TASK_QUEUE_EAGER = os.getenv("TASK_QUEUE_EAGER", "False").lower() == "true"
+
+# Cache settings
+# LocMemCache es por proceso; en producción usar un backend compartido (p. ej.
+# django.core.cache.backends.redis.RedisCache o DatabaseCache) para que todos
+# los workers de gunicorn compartan la caché.
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", "radsolutions"),
+    }
+}
+# Backends que ven todos los procesos (workers de gunicorn, run_tasks,
+# storage_gc, comandos de gestión). Las cachés que se invalidan al cambiar un
+# dato solo se activan por defecto con uno de ellos: con LocMemCache la
+# invalidación hecha en un proceso no llega a los demás.
+SHARED_CACHE_BACKENDS = (
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django.core.cache.backends.db.DatabaseCache",
+)
+CACHE_IS_SHARED = CACHE_BACKEND in SHARED_CACHE_BACKENDS
+
+AUTHENTICATION_BACKENDS = ["app.backends.CachedModelBackend"]
+AUTH_CACHE_ENABLED = (
+    os.getenv("AUTH_CACHE_ENABLED", str(CACHE_IS_SHARED)).lower() == "true"
+)
+AUTH_CACHE_ALIAS = "default"
+AUTH_CACHE_TIMEOUT = int(os.getenv("AUTH_CACHE_TIMEOUT", 300))  # segundos
+
+# Caché de los ids de ChecklistItemDefinition por (tipo de proceso, categoría),
+# usada al crear los ítems de checklist de cada proceso. 0 la desactiva; como la
+# caché de autenticación, por defecto solo se usa con una caché compartida.
+CHECKLIST_DEFINITIONS_CACHE_TIMEOUT = int(
+    os.getenv("CHECKLIST_DEFINITIONS_CACHE_TIMEOUT", 3600 if CACHE_IS_SHARED else 0)
+)
+
 # Session settings
 SESSION_COOKIE_AGE = 3600  # 1 hora en segundos
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
-SESSION_SAVE_EVERY_REQUEST = True
+
+# Almacenamiento de sesiones:
+#   "db": solo base de datos (lectura y escritura en cada request)
+#   "cached_db": lectura desde la caché, escritura en caché y base de datos
+#   "cache": solo caché
+# "cached_db" y "cache" requieren un CACHE_BACKEND compartido: con LocMemCache un
+# logout hecho en un worker deja la sesión legible en la caché de los demás hasta
+# que expira. Por defecto se usa "cached_db" solo con una caché compartida.
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+}
+SESSION_STORAGE = os.getenv("SESSION_STORAGE", "cached_db" if CACHE_IS_SHARED else "db")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STORAGE]
+SESSION_CACHE_ALIAS = "default"
+
+# Expiración deslizante con escrituras limitadas: la expiración de la sesión se
+# renueva como máximo cada N minutos (ThrottledSessionRefreshMiddleware).
+# Con 0 se guarda la sesión en cada request, como antes.
+SESSION_REFRESH_INTERVAL_MINUTES = int(os.getenv("SESSION_REFRESH_INTERVAL_MINUTES", 5))
+SESSION_SAVE_EVERY_REQUEST = SESSION_REFRESH_INTERVAL_MINUTES == 0
 
 ROOT_URLCONF = "app_server.urls"
 
@@ -175,6 +259,15 @@ AWS_QUERYSTRING_AUTH = True
 # The link will be valid for 1 hour
 AWS_QUERYSTRING_EXPIRE = 3600
 
+# Las URLs prefirmadas de los PDF se guardan en la caché (ver app/storage.py)
+# durante menos tiempo que su validez: un enlace servido desde la caché sigue
+# funcionando al menos AWS_QUERYSTRING_EXPIRE - PDF_URL_CACHE_TIMEOUT segundos
+# (15 minutos con los valores por defecto). 0 desactiva la caché.
+PDF_URL_CACHE_ALIAS = "default"
+PDF_URL_CACHE_TIMEOUT = int(
+    os.getenv("PDF_URL_CACHE_TIMEOUT", AWS_QUERYSTRING_EXPIRE * 3 // 4)
+)
+
 # (Opcional) Ruta base para tus archivos en el bucket
 AWS_LOCATION = "media"
 
@@ -190,6 +283,20 @@ if USE_MOCK_STORAGE:
 # else:
 # MEDIA_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/{AWS_LOCATION}/"
 
+# Tamaño máximo de los PDF de reportes que el navegador sube directo al bucket
+# (ver app/uploads.py). El bucket necesita una regla CORS que permita POST
+# desde el dominio de la aplicación. En bytes.
+REPORT_UPLOAD_MAX_SIZE = int(os.getenv("REPORT_UPLOAD_MAX_SIZE", 100 * 1024 * 1024))
+
+# Descarga autenticada de los PDF (/reports/<pk>/download/, ver app/downloads.py):
+#   "stream": Django lee el archivo del almacenamiento por trozos (y solo el
+#             rango pedido)
+#   "x-accel-redirect": nginx envía el archivo; la ruta interna es
+#             REPORT_DOWNLOAD_ACCEL_PREFIX + nombre del archivo
+#   "x-sendfile": Apache/lighttpd envían el archivo (solo con almacenamiento local)
+REPORT_DOWNLOAD_MODE = os.getenv("REPORT_DOWNLOAD_MODE", "stream")
+REPORT_DOWNLOAD_ACCEL_PREFIX = os.getenv("REPORT_DOWNLOAD_ACCEL_PREFIX", "/protected/")
+
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -242,3 +349,6 @@ EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True").lower() == "true"
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "user@example.com")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "password")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "webmaster@example.com")
+# Segundos de espera del SMTP; muy por debajo del LOCK_TIMEOUT de app/tasks.py
+# para que un envío lento no se reclame y se repita
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 30))
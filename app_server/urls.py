@@ -3,11 +3,19 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from app.uploads import mock_direct_upload
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("app.urls")),
 ]
 
+if settings.USE_MOCK_STORAGE:
+    # Sustituto local del endpoint del bucket para las cargas directas
+    urlpatterns += [
+        path("mock-s3/upload/", mock_direct_upload, name="mock_direct_upload")
+    ]
+
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)